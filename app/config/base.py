@@ -21,6 +21,39 @@ class BaseConfig:
     # Processing settings
     DEFAULT_CLIP_DURATION = 30  # seconds
     DEFAULT_TARGET_LANGUAGE = 'en'
+    VIRTUAL_CLIPS = True  # analyze source time ranges, cut clip files on demand
+    VIRTUAL_SOURCE_RETENTION = 24 * 3600  # seconds a download is kept to cut its virtual clips from; None keeps it
+    PIPELINE_QUEUE_SIZE = 2  # clips produced ahead of the one being analyzed
+    CLIP_WORKERS = 1  # processes analyzing clips in parallel; 1 runs them in-process
+    CLIP_PLANNER = 'fixed'  # 'content' cuts clips at silences and scene changes
+    CONTENT_MIN_CLIP_DURATION = None  # seconds; None means half the requested clip duration
+    CONTENT_MAX_CLIP_DURATION = None  # seconds; None means 1.5x the requested clip duration
+    ANALYSIS_MAX_WIDTH = 1280  # wider sources are downscaled by ffmpeg before frame analysis
+    # Frames each analysis stage looks at: 'all', 'interval:<s>', 'count:<n>', 'keyframes' or 'scene:<threshold>'
+    FRAME_SAMPLING = {'ocr': 'interval:5', 'recognition': 'count:10', 'fake_detection': 'all'}
+    # OCR stage options: text_regions reads only proposed text crops; engine is 'tesserocr'
+    # (in-process, falls back to 'pytesseract' if not installed) with threads workers per process;
+    # two_tier reads frames at 'scale' first and again at the analysis size (ANALYSIS_MAX_WIDTH) where a
+    # word is below 'threshold', or where nothing was read in a region scaling made shorter than 'min_line_height'
+    OCR = {'text_regions': True, 'engine': 'tesserocr', 'threads': 2,
+           'two_tier': {'scale': 0.5, 'threshold': 70, 'min_line_height': 24}}
+    ASR_BACKEND = 'google'  # 'google', 'sphinx' (offline, needs pocketsphinx) or 'stub'
+    # Longer audio is recognized as overlapping windows, workers at a time; None sends it whole
+    ASR_WINDOW = {'window': 30, 'overlap': 2, 'workers': 4}
+    # Transcripts of audio heard before (intros, jingles) are reused by fingerprint; None disables.
+    # Past max_recordings the least recently matched recordings are dropped
+    ASR_CACHE = {'path': os.path.join(OUTPUT_FOLDER, 'asr_cache.sqlite3'), 'min_match': 0.6,
+                 'max_recordings': 10000}
+    # Pool for remote calls (ASR, translation): calls per service, retries with backoff, circuit breaker
+    NETWORK_IO = {'workers': 8, 'limits': {'asr': 4, 'translate': 4}, 'attempts': 3, 'backoff': 0.5,
+                  'breaker_failures': 5, 'breaker_reset': 30}
+    # PCM an ASR backend is fed where it isn't 16 kHz mono, e.g. {'google': {'sample_rate': 8000}}
+    ASR_AUDIO_FORMATS = {}
+    SOURCE_AUDIO_ONCE = True  # decode a source's soundtrack once and slice clip audio from it
+    # Sources with a text subtitle track take their speech text from it, skipping ASR and OCR
+    SUBTITLE_FAST_PATH = True
+    # Speech detection in front of ASR (see detect_speech); None sends every clip whole
+    VOICE_ACTIVITY = {'energy_db': -45, 'flatness': 0.4, 'min_speech': 0.25, 'padding': 0.2}
     
     # ML Model settings
     YOLO_MODEL_PATH = 'yolov8n.pt'
@@ -1,14 +1,14 @@
-from fractions import Fraction
 import re
 import subprocess
 from flask import Blueprint, request, jsonify, current_app, Response
-from app.utils.core_processing import VideoProcessor
+from app.utils.core_processing import VideoProcessor, analysis_options
 from app.utils.video_processing import download_video
 from app.utils.file_handling import allowed_file, get_video_duration
-from app.utils.audio_processing import extract_audio, speech_to_text
+from app.utils.audio_processing import decode_audio, speech_to_text
 from app.utils.text_processing import ocr_from_video, translate_text, extract_meaningful_content
 from app.utils.image_processing import recognize_images_in_video
 from app.utils.fake_video_detection import detect_fake_video
+from app.utils.media_probe import get_video_info
 from datetime import datetime
 import os
 import json
@@ -80,82 +80,6 @@ def split_video(input_file, output_folder, clip_duration=30):
             logging.error(f"Error processing clip {i+1}: {e.stderr.decode()}")
     return clips
 
-def get_video_info(input_file):
-    ffprobe_cmd = [
-        'ffprobe',
-        '-v', 'error',
-        '-select_streams', 'v:0',
-        '-count_packets',
-        '-show_entries', 'stream=nb_read_packets,r_frame_rate,duration',
-        '-of', 'csv=p=0',
-        input_file
-    ]
-    try:
-        ffprobe_output = subprocess.check_output(ffprobe_cmd, stderr=subprocess.STDOUT).decode('utf-8').strip().split(',')
-        logging.info(f"ffprobe output: {ffprobe_output}")
-        
-        if len(ffprobe_output) < 3:
-            raise ValueError(f"Unexpected ffprobe output format: {ffprobe_output}")
-        
-        # Handle frame rate
-        fps = float(Fraction(ffprobe_output[0]))
-        
-        # Handle packet count or duration (depending on ffprobe version)
-        try:
-            nb_packets = int(float(ffprobe_output[1])) if ffprobe_output[1] != 'N/A' else None
-        except ValueError:
-            nb_packets = None
-        
-        # Handle duration
-        try:
-            duration = float(ffprobe_output[2]) if ffprobe_output[2] != 'N/A' else None
-        except ValueError:
-            duration = None
-        
-        # Estimate total frames
-        if nb_packets is not None:
-            total_frames = nb_packets
-        elif duration is not None:
-            total_frames = int(duration * fps)
-        else:
-            # If we don't have duration or packet count, we need an alternative method
-            logging.warning("Unable to determine total frames from ffprobe output. Using ffmpeg to count frames.")
-            total_frames = count_frames_ffmpeg(input_file)
-        
-        logging.info(f"Video info: Total frames: {total_frames}, FPS: {fps}, Duration: {duration}")
-        
-        return total_frames, fps, duration
-    
-    except subprocess.CalledProcessError as e:
-        logging.error(f"ffprobe command failed: {e.output.decode('utf-8')}")
-        raise
-    except ValueError as e:
-        logging.error(f"Error parsing ffprobe output: {str(e)}")
-        raise
-    except Exception as e:
-        logging.error(f"Unexpected error in get_video_info: {str(e)}")
-        raise
-
-def count_frames_ffmpeg(input_file):
-    cmd = [
-        'ffmpeg',
-        '-i', input_file,
-        '-map', '0:v:0',
-        '-c', 'copy',
-        '-f', 'null',
-        '-'
-    ]
-    try:
-        output = subprocess.check_output(cmd, stderr=subprocess.STDOUT).decode()
-        matches = re.search(r'frame=\s*(\d+)', output)
-        if matches:
-            return int(matches.group(1))
-        else:
-            raise ValueError("Could not find frame count in ffmpeg output")
-    except subprocess.CalledProcessError as e:
-        logging.error(f"Error running ffmpeg: {e.output.decode('utf-8')}")
-        raise
-
 def process_video_file_generator(input_file, output_folder, clip_duration):
     logging.info(f"Starting video file processing: input_file={input_file}, output_folder={output_folder}, clip_duration={clip_duration}")
     try:
@@ -211,6 +135,8 @@ def process_url():
                 return jsonify({"error": "Invalid clip duration. Must be a positive number."}), 400
         target_language = data.get("targetLanguage", "en")
         
+        options = analysis_options(current_app.config)
+
         def generate():
             yield json.dumps({"status": "started", "message": "Processing started"}) + "\n"
 
@@ -239,7 +165,7 @@ def process_url():
                     
                     try:
                         # Process the clip
-                        clip_result = VideoProcessor.process_clip(clip, output_folder, target_language, url)
+                        clip_result = VideoProcessor.process_clip(clip, output_folder, target_language, url, options=options)
                         
                         # Update running summary
                         running_summary = VideoProcessor.update_running_summary(running_summary, clip_result)
@@ -300,6 +226,8 @@ def process_video():
         output_folder = os.path.join(current_app.config["OUTPUT_FOLDER"], os.path.splitext(os.path.basename(input_file))[0])
         os.makedirs(output_folder, exist_ok=True)
 
+        options = analysis_options(current_app.config)
+
         def generate():
             try:
                 yield json.dumps({"status": "started", "message": "Processing started"}) + "\n"
@@ -311,7 +239,7 @@ def process_video():
                     logging.info(f"Processing clip {i+1}: {clip}")
                     yield json.dumps({"status": "processing", "message": f"Processing clip {i+1}"}) + "\n"
                     
-                    clip_result = VideoProcessor.process_clip(clip, output_folder, target_language, url or filename)
+                    clip_result = VideoProcessor.process_clip(clip, output_folder, target_language, url or filename, options=options)
                     
                     running_summary = VideoProcessor.update_running_summary(running_summary, clip_result)
                     
@@ -354,23 +282,23 @@ def process_folder():
 
     output_folder = os.path.join(current_app.config["OUTPUT_FOLDER"], folder_id)
     os.makedirs(output_folder, exist_ok=True)
+    options = analysis_options(current_app.config)
+    audio_format = options["audio_format"]
 
     results = []
     for filename in os.listdir(folder_path):
         if allowed_file(filename):
             clip_path = os.path.join(folder_path, filename)
-            audio_path = os.path.join(output_folder, f"{filename}.wav")
-
-            audio_extracted = extract_audio(clip_path, audio_path)
+            samples = decode_audio(clip_path, **audio_format)
 
-            if audio_extracted:
-                speech_text = speech_to_text(audio_path)
+            if samples is not None:
+                speech_text = speech_to_text(samples, audio_format["sample_rate"])
             else:
                 speech_text = (
                     "Audio extraction failed. No speech recognition performed."
                 )
 
-            ocr_text = ocr_from_video(clip_path)
+            ocr_text = ocr_from_video(clip_path, options=options)
 
             combined_text = f"{speech_text} {ocr_text}".strip()
             translated_text = (
@@ -2,6 +2,7 @@ import uuid
 from flask import Blueprint, render_template, request, jsonify, current_app, send_from_directory
 from werkzeug.utils import secure_filename
 from app.utils.file_handling import allowed_file, get_video_duration
+from app.utils.clip_splitting import materialize_clip
 import os
 
 main_bp = Blueprint('main', __name__)
@@ -57,4 +58,12 @@ def upload_folder():
 
 @main_bp.route("/output/<path:filename>")
 def send_file(filename):
+    # Virtual clips only get a file once someone asks to play them
+    folder, clip_filename = os.path.split(filename)
+    if folder and not os.path.exists(os.path.join(current_app.config["OUTPUT_FOLDER"], filename)):
+        output_folder = os.path.join(current_app.config["OUTPUT_FOLDER"], secure_filename(folder))
+        try:
+            materialize_clip(output_folder, secure_filename(clip_filename))
+        except Exception as e:
+            current_app.logger.error(f"Error materializing clip {filename}: {str(e)}")
     return send_from_directory(current_app.config["OUTPUT_FOLDER"], filename)
\ No newline at end of file
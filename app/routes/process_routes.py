@@ -1,173 +1,30 @@
-from fractions import Fraction
-import re
-import subprocess
 from flask import Blueprint, request, jsonify, current_app, Response
 from werkzeug.utils import secure_filename
-from app.utils.core_processing import VideoProcessor
+from app.utils.core_processing import VideoProcessor, analysis_options
 from app.utils.video_processing import download_video
-from app.utils.file_handling import allowed_file, get_video_duration
-from app.utils.audio_processing import extract_audio, speech_to_text
+from app.utils.clip_splitting import open_clip_source, remove_expired_sources
+from app.utils.clip_pipeline import prefetch, process_clips_ordered, DEFAULT_QUEUE_SIZE
+from app.utils.clip_planning import planner_options
+from app.utils.file_handling import allowed_file
+from app.utils.audio_processing import SourceAudio, transcribe_clips
+from app.utils.subtitles import load_subtitle_cues
 from app.utils.text_processing import ocr_from_video, translate_text, extract_meaningful_content
 from app.utils.image_processing import recognize_images_in_video
-from app.utils.fake_video_detection import detect_fake_video
+from app.utils.fake_video_detection import FakeVideoAccumulator
 from datetime import datetime
 import os
 import json
 import logging
 import uuid
+from functools import partial
 from flask import stream_with_context
 from summa import keywords
 
 process_bp = Blueprint('process', __name__)
 
-def split_video(input_file, output_folder, clip_duration=30):
-    if not os.path.exists(output_folder):
-        os.makedirs(output_folder)
-    total_duration = get_video_duration(input_file)
-    if total_duration == 0:
-        logging.error(f"Could not determine duration of {input_file}")
-        return []
-    num_clips = int(total_duration // clip_duration) + 1
-    clips = []
-    for i in range(num_clips):
-        start_time = i * clip_duration
-        end_time = min((i + 1) * clip_duration, total_duration)
-        output_file = os.path.join(output_folder, f"clip_{i+1:03d}.mp4")
-       
-        try:
-            subprocess.run([
-                'ffmpeg',
-                '-i', input_file,
-                '-ss', str(start_time),
-                '-to', str(end_time),
-                '-c', 'copy',
-                '-y',
-                output_file
-            ], check=True, stderr=subprocess.PIPE)
-            clips.append({
-                'filename': f"clip_{i+1:03d}.mp4",
-                'start': start_time,
-                'end': end_time
-            })
-        except subprocess.CalledProcessError as e:
-            logging.error(f"Error processing clip {i+1}: {e.stderr.decode()}")
-    return clips
-
-def get_video_info(input_file):
-    ffprobe_cmd = [
-        'ffprobe',
-        '-v', 'error',
-        '-select_streams', 'v:0',
-        '-count_packets',
-        '-show_entries', 'stream=nb_read_packets,r_frame_rate,duration',
-        '-of', 'csv=p=0',
-        input_file
-    ]
-    try:
-        ffprobe_output = subprocess.check_output(ffprobe_cmd, stderr=subprocess.STDOUT).decode('utf-8').strip().split(',')
-        logging.info(f"ffprobe output: {ffprobe_output}")
-        
-        if len(ffprobe_output) < 3:
-            raise ValueError(f"Unexpected ffprobe output format: {ffprobe_output}")
-        
-        # Handle frame rate
-        fps = float(Fraction(ffprobe_output[0]))
-        
-        # Handle packet count or duration (depending on ffprobe version)
-        try:
-            nb_packets = int(float(ffprobe_output[1])) if ffprobe_output[1] != 'N/A' else None
-        except ValueError:
-            nb_packets = None
-        
-        # Handle duration
-        try:
-            duration = float(ffprobe_output[2]) if ffprobe_output[2] != 'N/A' else None
-        except ValueError:
-            duration = None
-        
-        # Estimate total frames
-        if nb_packets is not None:
-            total_frames = nb_packets
-        elif duration is not None:
-            total_frames = int(duration * fps)
-        else:
-            # If we don't have duration or packet count, we need an alternative method
-            logging.warning("Unable to determine total frames from ffprobe output. Using ffmpeg to count frames.")
-            total_frames = count_frames_ffmpeg(input_file)
-        
-        logging.info(f"Video info: Total frames: {total_frames}, FPS: {fps}, Duration: {duration}")
-        
-        return total_frames, fps, duration
-    
-    except subprocess.CalledProcessError as e:
-        logging.error(f"ffprobe command failed: {e.output.decode('utf-8')}")
-        raise
-    except ValueError as e:
-        logging.error(f"Error parsing ffprobe output: {str(e)}")
-        raise
-    except Exception as e:
-        logging.error(f"Unexpected error in get_video_info: {str(e)}")
-        raise
-
-def count_frames_ffmpeg(input_file):
-    cmd = [
-        'ffmpeg',
-        '-i', input_file,
-        '-map', '0:v:0',
-        '-c', 'copy',
-        '-f', 'null',
-        '-'
-    ]
-    try:
-        output = subprocess.check_output(cmd, stderr=subprocess.STDOUT).decode()
-        matches = re.search(r'frame=\s*(\d+)', output)
-        if matches:
-            return int(matches.group(1))
-        else:
-            raise ValueError("Could not find frame count in ffmpeg output")
-    except subprocess.CalledProcessError as e:
-        logging.error(f"Error running ffmpeg: {e.output.decode('utf-8')}")
-        raise
-
-def process_video_file_generator(input_file, output_folder, clip_duration):
-    logging.info(f"Starting video file processing: input_file={input_file}, output_folder={output_folder}, clip_duration={clip_duration}")
-    try:
-        total_frames, fps, duration = get_video_info(input_file)
-        logging.info(f"Video info: total_frames={total_frames}, fps={fps}, duration={duration}")
-        
-        for i in range(0, total_frames, int(fps * clip_duration)):
-            start_time = i / fps
-            end_time = min((i + int(fps * clip_duration)) / fps, duration) if duration else (i + int(fps * clip_duration)) / fps
-            
-            clip_filename = f"clip_{i//int(fps * clip_duration):04d}.mp4"
-            clip_path = os.path.join(output_folder, clip_filename)
-            
-            # Use ffmpeg to cut the clip
-            ffmpeg_cmd = [
-                'ffmpeg',
-                '-i', input_file,
-                '-ss', str(start_time),
-                '-t', str(end_time - start_time),
-                '-c', 'copy',  # This copies the codec without re-encoding, which is faster
-                '-y',  # Overwrite output file if it exists
-                clip_path
-            ]
-            logging.info(f"Running ffmpeg command: {' '.join(ffmpeg_cmd)}")
-            subprocess.run(ffmpeg_cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-            
-            if os.path.exists(clip_path):
-                logging.info(f"Successfully created clip: {clip_path}")
-                yield {
-                    "filename": clip_filename,
-                    "start": start_time,
-                    "end": end_time
-                }
-            else:
-                logging.error(f"Failed to create clip: {clip_path}")
-    
-    except Exception as e:
-        logging.error(f"Error in process_video_file_generator: {str(e)}", exc_info=True)
-        raise
+def clip_progress(index, total):
+    """The progress line streamed when clip index (0-based) is the next one being processed."""
+    return json.dumps({"status": "processing", "message": f"Processing clip {index+1}/{total}"}) + "\n"
 
 @process_bp.route("/process_url", methods=["POST"])
 def process_url():
@@ -183,10 +40,23 @@ def process_url():
             except ValueError:
                 return jsonify({"error": "Invalid clip duration. Must be a positive number."}), 400
         target_language = data.get("targetLanguage", "en")
+        virtual_clips = current_app.config.get("VIRTUAL_CLIPS", False)
+        source_retention = current_app.config.get("VIRTUAL_SOURCE_RETENTION")
+        queue_size = current_app.config.get("PIPELINE_QUEUE_SIZE", DEFAULT_QUEUE_SIZE)
+        clip_workers = current_app.config.get("CLIP_WORKERS", 1)
+        plan_options = planner_options(current_app.config)
+        options = analysis_options(current_app.config)
+        audio_format = options["audio_format"]
+        source_audio_once = current_app.config.get("SOURCE_AUDIO_ONCE", False)
+        subtitle_fast_path = current_app.config.get("SUBTITLE_FAST_PATH", False)
         
         def generate():
             yield json.dumps({"status": "started", "message": "Processing started"}) + "\n"
 
+            # Downloads stay for cutting virtual clips on demand, up to the retention time
+            if virtual_clips and source_retention is not None:
+                remove_expired_sources(current_app.config["OUTPUT_FOLDER"], source_retention)
+
             output_folder = os.path.join(current_app.config["OUTPUT_FOLDER"], str(uuid.uuid4()))
             os.makedirs(output_folder, exist_ok=True)
 
@@ -198,25 +68,47 @@ def process_url():
             if not os.path.exists(temp_file):
                 raise FileNotFoundError(f"Failed to download video: {temp_file}")
 
-            yield json.dumps({"status": "splitting", "message": "Splitting video into clips"}) + "\n"
-            
+            source_audio = None
+            clips = None
             try:
-                clips = split_video(temp_file, output_folder, clip_duration)
-                yield json.dumps({"status": "processing", "message": f"Video split into {len(clips)} clips. Starting processing."}) + "\n"
+                if virtual_clips:
+                    yield json.dumps({"status": "processing", "message": "Planning clips"}) + "\n"
+                else:
+                    yield json.dumps({"status": "splitting", "message": "Splitting video into clips"}) + "\n"
+                planned_clips, clip_source = open_clip_source(temp_file, output_folder, clip_duration, virtual=virtual_clips, **plan_options)
+                subtitle_cues = load_subtitle_cues(temp_file) if subtitle_fast_path else None
+                # Still needed with subtitles, by the clips between cues
+                if source_audio_once:
+                    source_audio = SourceAudio.decode(temp_file, output_folder, **audio_format)
+                yield json.dumps({"status": "processing", "message": f"Video split into {len(planned_clips)} clips. Starting processing."}) + "\n"
 
                 running_summary = {}
+                processed_clips = 0
+
+                # Clips are cut (or their audio decoded) in the background while
+                # the previous clip is analyzed
+                clips = prefetch(
+                    (VideoProcessor.prepare_clip(clip, output_folder, audio_format, source_audio, subtitle_cues) for clip in clip_source),
+                    maxsize=queue_size,
+                    sources=[clip_source],
+                )
                 
-                for i, clip in enumerate(clips):
-                    logging.info(f"Processing clip {i+1}/{len(clips)}: {clip}")
-                    yield json.dumps({"status": "processing", "message": f"Processing clip {i+1}/{len(clips)}"}) + "\n"
-                    
-                    try:
-                        # Process the clip
-                        clip_result = VideoProcessor.process_clip(clip, output_folder, target_language, url)
-                        
+                process = partial(VideoProcessor.process_clip, output_folder=output_folder,
+                                  target_language=target_language, url=url, options=options)
+
+                if planned_clips:
+                    yield clip_progress(0, len(planned_clips))
+                for i, clip, clip_result, clip_error in process_clips_ordered(clips, process, max_workers=clip_workers):
+                    processed_clips += 1
+                    if clip_error is not None:
+                        logging.error(f"Error processing clip {i+1}: {str(clip_error)}", exc_info=clip_error)
+                        yield json.dumps({"status": "error", "message": f"Error processing clip {i+1}: {str(clip_error)}"}) + "\n"
+                    else:
+                        logging.info(f"Processed clip {i+1}/{len(planned_clips)}: {clip}")
+
                         # Update running summary
                         running_summary = VideoProcessor.update_running_summary(running_summary, clip_result)
-                        
+
                         yield json.dumps({
                             "status": "clip_ready",
                             "data": {
@@ -225,23 +117,28 @@ def process_url():
                                 "running_summary": running_summary,
                             },
                         }) + "\n"
-                    except Exception as clip_error:
-                        logging.error(f"Error processing clip {i+1}: {str(clip_error)}", exc_info=True)
-                        yield json.dumps({"status": "error", "message": f"Error processing clip {i+1}: {str(clip_error)}"}) + "\n"
+                    if i + 1 < len(planned_clips):
+                        yield clip_progress(i + 1, len(planned_clips))
 
-                logging.info(f"Finished processing {len(clips)} clips")
+                logging.info(f"Finished processing {processed_clips} clips")
                 yield json.dumps({
                     "status": "complete",
-                    "message": f"Processing complete. Processed {len(clips)} clips.",
+                    "message": f"Processing complete. Processed {processed_clips} clips.",
                 }) + "\n"
             except Exception as e:
                 logging.error(f"Error in clip processing loop: {str(e)}", exc_info=True)
                 yield json.dumps({"status": "error", "message": f"Error during clip processing: {str(e)}"}) + "\n"
             finally:
-                # Clean up the temporary file after all processing is done
-                if os.path.exists(temp_file):
+                # Stop producing clips (and the segment muxer) if the client went away
+                if clips is not None:
+                    clips.close()
+                # Clean up the temporary file after all processing is done.
+                # Virtual clips are cut from it on demand, so it stays then.
+                if not virtual_clips and os.path.exists(temp_file):
                     os.remove(temp_file)
                     logging.info(f"Removed temporary file: {temp_file}")
+                if source_audio is not None:
+                    source_audio.remove()
 
         return Response(stream_with_context(generate()), content_type="application/json")
 
@@ -272,32 +169,79 @@ def process_video():
 
         output_folder = os.path.join(current_app.config["OUTPUT_FOLDER"], os.path.splitext(os.path.basename(input_file))[0])
         os.makedirs(output_folder, exist_ok=True)
+        virtual_clips = current_app.config.get("VIRTUAL_CLIPS", False)
+        queue_size = current_app.config.get("PIPELINE_QUEUE_SIZE", DEFAULT_QUEUE_SIZE)
+        clip_workers = current_app.config.get("CLIP_WORKERS", 1)
+        plan_options = planner_options(current_app.config)
+        options = analysis_options(current_app.config)
+        audio_format = options["audio_format"]
+        source_audio_once = current_app.config.get("SOURCE_AUDIO_ONCE", False)
+        subtitle_fast_path = current_app.config.get("SUBTITLE_FAST_PATH", False)
 
         def generate():
+            source_audio = None
+            clip_generator = None
             try:
                 yield json.dumps({"status": "started", "message": "Processing started"}) + "\n"
 
-                clip_generator = process_video_file_generator(input_file, output_folder, clip_duration)
+                # A text subtitle track stands in for the audio of the clips it
+                # has cues in. The audio is decoded once up front, and every
+                # other clip's is a slice of it
+                subtitle_cues = load_subtitle_cues(input_file) if subtitle_fast_path else None
+                if source_audio_once:
+                    source_audio = SourceAudio.decode(input_file, output_folder, **audio_format)
+
+                # Same clip source as /process_url: the clips of the manifest,
+                # split in one segment-muxer pass or (virtual) only planned
+                planned_clips, clip_source = open_clip_source(input_file, output_folder, clip_duration, virtual=virtual_clips, **plan_options)
+
+                # Clips are cut (or their audio decoded) in the background while
+                # the previous clip is analyzed
+                clip_generator = prefetch(
+                    (
+                        VideoProcessor.prepare_clip(clip, output_folder, audio_format, source_audio, subtitle_cues)
+                        for clip in clip_source
+                    ),
+                    maxsize=queue_size,
+                    sources=[clip_source],
+                )
                 running_summary = {}
+                fake_accumulator = FakeVideoAccumulator()
+                fake_clips = failed_clips = 0
+
+                process = partial(VideoProcessor.process_clip, output_folder=output_folder,
+                                  target_language=target_language, url=url or filename,
+                                  options=options, fake_detection=True)
+
+                if planned_clips:
+                    yield clip_progress(0, len(planned_clips))
+                for i, clip, clip_result, clip_error in process_clips_ordered(clip_generator, process, max_workers=clip_workers):
+                    if clip_error is not None:
+                        failed_clips += 1
+                        logging.error(f"Error processing clip {i+1}: {str(clip_error)}", exc_info=clip_error)
+                        yield json.dumps({"status": "error", "message": f"Error processing clip {i+1}: {str(clip_error)}"}) + "\n"
+                    else:
+                        logging.info(f"Processed clip {i+1}/{len(planned_clips)}: {clip}")
+                        fake_accumulator.merge(FakeVideoAccumulator.from_state(clip_result.pop("fake_detection_state")))
+                        fake_clips += 1
+
+                        running_summary = VideoProcessor.update_running_summary(running_summary, clip_result)
 
-                for i, clip in enumerate(clip_generator):
-                    logging.info(f"Processing clip {i+1}: {clip}")
-                    yield json.dumps({"status": "processing", "message": f"Processing clip {i+1}"}) + "\n"
-                    
-                    clip_result = VideoProcessor.process_clip(clip, output_folder, target_language, url or filename)
-                    
-                    running_summary = VideoProcessor.update_running_summary(running_summary, clip_result)
-                    
-                    yield json.dumps({
-                        "status": "clip_ready",
-                        "data": {
-                            "clip": clip_result,
-                            "output_folder": os.path.basename(output_folder),
-                            "running_summary": running_summary,
-                        },
-                    }) + "\n"
-
-                fake_detection_result = detect_fake_video(input_file)
+                        yield json.dumps({
+                            "status": "clip_ready",
+                            "data": {
+                                "clip": clip_result,
+                                "output_folder": os.path.basename(output_folder),
+                                "running_summary": running_summary,
+                            },
+                        }) + "\n"
+                    if i + 1 < len(planned_clips):
+                        yield clip_progress(i + 1, len(planned_clips))
+
+                # Built from the frames the clips were analyzed on, so the
+                # video isn't decoded a second time. Clips that failed are
+                # missing from it, so say how many went in
+                fake_detection_result = {**fake_accumulator.result(), "clips_merged": fake_clips, "clips_failed": failed_clips}
                 
                 yield json.dumps({
                     "status": "complete",
@@ -308,6 +252,12 @@ def process_video():
             except Exception as e:
                 logging.error(f"Error in generate function: {str(e)}", exc_info=True)
                 yield json.dumps({"status": "error", "message": f"Error during processing: {str(e)}"}) + "\n"
+            finally:
+                # Stop producing clips (and the segment muxer) if the client went away
+                if clip_generator is not None:
+                    clip_generator.close()
+                if source_audio is not None:
+                    source_audio.remove()
 
         return Response(stream_with_context(generate()), content_type="application/json")
 
@@ -327,42 +277,40 @@ def process_folder():
 
     output_folder = os.path.join(current_app.config["OUTPUT_FOLDER"], folder_id)
     os.makedirs(output_folder, exist_ok=True)
+    options = analysis_options(current_app.config)
 
-    results = []
-    for filename in os.listdir(folder_path):
-        if allowed_file(filename):
-            clip_path = os.path.join(folder_path, filename)
-            audio_path = os.path.join(output_folder, f"{filename}.wav")
-
-            audio_extracted = extract_audio(clip_path, audio_path)
-
-            if audio_extracted:
-                speech_text = speech_to_text(audio_path)
-            else:
-                speech_text = (
-                    "Audio extraction failed. No speech recognition performed."
-                )
+    clip_paths = [
+        os.path.join(folder_path, filename)
+        for filename in os.listdir(folder_path)
+        if allowed_file(filename)
+    ]
+    # Clips are decoded and recognized a batch at a time, not all up front
+    speech_texts = transcribe_clips(
+        clip_paths, options["audio_format"], options["voice_activity"],
+        options["asr_backend"], options["asr_window"], options["asr_cache"]
+    )
 
-            ocr_text = ocr_from_video(clip_path)
-
-            combined_text = f"{speech_text} {ocr_text}".strip()
-            translated_text = (
-                translate_text(combined_text, target_language)
-                if combined_text
-                else "No text to translate."
-            )
-
-            results.append(
-                {
-                    "filename": filename,
-                    "speech_text": speech_text,
-                    "ocr_text": ocr_text,
-                    "translated_text": translated_text,
-                }
-            )
-
-            if os.path.exists(audio_path):
-                os.remove(audio_path)  # Clean up temporary audio file
+    results = []
+    for clip_path, speech_text in speech_texts:
+        filename = os.path.basename(clip_path)
+
+        ocr_text = ocr_from_video(clip_path, options=options)
+
+        combined_text = f"{speech_text} {ocr_text}".strip()
+        translated_text = (
+            translate_text(combined_text, target_language)
+            if combined_text
+            else "No text to translate."
+        )
+
+        results.append(
+            {
+                "filename": filename,
+                "speech_text": speech_text,
+                "ocr_text": ocr_text,
+                "translated_text": translated_text,
+            }
+        )
 
     return jsonify({"clips": results, "output_folder": folder_id})
 
@@ -1,9 +1,9 @@
 import os
 import subprocess
 import logging
-import re
-from fractions import Fraction
 from .utils_routes import get_video_duration
+from app.utils.media_probe import get_video_info
+from app.utils.frame_range import read_frames_sequentially
 from ultralytics import YOLO
 import cv2
 
@@ -43,82 +43,6 @@ def split_video(input_file, output_folder, clip_duration=30):
             logging.error(f"Error processing clip {i+1}: {e.stderr.decode()}")
     return clips
 
-def get_video_info(input_file):
-    ffprobe_cmd = [
-        'ffprobe',
-        '-v', 'error',
-        '-select_streams', 'v:0',
-        '-count_packets',
-        '-show_entries', 'stream=nb_read_packets,r_frame_rate,duration',
-        '-of', 'csv=p=0',
-        input_file
-    ]
-    try:
-        ffprobe_output = subprocess.check_output(ffprobe_cmd, stderr=subprocess.STDOUT).decode('utf-8').strip().split(',')
-        logging.info(f"ffprobe output: {ffprobe_output}")
-        
-        if len(ffprobe_output) < 3:
-            raise ValueError(f"Unexpected ffprobe output format: {ffprobe_output}")
-        
-        # Handle frame rate
-        fps = float(Fraction(ffprobe_output[0]))
-        
-        # Handle packet count or duration (depending on ffprobe version)
-        try:
-            nb_packets = int(float(ffprobe_output[1])) if ffprobe_output[1] != 'N/A' else None
-        except ValueError:
-            nb_packets = None
-        
-        # Handle duration
-        try:
-            duration = float(ffprobe_output[2]) if ffprobe_output[2] != 'N/A' else None
-        except ValueError:
-            duration = None
-        
-        # Estimate total frames
-        if nb_packets is not None:
-            total_frames = nb_packets
-        elif duration is not None:
-            total_frames = int(duration * fps)
-        else:
-            # If we don't have duration or packet count, we need an alternative method
-            logging.warning("Unable to determine total frames from ffprobe output. Using ffmpeg to count frames.")
-            total_frames = count_frames_ffmpeg(input_file)
-        
-        logging.info(f"Video info: Total frames: {total_frames}, FPS: {fps}, Duration: {duration}")
-        
-        return total_frames, fps, duration
-    
-    except subprocess.CalledProcessError as e:
-        logging.error(f"ffprobe command failed: {e.output.decode('utf-8')}")
-        raise
-    except ValueError as e:
-        logging.error(f"Error parsing ffprobe output: {str(e)}")
-        raise
-    except Exception as e:
-        logging.error(f"Unexpected error in get_video_info: {str(e)}")
-        raise
-
-def count_frames_ffmpeg(input_file):
-    cmd = [
-        'ffmpeg',
-        '-i', input_file,
-        '-map', '0:v:0',
-        '-c', 'copy',
-        '-f', 'null',
-        '-'
-    ]
-    try:
-        output = subprocess.check_output(cmd, stderr=subprocess.STDOUT).decode()
-        matches = re.search(r'frame=\s*(\d+)', output)
-        if matches:
-            return int(matches.group(1))
-        else:
-            raise ValueError("Could not find frame count in ffmpeg output")
-    except subprocess.CalledProcessError as e:
-        logging.error(f"Error running ffmpeg: {e.output.decode('utf-8')}")
-        raise
-
 def detect_objects_in_clip(clip_path):
     """
     Perform object detection on key frames of a video clip
@@ -129,14 +53,10 @@ def detect_objects_in_clip(clip_path):
         fps = cap.get(cv2.CAP_PROP_FPS)
         frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
         
-        # Process one frame per second
+        # Process one frame per second, walking forward through the clip
+        # instead of seeking to every sample
         detections = []
-        for frame_idx in range(0, frame_count, int(fps)):
-            cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
-            ret, frame = cap.read()
-            if not ret:
-                continue
-                
+        for frame_idx, frame in read_frames_sequentially(cap, range(0, frame_count, int(fps))):
             # Run YOLO detection
             results = model(frame)
             
@@ -4,15 +4,18 @@ from typing import Generator, Dict, Any, Optional, List
 import os
 import logging
 import uuid
-import subprocess
-from fractions import Fraction
-import re
 from datetime import datetime
+from functools import partial
 
 from ..utils.video_processing import download_video
-from ..utils.file_handling import get_video_duration
-from ..utils.core_processing import VideoProcessor
-from ..utils.fake_video_detection import detect_fake_video
+from ..utils.media_probe import get_video_info
+from ..utils.clip_splitting import open_clip_source, remove_expired_sources
+from ..utils.clip_planning import planner_options
+from ..utils.clip_pipeline import prefetch, process_clips_ordered, DEFAULT_QUEUE_SIZE
+from ..utils.core_processing import VideoProcessor, analysis_options
+from ..utils.audio_processing import SourceAudio
+from ..utils.subtitles import load_subtitle_cues
+from ..utils.fake_video_detection import FakeVideoAccumulator
 
 class VideoService:
     def __init__(self, config):
@@ -34,6 +37,12 @@ class VideoService:
         try:
             yield {"status": "started", "message": "Processing started"}
 
+            # Downloads stay for cutting virtual clips on demand, up to the
+            # retention time
+            retention = self.config.get("VIRTUAL_SOURCE_RETENTION")
+            if self.config.get("VIRTUAL_CLIPS", False) and retention is not None:
+                remove_expired_sources(self.config["OUTPUT_FOLDER"], retention)
+
             # Create unique output folder
             output_folder = os.path.join(self.config["OUTPUT_FOLDER"], str(uuid.uuid4()))
             os.makedirs(output_folder, exist_ok=True)
@@ -46,34 +55,82 @@ class VideoService:
             if not os.path.exists(temp_file):
                 raise FileNotFoundError(f"Failed to download video: {temp_file}")
 
-            # Split and process video
-            yield {"status": "splitting", "message": "Splitting video into clips"}
+            # Split (or just plan) and process video
+            virtual_clips = self.config.get("VIRTUAL_CLIPS", False)
+            options = analysis_options(self.config)
+            audio_format = options["audio_format"]
+            source_audio = None
+            clips = None
             
             try:
-                clips = self._split_video(temp_file, output_folder, clip_duration)
+                if virtual_clips:
+                    yield {"status": "processing", "message": "Planning clips"}
+                else:
+                    yield {"status": "splitting", "message": "Splitting video into clips"}
+                planned_clips, clip_source = open_clip_source(
+                    temp_file, output_folder, clip_duration, virtual=virtual_clips,
+                    **planner_options(self.config)
+                )
+                # A text subtitle track stands in for the audio of the clips it
+                # has cues in. Decode the soundtrack once and slice the other
+                # clips' audio from it
+                subtitle_cues = load_subtitle_cues(temp_file) if self.config.get("SUBTITLE_FAST_PATH", False) else None
+                if self.config.get("SOURCE_AUDIO_ONCE", False):
+                    source_audio = SourceAudio.decode(temp_file, output_folder, **audio_format)
                 yield {
                     "status": "processing", 
-                    "message": f"Video split into {len(clips)} clips. Starting processing."
+                    "message": f"Video split into {len(planned_clips)} clips. Starting processing."
                 }
 
                 running_summary = {}
+                processed_clips = 0
+                fake_accumulator = FakeVideoAccumulator()
+                fake_clips = 0
+
+                # Clips are cut (or their audio decoded) in the background
+                # while the previous clip is analyzed
+                clips = prefetch(
+                    (VideoProcessor.prepare_clip(clip, output_folder, audio_format, source_audio, subtitle_cues)
+                     for clip in clip_source),
+                    maxsize=self.config.get("PIPELINE_QUEUE_SIZE", DEFAULT_QUEUE_SIZE),
+                    sources=[clip_source],
+                )
                 
-                # Process each clip
-                for i, clip in enumerate(clips):
-                    self.logger.info(f"Processing clip {i+1}/{len(clips)}: {clip}")
-                    yield {
-                        "status": "processing", 
-                        "message": f"Processing clip {i+1}/{len(clips)}"
-                    }
-                    
-                    try:
-                        clip_result = VideoProcessor.process_clip(
-                            clip, output_folder, target_language, url
+                process = partial(
+                    VideoProcessor.process_clip,
+                    output_folder=output_folder,
+                    target_language=target_language,
+                    url=url,
+                    options=options,
+                    fake_detection=True,
+                )
+
+                # Process each clip, in parallel if CLIP_WORKERS > 1; results
+                # still arrive in clip order
+                if planned_clips:
+                    yield self._clip_progress(0, len(planned_clips))
+                for i, clip, clip_result, clip_error in process_clips_ordered(
+                    clips, process, max_workers=self.config.get("CLIP_WORKERS", 1)
+                ):
+                    processed_clips += 1
+                    if clip_error is not None:
+                        self.logger.error(
+                            f"Error processing clip {i+1}: {str(clip_error)}", exc_info=clip_error
+                        )
+                        yield {
+                            "status": "error", 
+                            "message": f"Error processing clip {i+1}: {str(clip_error)}"
+                        }
+                    else:
+                        self.logger.info(f"Processed clip {i+1}/{len(planned_clips)}: {clip}")
+                        fake_accumulator.merge(
+                            FakeVideoAccumulator.from_state(clip_result.pop("fake_detection_state"))
                         )
+                        fake_clips += 1
                         running_summary = VideoProcessor.update_running_summary(
                             running_summary, clip_result
                         )
-                        
+
                         yield {
                             "status": "clip_ready",
                             "data": {
@@ -82,133 +139,51 @@ class VideoService:
                                 "running_summary": running_summary,
                             },
                         }
-                        
-                    except Exception as e:
-                        self.logger.error(f"Error processing clip {i+1}: {str(e)}", exc_info=True)
-                        yield {
-                            "status": "error", 
-                            "message": f"Error processing clip {i+1}: {str(e)}"
-                        }
-
-                # Final fake video analysis
-                fake_detection_result = detect_fake_video(temp_file)
+                    if i + 1 < len(planned_clips):
+                        yield self._clip_progress(i + 1, len(planned_clips))
+
+                # Final fake video analysis, merged from the clips' frames;
+                # clips that failed are missing from it
+                fake_detection_result = {
+                    **fake_accumulator.result(),
+                    "clips_merged": fake_clips,
+                    "clips_failed": processed_clips - fake_clips,
+                }
                 
                 yield {
                     "status": "complete",
-                    "message": f"Processing complete. Processed {len(clips)} clips.",
+                    "message": f"Processing complete. Processed {processed_clips} clips.",
                     "fake_detection_result": fake_detection_result,
                 }
 
             finally:
-                # Cleanup
-                if os.path.exists(temp_file):
+                # Stop producing clips (and the segment muxer) if the caller
+                # stopped iterating
+                if clips is not None:
+                    clips.close()
+                # Cleanup. Virtual clips are cut from the download on demand,
+                # so it stays then.
+                if not virtual_clips and os.path.exists(temp_file):
                     os.remove(temp_file)
                     self.logger.info(f"Removed temporary file: {temp_file}")
+                if source_audio is not None:
+                    source_audio.remove()
 
         except Exception as e:
             self.logger.error(f"Error in process_url: {str(e)}", exc_info=True)
             yield {"status": "error", "message": f"Error processing URL: {str(e)}"}
 
-    def _split_video(
-        self, input_file: str, output_folder: str, clip_duration: float = 30
-    ) -> List[Dict[str, Any]]:
-        """
-        Split a video file into clips of specified duration.
-        """
-        if not os.path.exists(output_folder):
-            os.makedirs(output_folder)
-
-        total_duration = get_video_duration(input_file)
-        if total_duration == 0:
-            self.logger.error(f"Could not determine duration of {input_file}")
-            return []
-
-        clips = []
-        num_clips = int(total_duration // clip_duration) + 1
-
-        for i in range(num_clips):
-            start_time = i * clip_duration
-            end_time = min((i + 1) * clip_duration, total_duration)
-            output_file = os.path.join(output_folder, f"clip_{i+1:03d}.mp4")
-            
-            try:
-                subprocess.run([
-                    'ffmpeg',
-                    '-i', input_file,
-                    '-ss', str(start_time),
-                    '-to', str(end_time),
-                    '-c', 'copy',
-                    '-y',
-                    output_file
-                ], check=True, stderr=subprocess.PIPE)
-                
-                clips.append({
-                    'filename': f"clip_{i+1:03d}.mp4",
-                    'start': start_time,
-                    'end': end_time
-                })
-            except subprocess.CalledProcessError as e:
-                self.logger.error(f"Error processing clip {i+1}: {e.stderr.decode()}")
-
-        return clips
+    @staticmethod
+    def _clip_progress(index: int, total: int) -> Dict[str, Any]:
+        """Progress update for when clip index (0-based) is the next one being processed."""
+        return {"status": "processing", "message": f"Processing clip {index+1}/{total}"}
 
     def get_video_info(self, input_file: str) -> tuple:
         """
-        Get video information using ffprobe.
+        Get (total_frames, fps, duration) from the cached media probe.
         """
-        ffprobe_cmd = [
-            'ffprobe',
-            '-v', 'error',
-            '-select_streams', 'v:0',
-            '-count_packets',
-            '-show_entries', 'stream=nb_read_packets,r_frame_rate,duration',
-            '-of', 'csv=p=0',
-            input_file
-        ]
-        
         try:
-            ffprobe_output = subprocess.check_output(
-                ffprobe_cmd, stderr=subprocess.STDOUT
-            ).decode('utf-8').strip().split(',')
-            
-            if len(ffprobe_output) < 3:
-                raise ValueError(f"Unexpected ffprobe output format: {ffprobe_output}")
-            
-            fps = float(Fraction(ffprobe_output[0]))
-            nb_packets = int(float(ffprobe_output[1])) if ffprobe_output[1] != 'N/A' else None
-            duration = float(ffprobe_output[2]) if ffprobe_output[2] != 'N/A' else None
-            
-            total_frames = (
-                nb_packets or 
-                int(duration * fps) if duration 
-                else self._count_frames_ffmpeg(input_file)
-            )
-            
-            return total_frames, fps, duration
-            
+            return get_video_info(input_file)
         except Exception as e:
             self.logger.error(f"Error in get_video_info: {str(e)}")
             raise
-
-    def _count_frames_ffmpeg(self, input_file: str) -> int:
-        """
-        Count frames using ffmpeg when other methods fail.
-        """
-        cmd = [
-            'ffmpeg',
-            '-i', input_file,
-            '-map', '0:v:0',
-            '-c', 'copy',
-            '-f', 'null',
-            '-'
-        ]
-        
-        try:
-            output = subprocess.check_output(cmd, stderr=subprocess.STDOUT).decode()
-            matches = re.search(r'frame=\s*(\d+)', output)
-            if matches:
-                return int(matches.group(1))
-            raise ValueError("Could not find frame count in ffmpeg output")
-        except subprocess.CalledProcessError as e:
-            self.logger.error(f"Error running ffmpeg: {e.output.decode('utf-8')}")
-            raise
\ No newline at end of file
@@ -0,0 +1,295 @@
+# app/utils/asr_backends.py
+
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+import speech_recognition as sr
+
+from .audio_fingerprint import FingerprintCache, fingerprint
+from .network_io import CircuitOpenError, get_io_executor
+
+DEFAULT_ASR_BACKEND = "google"
+
+# Messages speech_to_text has always returned in place of a transcript
+REQUEST_FAILED_MESSAGE = "Could not request results from speech recognition service"
+
+
+class AudioSegment:
+    """
+    A stretch of int16 PCM to transcribe.
+
+    offset is where the segment starts, in seconds from the start of the
+    clip it was taken from.
+    """
+
+    def __init__(self, samples: np.ndarray, sample_rate: int, offset: float = 0.0):
+        self.samples = samples
+        self.sample_rate = sample_rate
+        self.offset = offset
+
+    @property
+    def duration(self) -> float:
+        return len(self.samples) / self.sample_rate if self.sample_rate else 0.0
+
+    def audio_data(self) -> sr.AudioData:
+        return to_audio_data(self.samples, self.sample_rate)
+
+
+class Transcript:
+    """
+    What a backend made of one AudioSegment: its text, or the error that stopped it.
+
+    words, if the backend reports them, are {'word', 'start', 'end'} dicts
+    with times in seconds from the start of the segment.
+    """
+
+    def __init__(self, text: str = "", error: Optional[str] = None, words: Optional[List[Dict]] = None):
+        self.text = text
+        self.error = error
+        self.words = words
+
+    def timed_words(self, duration: float) -> List[Dict]:
+        """
+        Return the words with their times.
+
+        For backends without word timing the words are spread evenly over
+        duration, which is close enough to place them in the right window.
+        """
+        if self.words is not None:
+            return self.words
+        tokens = self.text.split()
+        step = duration / len(tokens) if tokens else 0
+        return [
+            {"word": token, "start": round(i * step, 3), "end": round((i + 1) * step, 3)}
+            for i, token in enumerate(tokens)
+        ]
+
+    def __repr__(self):
+        return f"Transcript({self.text!r}, error={self.error!r})"
+
+
+class ASRBackend:
+    """
+    A speech recognizer behind one interface.
+
+    transcribe_batch() takes any number of segments and returns one
+    Transcript per segment, in order. Backends that can take several
+    segments per request override it; the rest transcribe them one by one,
+    or up to max_workers at a time.
+    Failures are reported in Transcript.error rather than raised, so one
+    bad segment doesn't cost the others their results.
+    """
+
+    name = None
+
+    def transcribe(self, segment: AudioSegment) -> Transcript:
+        raise NotImplementedError
+
+    def transcribe_batch(self, segments: List[AudioSegment], max_workers: int = 1) -> List[Transcript]:
+        if max_workers > 1 and len(segments) > 1:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(segments)),
+                                    thread_name_prefix=f"asr-{self.name}") as executor:
+                return list(executor.map(self._transcribe_safely, segments))
+        return [self._transcribe_safely(segment) for segment in segments]
+
+    def _transcribe_safely(self, segment: AudioSegment) -> Transcript:
+        try:
+            return self.transcribe(segment)
+        except Exception as e:
+            logging.error(f"{self.name} speech recognition failed: {str(e)}")
+            return Transcript(error=f"Error processing audio: {str(e)}")
+
+
+class RecognizerBackend(ASRBackend):
+    """Base for the engines speech_recognition wraps; one Recognizer is kept per backend."""
+
+    def __init__(self, language: str = "en-US"):
+        self.language = language
+        self.recognizer = sr.Recognizer()
+
+    def transcribe(self, segment: AudioSegment) -> Transcript:
+        try:
+            result = self.recognize(segment.audio_data())
+            if isinstance(result, tuple):
+                text, words = result
+                return Transcript(text, words=words)
+            return Transcript(result)
+        except sr.UnknownValueError:
+            return Transcript("")
+        except (sr.RequestError, CircuitOpenError) as e:
+            logging.error(f"{self.name} speech recognition request failed: {str(e)}")
+            return Transcript(error=REQUEST_FAILED_MESSAGE)
+
+    def recognize(self, audio: sr.AudioData):
+        """Return the text, or (text, words) if the engine times its words."""
+        raise NotImplementedError
+
+
+class GoogleASRBackend(RecognizerBackend):
+    """
+    The Google Web Speech API, one request per segment.
+
+    Requests go through the process's "asr" RemoteService: limited in
+    number, retried on request errors and cut off while the service is down.
+    """
+
+    name = "google"
+
+    def recognize(self, audio):
+        return get_io_executor().call("asr", self.recognizer.recognize_google, audio,
+                                      language=self.language, retry_on=(sr.RequestError,))
+
+
+class SphinxASRBackend(RecognizerBackend):
+    """
+    CMU PocketSphinx, running locally: for air-gapped machines and benchmark runs.
+
+    Needs the optional pocketsphinx package; without it every segment comes
+    back with REQUEST_FAILED_MESSAGE.
+    """
+
+    name = "sphinx"
+    FRAMES_PER_SECOND = 100  # PocketSphinx's default frame rate
+
+    def recognize(self, audio):
+        decoder = self.recognizer.recognize_sphinx(audio, language=self.language, show_all=True)
+        hypothesis = decoder.hyp()
+        if hypothesis is None or not hypothesis.hypstr:
+            raise sr.UnknownValueError()
+
+        words = []
+        for seg in decoder.seg():
+            word = seg.word.split("(")[0]  # "word(2)" names an alternate pronunciation
+            if word.startswith(("<", "[")):  # silences and noise fillers
+                continue
+            start = getattr(seg, "start_frame", getattr(seg, "start", 0))
+            end = getattr(seg, "end_frame", None)
+            if end is None:
+                end = start + getattr(seg, "duration", 0)
+            words.append({
+                "word": word,
+                "start": round(start / self.FRAMES_PER_SECOND, 3),
+                "end": round(end / self.FRAMES_PER_SECOND, 3),
+            })
+        return hypothesis.hypstr, words
+
+
+class StubASRBackend(ASRBackend):
+    """
+    A deterministic stand-in for tests and dry runs: no model, no network.
+
+    Each segment is "transcribed" to a fixed text, or by default to a
+    digest of its samples, so identical audio gives identical transcripts.
+    Silent segments give an empty transcript, like a real recognizer.
+    """
+
+    name = "stub"
+
+    def __init__(self, text: Optional[str] = None):
+        self.text = text
+        self.batches = []  # sizes of the batches received, for tests
+
+    def transcribe_batch(self, segments, max_workers=1):
+        self.batches.append(len(segments))
+        return super().transcribe_batch(segments, max_workers)
+
+    def transcribe(self, segment):
+        samples = np.ascontiguousarray(segment.samples)
+        if not samples.any():
+            return Transcript("")
+        if self.text is not None:
+            return Transcript(self.text)
+        digest = hashlib.sha1(samples.tobytes()).hexdigest()[:8]
+        return Transcript(f"speech {digest} {segment.duration:.2f}s")
+
+
+class CachedASRBackend(ASRBackend):
+    """
+    Wraps a backend with a FingerprintCache, so audio heard before isn't sent again.
+
+    Each segment is fingerprinted and looked up first; only the misses go
+    to the wrapped backend, still as one batch, and what it recognizes is
+    stored for next time. Intros, jingles and recurring ads are then
+    recognized once. Segments shorter than MIN_DURATION have too few peaks
+    to match reliably and always go to the backend.
+    """
+
+    MIN_DURATION = 2.0  # seconds
+
+    def __init__(self, backend: ASRBackend, cache: FingerprintCache):
+        self.backend = backend
+        self.cache = cache
+        self.name = backend.name
+
+    def transcribe_batch(self, segments, max_workers=1):
+        transcripts = [None] * len(segments)
+        misses = []
+        for i, segment in enumerate(segments):
+            hashes = fingerprint(segment.samples, segment.sample_rate) if segment.duration >= self.MIN_DURATION else None
+            cached = self.cache.lookup(hashes, segment.duration, segment.sample_rate, self.name) if hashes is not None else None
+            if cached is not None:
+                transcripts[i] = Transcript(cached['text'], words=cached['words'])
+            else:
+                misses.append((i, hashes))
+
+        if misses:
+            recognized = self.backend.transcribe_batch([segments[i] for i, _ in misses], max_workers)
+            for (i, hashes), transcript in zip(misses, recognized):
+                transcripts[i] = transcript
+                if hashes is not None and not transcript.error:
+                    segment = segments[i]
+                    self.cache.store(hashes, segment.duration, segment.sample_rate, self.name,
+                                     transcript.text, transcript.words)
+
+        logging.info(f"ASR cache: {len(segments) - len(misses)}/{len(segments)} segments reused, "
+                     f"hit rate {self.cache.stats()['hit_rate']:.0%}")
+        return transcripts
+
+    def transcribe(self, segment):
+        return self.transcribe_batch([segment])[0]
+
+    def stats(self) -> Dict:
+        return self.cache.stats()
+
+
+ASR_BACKENDS = {
+    backend.name: backend
+    for backend in (GoogleASRBackend, SphinxASRBackend, StubASRBackend)
+}
+
+_backends: Dict = {}
+
+
+def get_asr_backend(name: Optional[str] = None, cache: Optional[Dict] = None) -> ASRBackend:
+    """
+    Return the backend registered under name, created once per process.
+
+    Names and settings rather than instances are passed around, so clips
+    processed in worker processes each get the backend of their own
+    process. cache holds ASR_CACHE settings ('path' of the SQLite file and
+    optionally 'min_match' and 'max_recordings'); with it the backend is wrapped in a
+    CachedASRBackend.
+    """
+    name = name or DEFAULT_ASR_BACKEND
+    if name not in ASR_BACKENDS:
+        raise ValueError(f"Unknown ASR backend: {name}")
+    if name not in _backends:
+        _backends[name] = ASR_BACKENDS[name]()
+    if not cache:
+        return _backends[name]
+
+    key = (name, cache['path'])
+    if key not in _backends:
+        fingerprint_cache = FingerprintCache(cache['path'], **{k: v for k, v in cache.items() if k != 'path'})
+        _backends[key] = CachedASRBackend(_backends[name], fingerprint_cache)
+    return _backends[key]
+
+
+def to_audio_data(samples, sample_rate):
+    """Wrap int16 PCM samples as an sr.AudioData, mixing multichannel audio down to mono."""
+    if samples.ndim > 1:
+        samples = samples.mean(axis=1).astype(np.int16)
+    return sr.AudioData(np.ascontiguousarray(samples).tobytes(), sample_rate, 2)
@@ -0,0 +1,119 @@
+# app/utils/asr_windowing.py
+
+import logging
+from typing import Dict, List, Optional
+
+from .asr_backends import ASRBackend, AudioSegment, Transcript
+
+DEFAULT_WINDOW = 30.0  # seconds; comfortably below what the web ASR services accept per request
+DEFAULT_OVERLAP = 2.0  # seconds shared by consecutive windows, so no word is cut in half
+DEFAULT_WINDOW_WORKERS = 4
+# Slack around the overlap when looking for repeated words, for backends
+# whose word times are estimated
+OVERLAP_SLACK = 1.0  # seconds
+
+
+def split_windows(segment: AudioSegment, window: float = DEFAULT_WINDOW,
+                  overlap: float = DEFAULT_OVERLAP) -> List[AudioSegment]:
+    """
+    Cut a segment into windows of at most window seconds, each overlapping the previous one.
+
+    Windows are views of the segment's samples; their offsets are relative
+    to the same clip as the segment's. A segment no longer than window is
+    returned as it is.
+    """
+    if segment.duration <= window:
+        return [segment]
+    rate = segment.sample_rate
+    size = int(window * rate)
+    step = max(size - int(overlap * rate), 1)
+    windows = []
+    for first in range(0, len(segment.samples), step):
+        windows.append(AudioSegment(segment.samples[first:first + size], rate, segment.offset + first / rate))
+        if first + size >= len(segment.samples):
+            break
+    return windows
+
+
+def stitch_transcripts(windows: List[AudioSegment], transcripts: List[Transcript]) -> Transcript:
+    """
+    Join the transcripts of overlapping windows into one, with word times relative to the clip.
+
+    Where two windows overlap, the words both of them heard are kept once:
+    the longest run of words ending the first transcript and starting the
+    second is dropped from the second. If none match (the recognizer heard
+    the overlap differently), the overlap is split at its midpoint and each
+    window keeps the words it heard on its side.
+
+    Windows that failed are skipped; the result only carries an error if
+    every window failed.
+    """
+    words = []
+    previous_end = None
+    for window, transcript in zip(windows, transcripts):
+        if transcript.error:
+            logging.warning(f"ASR window at {window.offset:.1f}s failed: {transcript.error}")
+            previous_end = None
+            continue
+        window_words = [
+            {**word, "start": round(word["start"] + window.offset, 3), "end": round(word["end"] + window.offset, 3)}
+            for word in transcript.timed_words(window.duration)
+        ]
+        if words and previous_end is not None and window.offset < previous_end:
+            window_words = _drop_overlap(words, window_words, window.offset, previous_end)
+        words.extend(window_words)
+        previous_end = window.offset + window.duration
+
+    errors = [t.error for t in transcripts if t.error]
+    if errors and len(errors) == len(transcripts):
+        return Transcript(error=errors[0])
+    return Transcript(" ".join(word["word"] for word in words), words=words)
+
+
+def transcribe_windowed(backend: ASRBackend, segments: List[AudioSegment], window: float = DEFAULT_WINDOW,
+                        overlap: float = DEFAULT_OVERLAP,
+                        workers: int = DEFAULT_WINDOW_WORKERS) -> List[Transcript]:
+    """
+    Transcribe segments of any length as overlapping windows.
+
+    The windows of all segments go to the backend as one batch, up to
+    workers of them recognized at a time, and are stitched back per segment.
+
+    Returns:
+        One Transcript per segment, word times relative to the segment's clip
+    """
+    windowed = [split_windows(segment, window, overlap) for segment in segments]
+    batch = [w for windows in windowed for w in windows]
+    if len(batch) > len(segments):
+        logging.info(f"Transcribing {len(segments)} audio segments as {len(batch)} windows")
+    transcripts = iter(backend.transcribe_batch(batch, max_workers=workers))
+    return [stitch_transcripts(windows, [next(transcripts) for _ in windows]) for windows in windowed]
+
+
+def window_options(config: Optional[Dict]) -> Dict:
+    """Turn an ASR_WINDOW config dict into transcribe_windowed keyword arguments."""
+    config = config or {}
+    return {
+        "window": config.get("window", DEFAULT_WINDOW),
+        "overlap": config.get("overlap", DEFAULT_OVERLAP),
+        "workers": config.get("workers", DEFAULT_WINDOW_WORKERS),
+    }
+
+
+def _drop_overlap(kept: List[Dict], incoming: List[Dict], overlap_start: float, overlap_end: float) -> List[Dict]:
+    """Return the incoming words that aren't a repeat of the end of kept, trimming kept if needed."""
+    kept_tail = [_normalize(w["word"]) for w in kept if w["end"] > overlap_start - OVERLAP_SLACK]
+    incoming_head = [_normalize(w["word"]) for w in incoming if w["start"] < overlap_end + OVERLAP_SLACK]
+    for length in range(min(len(kept_tail), len(incoming_head)), 0, -1):
+        if kept_tail[-length:] == incoming_head[:length]:
+            return incoming[length:]
+
+    # No words in common: the earlier window owns the overlap up to its midpoint
+    midpoint = (overlap_start + overlap_end) / 2
+    while kept and kept[-1]["start"] >= midpoint:
+        kept.pop()
+    return [word for word in incoming if word["start"] >= midpoint]
+
+
+def _normalize(word: str) -> str:
+    return word.lower().strip(".,!?;:\"'")
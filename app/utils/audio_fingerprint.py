@@ -0,0 +1,215 @@
+# app/utils/audio_fingerprint.py
+
+import json
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+import numpy as np
+
+FFT_SIZE = 512  # 32 ms at 16 kHz
+HOP_SIZE = 256
+# Neighbourhood a spectrogram point has to be the maximum of to count as a peak
+PEAK_TIME_RADIUS = 6  # frames
+PEAK_FREQ_RADIUS = 12  # bins
+# How far above the median level of the clip a peak has to be
+PEAK_MIN_DB = 10.0
+# Each peak is paired with the next FAN_OUT peaks up to MAX_PAIR_FRAMES later
+FAN_OUT = 5
+MAX_PAIR_FRAMES = 63
+# Frequencies and time differences are hashed at half resolution, so a peak
+# landing one bin or frame off after re-encoding still gives the same hash
+QUANTIZE_SHIFT = 1
+
+# Share of hashes two recordings must have in common. A hit returns the
+# whole stored transcript, so only near-identical audio may match: two clips
+# sharing half their audio (the same intro, different news) score about 0.5,
+# unrelated audio a few percent
+DEFAULT_MIN_MATCH = 0.6
+DEFAULT_DURATION_TOLERANCE = 0.1  # relative difference in duration still considered the same audio
+# Recordings kept; past that the least recently matched ones are dropped
+DEFAULT_MAX_RECORDINGS = 10000
+# Tables of an older layout are dropped and recreated (it's only a cache)
+SCHEMA_VERSION = 2
+
+
+def spectral_peaks(samples: np.ndarray, sample_rate: int):
+    """
+    Find the local maxima of the log spectrogram of int16 PCM.
+
+    Returns:
+        (frames, bins) arrays of the peaks, sorted by frame
+    """
+    if samples.ndim > 1:
+        samples = samples.mean(axis=1)
+    if len(samples) < FFT_SIZE:
+        return np.empty(0, dtype=int), np.empty(0, dtype=int)
+
+    windows = np.lib.stride_tricks.sliding_window_view(np.asarray(samples, dtype=np.float32), FFT_SIZE)[::HOP_SIZE]
+    spectrum = 20 * np.log10(np.abs(np.fft.rfft(windows * np.hanning(FFT_SIZE).astype(np.float32), axis=1)) + 1e-6)
+
+    neighbourhood = _sliding_max(_sliding_max(spectrum, PEAK_TIME_RADIUS, axis=0), PEAK_FREQ_RADIUS, axis=1)
+    peaks = (spectrum == neighbourhood) & (spectrum > np.median(spectrum) + PEAK_MIN_DB)
+    return np.nonzero(peaks)
+
+
+def fingerprint(samples: np.ndarray, sample_rate: int) -> np.ndarray:
+    """
+    Hash the constellation of spectral peaks of a recording.
+
+    Every peak is paired with a few of the peaks following it and each
+    pair packs (anchor frequency, target frequency, time between them) into
+    one integer. Such pairs are largely unaffected by re-encoding and
+    level changes, and don't depend on where in the clip the audio starts.
+    Hashes are only comparable between recordings at the same sample_rate.
+
+    Returns:
+        Sorted unique uint32 hashes
+    """
+    frames, bins = spectral_peaks(samples, sample_rate)
+    hashes = []
+    for step in range(1, FAN_OUT + 1):
+        dt = frames[step:] - frames[:-step]
+        pairs = (dt > 0) & (dt <= MAX_PAIR_FRAMES)
+        anchor, target = bins[:-step][pairs] >> QUANTIZE_SHIFT, bins[step:][pairs] >> QUANTIZE_SHIFT
+        hashes.append(
+            (anchor.astype(np.uint32) << 16) | (target.astype(np.uint32) << 8)
+            | (dt[pairs] >> QUANTIZE_SHIFT).astype(np.uint32)
+        )
+    return np.unique(np.concatenate(hashes)) if hashes else np.empty(0, dtype=np.uint32)
+
+
+class FingerprintCache:
+    """
+    A persistent table from audio fingerprints to the transcripts recognized for them.
+
+    Backed by SQLite, so it is shared between worker processes and kept
+    between runs. lookup() finds a stored recording of about the same
+    duration that shares at least min_match of its hashes with the query;
+    hit and miss counts are kept per instance. store() updates the
+    recording it would match instead of adding another, and beyond
+    max_recordings drops the ones least recently matched.
+    """
+
+    def __init__(self, path: str, min_match: float = DEFAULT_MIN_MATCH,
+                 duration_tolerance: float = DEFAULT_DURATION_TOLERANCE,
+                 max_recordings: int = DEFAULT_MAX_RECORDINGS):
+        self.path = path
+        self.min_match = min_match
+        self.duration_tolerance = duration_tolerance
+        self.max_recordings = max_recordings
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self._db:
+            if self._db.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                self._db.executescript("""
+                    DROP TABLE IF EXISTS recordings;
+                    DROP TABLE IF EXISTS hashes;
+                """)
+                self._db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            self._db.executescript("""
+                CREATE TABLE IF NOT EXISTS recordings (
+                    id INTEGER PRIMARY KEY,
+                    backend TEXT NOT NULL,
+                    sample_rate INTEGER NOT NULL,
+                    duration REAL NOT NULL,
+                    hash_count INTEGER NOT NULL,
+                    text TEXT NOT NULL,
+                    words TEXT,
+                    last_used REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS hashes (
+                    hash INTEGER NOT NULL,
+                    recording_id INTEGER NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS hashes_by_hash ON hashes (hash);
+                CREATE INDEX IF NOT EXISTS hashes_by_recording ON hashes (recording_id);
+                CREATE INDEX IF NOT EXISTS recordings_by_use ON recordings (last_used);
+            """)
+
+    def lookup(self, hashes: np.ndarray, duration: float, sample_rate: int, backend: str) -> Optional[Dict]:
+        """
+        Return {'text', 'words'} stored for a recording matching hashes, or None.
+        """
+        match = None
+        if len(hashes):
+            with self._lock, self._db:
+                match = self._match(hashes, duration, sample_rate, backend)
+                if match:
+                    self._db.execute("UPDATE recordings SET last_used = ? WHERE id = ?", (time.time(), match[0]))
+            # Leaving the transaction releases the lock other processes' store() waits for
+
+        if match:
+            self.hits += 1
+            return {'text': match[1], 'words': json.loads(match[2]) if match[2] else None}
+        self.misses += 1
+        return None
+
+    def store(self, hashes: np.ndarray, duration: float, sample_rate: int, backend: str,
+              text: str, words=None) -> None:
+        if not len(hashes):
+            return
+        words = json.dumps(words) if words is not None else None
+        with self._lock, self._db:
+            # Another process (or an earlier segment of the batch) may have
+            # stored the same audio since the lookup missed
+            match = self._match(hashes, duration, sample_rate, backend)
+            if match:
+                self._db.execute("UPDATE recordings SET text = ?, words = ?, last_used = ? WHERE id = ?",
+                                 (text, words, time.time(), match[0]))
+                return
+            cursor = self._db.execute(
+                "INSERT INTO recordings (backend, sample_rate, duration, hash_count, text, words, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (backend, sample_rate, duration, len(hashes), text, words, time.time())
+            )
+            self._db.executemany("INSERT INTO hashes VALUES (?, ?)",
+                                 ((int(h), cursor.lastrowid) for h in hashes))
+            self._evict()
+
+    def _match(self, hashes: np.ndarray, duration: float, sample_rate: int, backend: str):
+        """(id, text, words) of the best stored recording sharing min_match of hashes, or None."""
+        self._db.execute("CREATE TEMP TABLE IF NOT EXISTS query (hash INTEGER)")
+        self._db.execute("DELETE FROM query")
+        self._db.executemany("INSERT INTO query VALUES (?)", ((int(h),) for h in hashes))
+        match = self._db.execute("""
+            SELECT r.id, r.text, r.words, COUNT(*) * 1.0 / MAX(r.hash_count, ?) AS score
+            FROM query q
+            JOIN hashes h ON h.hash = q.hash
+            JOIN recordings r ON r.id = h.recording_id
+            WHERE r.backend = ? AND r.sample_rate = ? AND ABS(r.duration - ?) <= ? * ?
+            GROUP BY r.id
+            ORDER BY score DESC
+            LIMIT 1
+        """, (len(hashes), backend, sample_rate, duration, self.duration_tolerance, duration)).fetchone()
+        return match[:3] if match and match[3] >= self.min_match else None
+
+    def _evict(self):
+        excess = self._db.execute("SELECT COUNT(*) FROM recordings").fetchone()[0] - self.max_recordings
+        if excess <= 0:
+            return
+        stale = "SELECT id FROM recordings ORDER BY last_used LIMIT ?"
+        self._db.execute(f"DELETE FROM hashes WHERE recording_id IN ({stale})", (excess,))
+        self._db.execute(f"DELETE FROM recordings WHERE id IN ({stale})", (excess,))
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+    def close(self):
+        self._db.close()
+
+
+def _sliding_max(values: np.ndarray, radius: int, axis: int) -> np.ndarray:
+    """Maximum over a window of 2 * radius + 1 along axis, same shape as values."""
+    pad = [(0, 0)] * values.ndim
+    pad[axis] = (radius, radius)
+    padded = np.pad(values, pad, mode='constant', constant_values=-np.inf)
+    return np.lib.stride_tricks.sliding_window_view(padded, 2 * radius + 1, axis=axis).max(axis=-1)
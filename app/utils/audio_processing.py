@@ -1,50 +1,240 @@
+import os
 import subprocess
+import numpy as np
 import speech_recognition as sr
 
-from flask import current_app
-
 import logging
 
-def extract_audio(video_path, audio_path):
+from .asr_backends import DEFAULT_ASR_BACKEND, AudioSegment, get_asr_backend
+from .asr_windowing import transcribe_windowed, window_options
+from .voice_activity import detect_speech, speech_samples
+
+# PCM handed to the recognizer: what the ASR service works in natively, so
+# nothing is resampled twice or uploaded at a rate it throws away. All the
+# built-in backends take 16 kHz mono; ASR_AUDIO_FORMATS only lists the ones
+# that differ.
+DEFAULT_AUDIO_FORMAT = {'sample_rate': 16000, 'channels': 1}
+ASR_AUDIO_FORMATS = {}
+# Clips transcribe_clips decodes and sends per backend call
+CLIP_BATCH_SIZE = 8
+
+def asr_audio_format(config, backend=None):
+    """
+    Return the {'sample_rate', 'channels'} an ASR backend wants, from config or the defaults.
+
+    backend defaults to the configured ASR_BACKEND.
+    """
+    backend = backend or config.get('ASR_BACKEND') or DEFAULT_ASR_BACKEND
+    formats = config.get('ASR_AUDIO_FORMATS') or ASR_AUDIO_FORMATS
+    return {**DEFAULT_AUDIO_FORMAT, **formats.get(backend, {})}
+
+def decode_audio(video_path, start=None, end=None, sample_rate=16000, channels=1):
+    """
+    Decode the audio of a video (or a time range of one) to 16-bit PCM in memory.
+
+    ffmpeg resamples to the requested rate and channel count and writes raw
+    samples to a pipe, so no WAV file is written or read back.
+
+    Returns:
+        int16 array of shape (samples,) for mono or (samples, channels),
+        or None if decoding failed
+    """
+    range_args = []
+    if start:
+        range_args += ['-ss', str(start)]
+    if end is not None:
+        range_args += ['-t', str(end - (start or 0))]
+
+    command = [
+        'ffmpeg',
+        *range_args,
+        '-i', video_path,
+        '-vn',  # Disable video
+        '-f', 's16le',
+        '-acodec', 'pcm_s16le',
+        '-ar', str(sample_rate),
+        '-ac', str(channels),
+        'pipe:1'
+    ]
     try:
+        result = subprocess.run(command, capture_output=True, check=True)
+    except subprocess.CalledProcessError as e:
+        logging.error(f"FFmpeg error: {e.stderr.decode(errors='replace')}")
+        return None
+    except Exception as e:
+        logging.error(f"Unexpected error in audio decoding: {str(e)}")
+        return None
+
+    samples = np.frombuffer(result.stdout, dtype=np.int16)
+    if channels > 1:
+        samples = samples[:len(samples) - len(samples) % channels].reshape(-1, channels)
+    logging.info(f"Decoded {len(samples) / sample_rate:.1f}s of audio from {video_path}")
+    return samples
+
+class SourceAudio:
+    """
+    The whole soundtrack of a source, decoded once to a raw PCM file and memory-mapped.
+
+    Each clip's audio is then a slice of the mapping by sample offset: no
+    per-clip ffmpeg run and no copy. Only the file location and format are
+    pickled, so a SourceAudio can be handed to worker processes, which map
+    the file themselves.
+    """
+
+    FILENAME = "source_audio.pcm"
+
+    def __init__(self, path, sample_rate=16000, channels=1):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self._samples = None
+
+    @classmethod
+    def decode(cls, video_path, output_folder, sample_rate=16000, channels=1):
+        """
+        Decode the audio of video_path into output_folder.
+
+        Returns:
+            SourceAudio, or None if the source has no decodable audio
+        """
+        path = os.path.join(output_folder, cls.FILENAME)
         command = [
             'ffmpeg',
             '-i', video_path,
             '-vn',  # Disable video
-            '-acodec', 'pcm_s16le',  # Audio codec
-            '-ar', '44100',  # Audio sampling rate
-            '-ac', '2',  # Number of audio channels
-            '-y',  # Overwrite output file if it exists
-            audio_path
+            '-f', 's16le',
+            '-acodec', 'pcm_s16le',
+            '-ar', str(sample_rate),
+            '-ac', str(channels),
+            '-y',
+            path
         ]
-        
-        result = subprocess.run(command, capture_output=True, text=True, check=True)
-        
-        if result.returncode == 0:
-            logging.info(f"Audio extracted successfully: {audio_path}")
-            return True
-        else:
-            logging.error(f"Error extracting audio: {result.stderr}")
-            return False
-    
-    except subprocess.CalledProcessError as e:
-        logging.error(f"FFmpeg error: {e.stderr}")
-        return False
-    except Exception as e:
-        logging.error(f"Unexpected error in audio extraction: {str(e)}")
-        return False
-    
-def speech_to_text(audio_path):
-    recognizer = sr.Recognizer()
-    try:
-        with sr.AudioFile(audio_path) as source:
-            audio = recognizer.record(source)
         try:
-            return recognizer.recognize_google(audio)
-        except sr.UnknownValueError:
-            return ""
-        except sr.RequestError:
-            return "Could not request results from speech recognition service"
+            subprocess.run(command, capture_output=True, check=True)
+        except subprocess.CalledProcessError as e:
+            logging.error(f"FFmpeg error decoding source audio: {e.stderr.decode(errors='replace')}")
+            return None
+        except Exception as e:
+            logging.error(f"Unexpected error decoding source audio: {str(e)}")
+            return None
+        if not os.path.getsize(path):
+            os.remove(path)
+            return None
+
+        logging.info(f"Decoded source audio of {video_path} to {path}")
+        return cls(path, sample_rate, channels)
+
+    @property
+    def samples(self):
+        if self._samples is None:
+            samples = np.memmap(self.path, dtype=np.int16, mode='r')
+            if self.channels > 1:
+                samples = samples[:len(samples) - len(samples) % self.channels].reshape(-1, self.channels)
+            self._samples = samples
+        return self._samples
+
+    def slice(self, start=None, end=None):
+        """Return the samples between start and end (in seconds) as a view of the mapping."""
+        first = int(round((start or 0) * self.sample_rate))
+        last = int(round(end * self.sample_rate)) if end is not None else None
+        return self.samples[first:last]
+
+    def remove(self):
+        self._samples = None
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def __getstate__(self):
+        return {**self.__dict__, '_samples': None}
+
+def transcribe_speech(sample_arrays, sample_rate, backend=None, window=None, cache=None):
+    """
+    Transcribe int16 PCM arrays at sample_rate in one backend call.
+
+    With window (the ASR_WINDOW settings, see window_options), long audio is
+    recognized as overlapping windows, several at a time, and stitched back
+    together. Without it every array goes to the backend whole. cache (the
+    ASR_CACHE settings) reuses transcripts of audio recognized before.
+
+    Returns:
+        One Transcript per array
+    """
+    segments = [AudioSegment(samples, sample_rate) for samples in sample_arrays]
+    backend = get_asr_backend(backend, cache)
+    if window is not None:
+        return transcribe_windowed(backend, segments, **window_options(window))
+    return backend.transcribe_batch(segments)
+
+def speech_to_text(audio, sample_rate=None, backend=None, window=None, cache=None):
+    """
+    Transcribe audio given as a file path, an sr.AudioData, or int16 PCM samples at sample_rate.
+
+    backend names the ASR backend to use (see get_asr_backend), window and
+    cache enable windowed recognition and the transcript cache (see
+    transcribe_speech). Returns the
+    transcript, "" if nothing was recognized, or a message saying what failed.
+    """
+    try:
+        if isinstance(audio, str):
+            with sr.AudioFile(audio) as source:
+                audio = sr.Recognizer().record(source)
+        if isinstance(audio, sr.AudioData):
+            sample_rate = audio.sample_rate
+            audio = np.frombuffer(audio.get_raw_data(convert_width=2), dtype=np.int16)
+        transcript = transcribe_speech([audio], sample_rate, backend, window, cache)[0]
+        return transcript.error if transcript.error else transcript.text
     except Exception as e:
-        current_app.logger.error(f"Error in speech_to_text: {str(e)}")
+        logging.error(f"Error in speech_to_text: {str(e)}")
         return f"Error processing audio: {str(e)}"
+
+def speech_to_text_batch(sample_arrays, sample_rate, backend=None, window=None, cache=None):
+    """
+    Transcribe several int16 PCM arrays at sample_rate in one backend call.
+
+    Returns one result per array, as speech_to_text would have returned it.
+    """
+    try:
+        transcripts = transcribe_speech(sample_arrays, sample_rate, backend, window, cache)
+        return [transcript.error if transcript.error else transcript.text for transcript in transcripts]
+    except Exception as e:
+        logging.error(f"Error in speech_to_text_batch: {str(e)}")
+        return [f"Error processing audio: {str(e)}"] * len(sample_arrays)
+
+def transcribe_clips(clip_paths, audio_format=None, voice_activity=None, backend=None, window=None,
+                     cache=None, batch_size=CLIP_BATCH_SIZE):
+    """
+    Transcribe the audio of clip files, batch_size clips per backend call.
+
+    A batch is only decoded when its turn comes, so no more than batch_size
+    clips' audio is held at once. With voice_activity (detect_speech
+    settings) only the speech spans are sent to the recognizer and clips
+    without speech skip it, as in VideoProcessor.process_speech.
+
+    Yields:
+        (clip_path, speech_text) in the order of clip_paths, speech_text as
+        speech_to_text would have returned it
+    """
+    audio_format = {**DEFAULT_AUDIO_FORMAT, **(audio_format or {})}
+    sample_rate = audio_format['sample_rate']
+    for first in range(0, len(clip_paths), batch_size):
+        batch = clip_paths[first:first + batch_size]
+        texts = {}
+        speech = {}
+        for clip_path in batch:
+            samples = decode_audio(clip_path, **audio_format)
+            if samples is None:
+                texts[clip_path] = "Audio extraction failed. No speech recognition performed."
+                continue
+            if voice_activity is not None:
+                spans = detect_speech(samples, sample_rate, **voice_activity)['spans']
+                samples = speech_samples(samples, sample_rate, spans)
+            if len(samples):
+                speech[clip_path] = samples
+            else:
+                logging.info(f"No speech detected in {clip_path}, skipping speech recognition")
+                texts[clip_path] = ""
+        if speech:
+            texts.update(zip(speech, speech_to_text_batch(list(speech.values()), sample_rate,
+                                                          backend, window, cache)))
+        for clip_path in batch:
+            yield clip_path, texts[clip_path]
@@ -0,0 +1,136 @@
+# app/utils/clip_pipeline.py
+
+import multiprocessing
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple, TypeVar
+
+T = TypeVar('T')
+
+DEFAULT_QUEUE_SIZE = 2
+
+_DONE = object()
+
+
+def prefetch(iterable: Iterable[T], maxsize: int = DEFAULT_QUEUE_SIZE,
+             sources: Iterable[Iterator] = ()) -> Iterator[T]:
+    """
+    Iterate over iterable in a background thread, handing items over through a bounded queue.
+
+    Used to overlap producing clips (cutting them, or decoding their audio)
+    with analyzing them: while the caller works on clip N, the producer is
+    already on clip N+1, but never more than maxsize clips ahead.
+    Exceptions raised by the producer are re-raised in the caller once the
+    items produced before them have been consumed.
+
+    When the producer stops, iterable is closed, and so is every generator in
+    sources. Pass the generators iterable is built on (e.g. the segment
+    muxer's, see iter_split_segments): closing a generator expression doesn't
+    close the iterator it reads from, so its ffmpeg process would run until
+    garbage collection. Closing them from the producer thread is the only
+    safe place, as a generator can't be closed while another thread is
+    running it.
+    """
+    items = queue.Queue(maxsize=max(maxsize, 1))
+    stop = threading.Event()
+
+    def put(item):
+        # Give up when the consumer has gone away instead of blocking forever
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        iterator = iter(iterable)
+        try:
+            for item in iterator:
+                if not put((item, None)):
+                    return
+            put((_DONE, None))
+        except BaseException as e:
+            put((_DONE, e))
+        finally:
+            for source in (iterator, *sources):
+                close = getattr(source, 'close', None)
+                if close is not None:
+                    close()
+
+    producer = threading.Thread(target=produce, name="clip-producer", daemon=True)
+    producer.start()
+
+    try:
+        while True:
+            item, error = items.get()
+            if item is _DONE:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stop.set()
+
+
+def process_clips_ordered(clips: Iterable[Dict], process: Callable[[Dict], Dict],
+                          max_workers: int = 1,
+                          max_pending: Optional[int] = None) -> Iterator[Tuple[int, Dict, Optional[Dict], Optional[Exception]]]:
+    """
+    Run process(clip) over clips and yield (index, clip, result, error) in clip order.
+
+    With max_workers > 1 the clips are analyzed in a process pool. Finished
+    results wait in a reorder buffer until every earlier clip has been
+    yielded, so callers can stream them and fold them into a running summary
+    exactly as in the serial case. A clip that fails is yielded with its
+    exception and does not hold up the others.
+
+    Args:
+        clips: Clip dicts, typically from prefetch
+        process: Picklable callable analyzing one clip
+        max_workers: Number of worker processes; 1 runs everything in-process
+        max_pending: Max clips submitted ahead of the next one to yield
+            (defaults to twice max_workers)
+    """
+    if max_workers <= 1:
+        for index, clip in enumerate(clips):
+            try:
+                yield index, clip, process(clip), None
+            except Exception as e:
+                yield index, clip, None, e
+        return
+
+    max_pending = max_pending or 2 * max_workers
+    # spawn rather than fork: the parent runs the producer thread and may
+    # hold model/library state that is not fork-safe
+    context = multiprocessing.get_context("spawn")
+    executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=context)
+    try:
+        clip_iterator = enumerate(clips)
+        reorder_buffer = {}  # index -> (clip, future)
+        next_index = 0
+        exhausted = False
+
+        while True:
+            while not exhausted and len(reorder_buffer) < max_pending:
+                try:
+                    index, clip = next(clip_iterator)
+                except StopIteration:
+                    exhausted = True
+                    break
+                reorder_buffer[index] = (clip, executor.submit(process, clip))
+
+            if next_index not in reorder_buffer:
+                return
+
+            clip, future = reorder_buffer.pop(next_index)
+            try:
+                yield next_index, clip, future.result(), None
+            except Exception as e:
+                yield next_index, clip, None, e
+            next_index += 1
+    finally:
+        # Don't keep analyzing clips nobody will read if the consumer stops early
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,277 @@
+# app/utils/clip_planning.py
+
+import bisect
+import logging
+import re
+import subprocess
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .media_probe import MediaInfo
+
+DEFAULT_SNAP_TOLERANCE = 2.0  # seconds
+
+PLANNER_FIXED = "fixed"
+PLANNER_CONTENT = "content"
+
+# Content planner window relative to the requested clip duration, used when
+# no explicit min/max duration is configured
+CONTENT_MIN_FACTOR = 0.5
+CONTENT_MAX_FACTOR = 1.5
+
+DEFAULT_SCENE_THRESHOLD = 0.3
+DEFAULT_SILENCE_NOISE_DB = -30
+DEFAULT_MIN_SILENCE = 0.4  # seconds
+# Scene scores are computed on frames scaled down to this width; cuts are
+# just as visible at this size and the filter work becomes negligible.
+SCENE_ANALYSIS_WIDTH = 160
+
+_SHOWINFO_PTS = re.compile(r"\[Parsed_showinfo_\d+ @ [^\]]+\] n:\s*\d+ .*?pts_time:\s*([\d.]+)")
+_SILENCE_START = re.compile(r"silence_start:\s*(-?[\d.]+)")
+_SILENCE_END = re.compile(r"silence_end:\s*([\d.]+)")
+
+
+def get_keyframe_index(input_file: str) -> Dict:
+    """
+    Return the keyframe timestamps and duration of a video.
+
+    Comes from the cached media probe, so the packet index is only read once
+    per input.
+
+    Returns:
+        Dict with 'keyframes' (sorted pts times in seconds) and 'duration'
+    """
+    info = MediaInfo.probe(input_file)
+    return {'keyframes': info.keyframes, 'duration': info.duration}
+
+
+def snap_to_keyframe(time: float, keyframes: List[float], tolerance: float) -> Tuple[float, bool]:
+    """Return the keyframe nearest to time if it is within tolerance, else time itself."""
+    if not keyframes:
+        return time, False
+    pos = bisect.bisect_left(keyframes, time)
+    candidates = keyframes[max(pos - 1, 0):pos + 1]
+    nearest = min(candidates, key=lambda kf: abs(kf - time))
+    if abs(nearest - time) <= tolerance:
+        return nearest, True
+    return time, False
+
+
+def plan_boundaries(duration: float, clip_duration: float, keyframes: List[float],
+                    tolerance: float = DEFAULT_SNAP_TOLERANCE) -> List[Dict]:
+    """
+    Plan clips of roughly clip_duration seconds with boundaries snapped to keyframes.
+
+    Boundaries are taken from the nominal clip_duration grid so snapping does
+    not accumulate drift over long videos.
+    """
+    _, first_aligned = snap_to_keyframe(0.0, keyframes, tolerance)
+    starts = [(0.0, first_aligned)]
+
+    nominal = clip_duration
+    while nominal < duration:
+        start, aligned = snap_to_keyframe(nominal, keyframes, tolerance)
+        # Drop boundaries that collapse onto the previous one or leave a
+        # zero-length tail.
+        if starts[-1][0] < start < duration:
+            starts.append((start, aligned))
+        nominal += clip_duration
+
+    clips = []
+    for i, (start, aligned) in enumerate(starts):
+        end = starts[i + 1][0] if i + 1 < len(starts) else duration
+        clips.append({
+            'filename': f"clip_{i+1:03d}.mp4",
+            'start': start,
+            'end': end,
+            'keyframe_aligned': aligned
+        })
+    return clips
+
+
+def detect_scenes_and_silences(input_file: str, scene_threshold: float = DEFAULT_SCENE_THRESHOLD,
+                               noise_db: float = DEFAULT_SILENCE_NOISE_DB,
+                               min_silence: float = DEFAULT_MIN_SILENCE) -> Dict:
+    """
+    Find scene cuts and silent stretches of a video in a single ffmpeg pass.
+
+    The video is decoded once: a downscaled copy goes through the scene
+    change score and every frame above scene_threshold is logged by
+    showinfo, while the audio track goes through silencedetect.
+
+    Returns:
+        Dict with 'scene_changes' (sorted times in seconds) and 'silences'
+        (sorted (start, end) spans)
+    """
+    info = MediaInfo.probe(input_file)
+    command = ['ffmpeg', '-hide_banner', '-nostats', '-i', input_file]
+    if info.video_stream:
+        command += [
+            '-map', '0:v:0',
+            '-vf', f"scale={SCENE_ANALYSIS_WIDTH}:-2,select='gt(scene,{scene_threshold})',showinfo"
+        ]
+    if info.audio_streams:
+        command += ['-map', '0:a:0', '-af', f"silencedetect=noise={noise_db}dB:d={min_silence}"]
+    command += ['-f', 'null', '-']
+
+    result = subprocess.run(command, check=True, stdout=subprocess.DEVNULL,
+                            stderr=subprocess.PIPE, text=True, errors='replace')
+    scene_changes, silences = parse_scene_and_silence_log(result.stderr, info.duration)
+    logging.info(f"Found {len(scene_changes)} scene changes and {len(silences)} silences in {input_file}")
+    return {'scene_changes': scene_changes, 'silences': silences}
+
+
+def parse_scene_and_silence_log(log: str, duration: float) -> Tuple[List[float], List[Tuple[float, float]]]:
+    """Extract showinfo frame times and silencedetect spans from ffmpeg's log."""
+    scene_changes = []
+    silences = []
+    silence_start = None
+    for line in log.splitlines():
+        match = _SHOWINFO_PTS.search(line)
+        if match:
+            scene_changes.append(float(match.group(1)))
+            continue
+        match = _SILENCE_START.search(line)
+        if match:
+            silence_start = max(float(match.group(1)), 0.0)
+            continue
+        match = _SILENCE_END.search(line)
+        if match and silence_start is not None:
+            silences.append((silence_start, float(match.group(1))))
+            silence_start = None
+    # A silence running into the end of the file never gets a silence_end
+    if silence_start is not None and silence_start < duration:
+        silences.append((silence_start, duration))
+    return sorted(scene_changes), sorted(silences)
+
+
+def choose_boundaries(duration: float, scene_changes: Sequence[float],
+                      silences: Sequence[Tuple[float, float]],
+                      min_duration: float, max_duration: float,
+                      keyframes: Sequence[float] = (),
+                      tolerance: float = DEFAULT_SNAP_TOLERANCE) -> List[Dict]:
+    """
+    Plan clips between min_duration and max_duration seconds long, cutting at pauses where possible.
+
+    Each boundary is picked from the window [start + min_duration,
+    start + max_duration] of the clip it ends, preferring, in order:
+
+    - a silence, so no word is split between two clips; within the silence
+      the cut goes on a scene change or a keyframe if one falls inside it
+    - a scene change, snapped to a nearby keyframe
+    - the end of the window, snapped to a nearby keyframe
+
+    Among candidates of the same kind the latest one wins, which keeps
+    clips long and their number low. The window is shortened where needed
+    so the last clip isn't shorter than min_duration.
+    """
+    keyframes = list(keyframes)
+    _, first_aligned = snap_to_keyframe(0.0, keyframes, tolerance)
+    starts = [(0.0, first_aligned)]
+    reasons = Counter()
+
+    while duration - starts[-1][0] > max_duration:
+        start = starts[-1][0]
+        low = start + min_duration
+        high = min(start + max_duration, duration - min_duration)
+        if high < low:
+            high = start + max_duration
+
+        boundary, aligned, reason = _pick_boundary(low, high, scene_changes, silences, keyframes, tolerance)
+        starts.append((boundary, aligned))
+        reasons[reason] += 1
+
+    logging.info(f"Content planner boundaries: {dict(reasons) or 'none'}")
+
+    clips = []
+    for i, (start, aligned) in enumerate(starts):
+        end = starts[i + 1][0] if i + 1 < len(starts) else duration
+        clips.append({
+            'filename': f"clip_{i+1:03d}.mp4",
+            'start': start,
+            'end': end,
+            'keyframe_aligned': aligned
+        })
+    return clips
+
+
+def _pick_boundary(low: float, high: float, scene_changes: Sequence[float],
+                   silences: Sequence[Tuple[float, float]], keyframes: List[float],
+                   tolerance: float) -> Tuple[float, bool, str]:
+    """Return (time, keyframe_aligned, reason) of the best cut point in [low, high]."""
+    spans = [(max(s, low), min(e, high)) for s, e in silences if s <= high and e >= low]
+    if spans:
+        span_start, span_end = spans[-1]
+        inside = [t for t in scene_changes if span_start <= t <= span_end]
+        if inside:
+            return _snap_within(inside[-1], low, high, keyframes, tolerance) + ("silence",)
+        inside = [t for t in keyframes if span_start <= t <= span_end]
+        if inside:
+            return inside[-1], True, "silence"
+        return (span_start + span_end) / 2, False, "silence"
+
+    inside = [t for t in scene_changes if low <= t <= high]
+    if inside:
+        return _snap_within(inside[-1], low, high, keyframes, tolerance) + ("scene",)
+
+    return _snap_within(high, low, high, keyframes, tolerance) + ("max_duration",)
+
+
+def _snap_within(time: float, low: float, high: float, keyframes: List[float],
+                 tolerance: float) -> Tuple[float, bool]:
+    """Snap time to a keyframe, but only if that keeps it inside [low, high]."""
+    snapped, aligned = snap_to_keyframe(time, keyframes, tolerance)
+    if aligned and low <= snapped <= high:
+        return snapped, True
+    return time, False
+
+
+def planner_options(config) -> Dict:
+    """Collect the clip planner settings from an app config mapping as plan_clips keyword arguments."""
+    return {
+        'planner': config.get('CLIP_PLANNER', PLANNER_FIXED),
+        'min_duration': config.get('CONTENT_MIN_CLIP_DURATION'),
+        'max_duration': config.get('CONTENT_MAX_CLIP_DURATION'),
+    }
+
+
+def plan_clips(input_file: str, clip_duration: float,
+               tolerance: float = DEFAULT_SNAP_TOLERANCE,
+               planner: str = PLANNER_FIXED,
+               min_duration: Optional[float] = None,
+               max_duration: Optional[float] = None) -> List[Dict]:
+    """
+    Plan clips for a video file using its cached keyframe index.
+
+    Args:
+        input_file: Path to the source video
+        clip_duration: Requested clip duration in seconds
+        tolerance: Max distance in seconds a boundary may move to hit a keyframe
+        planner: "fixed" for a regular clip_duration grid, "content" to cut
+            at silences and scene changes (see choose_boundaries)
+        min_duration: Shortest clip of the content planner (defaults to
+            half of clip_duration)
+        max_duration: Longest clip of the content planner (defaults to
+            1.5 times clip_duration)
+    """
+    index = get_keyframe_index(input_file)
+    if index['duration'] <= 0:
+        logging.error(f"Could not determine duration of {input_file}")
+        return []
+
+    if planner == PLANNER_CONTENT:
+        min_duration = min_duration or clip_duration * CONTENT_MIN_FACTOR
+        max_duration = max(max_duration or clip_duration * CONTENT_MAX_FACTOR, min_duration)
+        try:
+            analysis = detect_scenes_and_silences(input_file)
+        except (OSError, subprocess.CalledProcessError) as e:
+            # The fixed grid is always available, so a failed analysis only
+            # costs us the better boundaries
+            logging.error(f"Scene/silence analysis failed for {input_file}, using fixed clips: {str(e)}")
+        else:
+            return choose_boundaries(index['duration'], analysis['scene_changes'], analysis['silences'],
+                                     min_duration, max_duration, index['keyframes'], tolerance)
+    elif planner != PLANNER_FIXED:
+        logging.warning(f"Unknown clip planner '{planner}', using fixed clips")
+
+    return plan_boundaries(index['duration'], clip_duration, index['keyframes'], tolerance)
@@ -0,0 +1,326 @@
+# app/utils/clip_splitting.py
+
+import csv
+import io
+import json
+import logging
+import os
+import subprocess
+import tempfile
+import time
+from contextlib import contextmanager
+from threading import Lock
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .clip_planning import plan_clips
+
+MANIFEST_FILENAME = "clips.json"
+SEGMENT_LIST_FILENAME = "clips.csv"
+CLIP_FILENAME_PATTERN = "clip_%03d.mp4"
+
+# Clip path -> [lock, number of requests holding or waiting for it]
+_clip_locks: Dict[str, list] = {}
+_clip_locks_guard = Lock()
+
+
+def split_video_segments(input_file: str, output_folder: str, clip_duration: float = 30,
+                         **plan_options) -> List[Dict]:
+    """
+    Split a video into clips with a single ffmpeg segment-muxer pass.
+
+    Args:
+        input_file: Path to the source video
+        output_folder: Folder the clips and the manifest are written to
+        clip_duration: Target duration of each clip in seconds
+        **plan_options: Extra plan_clips arguments (keyframe tolerance, planner)
+
+    Returns:
+        List of clip dicts as stored in the manifest
+    """
+    try:
+        planned_clips = plan_clips(input_file, clip_duration, **plan_options)
+    except Exception as e:
+        logging.error(f"Error planning clips for {input_file}: {str(e)}")
+        return []
+    if not planned_clips:
+        return []
+
+    try:
+        return list(iter_split_segments(input_file, output_folder, planned_clips))
+    except subprocess.CalledProcessError as e:
+        logging.error(f"Error splitting {input_file}: {e.stderr}")
+        return []
+
+
+def iter_split_segments(input_file: str, output_folder: str, planned_clips: List[Dict],
+                        poll_interval: float = 0.2) -> Iterator[Dict]:
+    """
+    Run the segment muxer over the planned clips, yielding each clip as soon as it is written.
+
+    The source is demuxed once and every clip is stream-copied as the muxer
+    reaches it, instead of starting one ffmpeg process per clip. ffmpeg appends
+    a line to its csv segment list whenever a segment is complete, so clips can
+    be analyzed while the rest of the video is still being split. Because the
+    segment muxer only cuts on keyframes when copying, the exact boundaries are
+    read back from that list rather than assumed from the plan.
+
+    The manifest is written once all clips are done.
+
+    Raises:
+        subprocess.CalledProcessError: If ffmpeg fails
+    """
+    os.makedirs(output_folder, exist_ok=True)
+    segment_list = os.path.join(output_folder, SEGMENT_LIST_FILENAME)
+    if os.path.exists(segment_list):
+        os.remove(segment_list)
+
+    boundaries = [clip['start'] for clip in planned_clips[1:]]
+    if boundaries:
+        segment_args = [
+            '-segment_times', ','.join(f"{t:.6f}" for t in boundaries),
+            # Accept a keyframe that sits a hair before a boundary because of
+            # timestamp rounding instead of waiting for the next one.
+            '-segment_time_delta', '0.01'
+        ]
+    else:
+        segment_args = ['-segment_time', str(planned_clips[0]['end'] + 1)]
+
+    command = [
+        'ffmpeg',
+        '-i', input_file,
+        '-c', 'copy',
+        '-f', 'segment',
+        *segment_args,
+        '-segment_start_number', '1',
+        '-reset_timestamps', '1',
+        '-segment_list', segment_list,
+        '-segment_list_type', 'csv',
+        '-y',
+        os.path.join(output_folder, CLIP_FILENAME_PATTERN)
+    ]
+
+    clips = []
+    # stderr goes to a file: nobody reads a pipe while we poll, and a full
+    # pipe would stall ffmpeg.
+    with tempfile.TemporaryFile() as stderr:
+        process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=stderr)
+        try:
+            while True:
+                finished = process.poll() is not None
+                if os.path.exists(segment_list):
+                    for clip in read_segment_list(segment_list)[len(clips):]:
+                        clips.append(clip)
+                        yield clip
+                if finished:
+                    break
+                time.sleep(poll_interval)
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+
+        if process.returncode != 0:
+            stderr.seek(0)
+            raise subprocess.CalledProcessError(
+                process.returncode, command, stderr=stderr.read().decode(errors='replace')
+            )
+
+    write_clip_manifest(output_folder, clips)
+    logging.info(f"Split {input_file} into {len(clips)} clips")
+
+
+def open_clip_source(input_file: str, output_folder: str, clip_duration: float = 30,
+                     virtual: bool = False, **plan_options) -> Tuple[List[Dict], Iterator[Dict]]:
+    """
+    Plan the clips of a video and return an iterator producing them ready for analysis.
+
+    Virtual clips are ready immediately. Otherwise the iterator runs the
+    segment muxer and yields each clip once its file is complete.
+
+    Returns:
+        (planned clips, clip iterator)
+    """
+    if virtual:
+        clips = plan_virtual_clips(input_file, output_folder, clip_duration, **plan_options)
+        return clips, iter(clips)
+
+    planned_clips = plan_clips(input_file, clip_duration, **plan_options)
+    if not planned_clips:
+        return [], iter([])
+    return planned_clips, iter_split_segments(input_file, output_folder, planned_clips)
+
+
+def plan_virtual_clips(input_file: str, output_folder: str, clip_duration: float = 30,
+                       **plan_options) -> List[Dict]:
+    """
+    Plan clips as (source, start, end) ranges without writing any clip files.
+
+    The analyzers decode each range straight from the source with input
+    seeking. The manifest still lists every clip so that a clip file can be
+    cut on demand when it is requested for playback (see materialize_clip).
+    """
+    os.makedirs(output_folder, exist_ok=True)
+    source = os.path.abspath(input_file)
+    clips = [
+        {**clip, 'source': source}
+        for clip in plan_clips(input_file, clip_duration, **plan_options)
+    ]
+    write_clip_manifest(output_folder, clips)
+    logging.info(f"Planned {len(clips)} virtual clips for {input_file}")
+    return clips
+
+
+def cut_clip(input_file: str, clip: Dict, output_path: str, output_format: Optional[str] = None) -> None:
+    """
+    Write a single clip of input_file to output_path.
+
+    Seeks on the input so ffmpeg jumps straight to the clip start. Clips that
+    start on a keyframe are stream-copied; the others are re-encoded so they
+    don't begin with undecodable frames.
+    """
+    if clip.get('keyframe_aligned'):
+        codec_args = ['-c', 'copy']
+    else:
+        codec_args = ['-c:v', 'libx264', '-preset', 'veryfast', '-c:a', 'aac']
+    format_args = ['-f', output_format] if output_format else []
+
+    command = [
+        'ffmpeg',
+        '-ss', str(clip['start']),
+        '-i', input_file,
+        '-t', str(clip['end'] - clip['start']),
+        *codec_args,
+        *format_args,
+        '-y',  # Overwrite output file if it exists
+        output_path
+    ]
+    logging.info(f"Running ffmpeg command: {' '.join(command)}")
+    subprocess.run(command, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def materialize_clip(output_folder: str, filename: str) -> Optional[str]:
+    """
+    Make sure the file for a clip exists, cutting it from its source if needed.
+
+    Requests for the same clip wait for one cut; other clips are cut
+    concurrently.
+
+    Returns:
+        Path of the clip file, or None if it isn't a known clip
+    """
+    clip_path = os.path.join(output_folder, filename)
+    with _clip_lock(clip_path):
+        if os.path.exists(clip_path):
+            return clip_path
+
+        clip = next(
+            (c for c in read_clip_manifest(output_folder) or [] if c['filename'] == filename),
+            None
+        )
+        if not clip or not os.path.exists(clip.get('source', '')):
+            return None
+
+        # Cut to a temporary name first so a concurrent request (possibly from
+        # another worker process) never serves a half-written clip.
+        fd, partial_path = tempfile.mkstemp(suffix='.partial', dir=output_folder)
+        os.close(fd)
+        try:
+            cut_clip(clip['source'], clip, partial_path, output_format='mp4')
+            os.replace(partial_path, clip_path)
+        finally:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+        logging.info(f"Materialized clip on demand: {clip_path}")
+        return clip_path
+
+
+def remove_expired_sources(output_root: str, max_age: float) -> int:
+    """
+    Delete downloaded sources of virtual clips that are older than max_age seconds.
+
+    Only sources inside the output folder of their own manifest are removed:
+    those are downloads kept for cutting clips on demand, whereas a source
+    elsewhere (an upload) belongs to someone else. The clips of a removed
+    source can't be materialized any more.
+
+    Returns:
+        Number of sources removed
+    """
+    removed = 0
+    if not os.path.isdir(output_root):
+        return removed
+    cutoff = time.time() - max_age
+    for entry in os.scandir(output_root):
+        if not entry.is_dir():
+            continue
+        folder = os.path.abspath(entry.path)
+        try:
+            clips = read_clip_manifest(folder) or []
+        except (OSError, ValueError):
+            continue
+        for source in {clip['source'] for clip in clips if clip.get('source')}:
+            if os.path.dirname(os.path.abspath(source)) != folder:
+                continue
+            try:
+                if os.path.getmtime(source) < cutoff:
+                    os.remove(source)
+                    removed += 1
+                    logging.info(f"Removed expired virtual clip source: {source}")
+            except OSError:
+                continue
+    return removed
+
+
+def read_segment_list(segment_list: str) -> List[Dict]:
+    """Parse an ffmpeg csv segment list (filename,start,end) into clip dicts."""
+    with open(segment_list, newline='') as f:
+        content = f.read()
+    # Skip a line ffmpeg is still in the middle of writing
+    content = content[:content.rfind('\n') + 1]
+
+    clips = []
+    for row in csv.reader(io.StringIO(content)):
+        if len(row) < 3:
+            continue
+        clips.append({
+            'filename': row[0],
+            'start': float(row[1]),
+            'end': float(row[2]),
+            # The segment muxer only starts a new segment on a keyframe
+            # when stream copying.
+            'keyframe_aligned': True
+        })
+    return clips
+
+
+def write_clip_manifest(output_folder: str, clips: List[Dict]) -> str:
+    """Write the clip manifest for an output folder and return its path."""
+    manifest_path = os.path.join(output_folder, MANIFEST_FILENAME)
+    with open(manifest_path, 'w') as f:
+        json.dump({'clips': clips}, f, indent=2)
+    return manifest_path
+
+
+def read_clip_manifest(output_folder: str) -> Optional[List[Dict]]:
+    """Read the clip manifest of an output folder, or None if there is none."""
+    manifest_path = os.path.join(output_folder, MANIFEST_FILENAME)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, 'r') as f:
+        return json.load(f).get('clips', [])
+
+
+@contextmanager
+def _clip_lock(clip_path: str):
+    """Hold the lock of one clip path; locks nobody waits for are dropped."""
+    with _clip_locks_guard:
+        entry = _clip_locks.setdefault(clip_path, [Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _clip_locks_guard:
+            entry[1] -= 1
+            if not entry[1]:
+                del _clip_locks[clip_path]
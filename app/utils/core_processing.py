@@ -6,53 +6,165 @@ import re
 from datetime import datetime
 from typing import Dict, List, Optional, Union
 
-from .audio_processing import extract_audio, speech_to_text
-from .text_processing import ocr_from_video, translate_text, extract_meaningful_content
-from .image_processing import recognize_images_in_video
+from .asr_backends import Transcript, get_asr_backend
+from .audio_processing import DEFAULT_AUDIO_FORMAT, asr_audio_format, decode_audio, transcribe_speech
+from .voice_activity import detect_speech, speech_samples, to_clip_time
+from .text_processing import OCRSampler, translate_text, extract_meaningful_content
+from .image_processing import FrameRecognizer
+from .fake_video_detection import FakeVideoAccumulator
+from .network_io import get_io_executor
+from .subtitles import cue_words, subtitles_for_clip
+from .frame_bus import FrameBus
 from summa import keywords
 
 
+# Clip keys holding server-side paths and buffers, kept out of the results sent to clients
+SERVER_SIDE_CLIP_KEYS = ("source", "audio_source", "audio_samples", "audio_sample_rate", "subtitle_cues")
+
+
+def analysis_options(config) -> Dict:
+    """
+    Collect the clip analysis settings from an app config mapping, as process_clip's options.
+
+    Built once per request and handed to every clip, so a new analysis
+    setting only has to be added here and read in process_clip.
+    """
+    return {
+        'frame_max_width': config.get('ANALYSIS_MAX_WIDTH'),
+        'sampling': config.get('FRAME_SAMPLING'),
+        'audio_format': asr_audio_format(config),
+        'voice_activity': config.get('VOICE_ACTIVITY'),
+        'asr_backend': config.get('ASR_BACKEND'),
+        'asr_window': config.get('ASR_WINDOW'),
+        'asr_cache': config.get('ASR_CACHE'),
+        'network_io': config.get('NETWORK_IO'),
+        'ocr': config.get('OCR'),
+    }
+
+
 class VideoProcessor:
     """Core processing functionality for video analysis."""
 
     @staticmethod
-    def process_clip(clip, output_folder, target_language, url):
-        """Process a single video clip with audio, OCR, and object detection."""
-        logging.info(f"Processing clip: {clip}")
-        clip_path = os.path.join(output_folder, clip["filename"])
-        audio_path = os.path.join(output_folder, f"{clip['filename']}.wav")
+    def prepare_clip(clip, output_folder, audio_format=None, source_audio=None, subtitle_cues=None):
+        """
+        Decode a clip's audio ahead of analysis.
+
+        Runs on the pipeline's producer thread so the next clip's audio is
+        decoded while the current clip is being analyzed. The PCM samples
+        travel with the clip in memory, in the format of the ASR backend
+        (see asr_audio_format).
+
+        With the source's soundtrack already decoded (source_audio) there is
+        nothing to decode: the clip just carries a reference to it and
+        process_clip slices its samples out of the memory map.
+
+        If the source has a text subtitle track (subtitle_cues, see
+        load_subtitle_cues) with cues in the clip, the clip gets its cues
+        instead of audio: process_clip reads the text from them. Clips
+        between cues get their audio as usual.
+        """
+        cues = subtitles_for_clip(subtitle_cues, clip["start"], clip["end"])
+        if cues is not None:
+            return {**clip, "subtitle_cues": cues}
+        if source_audio is not None:
+            return {**clip, "audio_source": source_audio}
+        audio_format = audio_format or DEFAULT_AUDIO_FORMAT
+        clip_path, start, end = VideoProcessor.resolve_clip_range(clip, output_folder)
+        samples = decode_audio(clip_path, start, end, **audio_format)
+        if samples is not None:
+            return {**clip, "audio_samples": samples, "audio_sample_rate": audio_format["sample_rate"]}
+        return clip
+
+    @staticmethod
+    def process_clip(clip, output_folder, target_language, url, options=None, fake_detection=False):
+        """
+        Process a single video clip with audio, OCR, and object detection.
 
-        # Audio processing
-        audio_extracted = extract_audio(clip_path, audio_path)
-        logging.info(f"Audio extracted: {audio_extracted}")
+        options holds the analysis settings (see analysis_options); missing
+        ones keep their defaults:
 
-        if audio_extracted:
-            speech_text = speech_to_text(audio_path)
+        - frame_max_width caps the width of the frames the analyzers see;
+          wider sources are downscaled by ffmpeg while decoding.
+        - sampling maps the stages "ocr", "recognition" and "fake_detection"
+          to sampling policy specs (see SamplingPolicy).
+        - audio_format is the PCM format of the ASR backend, used when
+          prepare_clip didn't decode the audio already.
+        - voice_activity, asr_backend, asr_window and asr_cache configure
+          speech recognition (see process_speech).
+        - network_io configures the process's pool for remote calls (see
+          get_io_executor).
+        - ocr holds OCRSampler options.
+
+        With fake_detection, the frames also feed a FakeVideoAccumulator whose
+        state is returned as fake_detection_state, for callers that merge it
+        into a whole-video result.
+
+        Clips prepared with subtitle cues skip speech recognition and OCR:
+        the cues are their speech text. text_source in the result says which
+        path was taken.
+        """
+        options = options or {}
+        logging.info(f"Processing clip: {clip}")
+        clip_path, start, end = VideoProcessor.resolve_clip_range(clip, output_folder)
+
+        io_executor = get_io_executor(options.get("network_io"))
+        subtitle_cues = clip.get("subtitle_cues")
+        if subtitle_cues:
+            # The source's subtitle track already says what is being said
+            text_source = "subtitles"
+            speech_future = io_executor.submit(VideoProcessor.process_subtitles, subtitle_cues, target_language)
         else:
-            speech_text = "Audio extraction failed. No speech recognition performed."
-        logging.info(f"Speech text: {speech_text[:100]}...")
+            text_source = "ocr_asr"
+            # Audio processing (prepare_clip may already have decoded it, or
+            # pointed the clip at the decoded soundtrack of its source)
+            if clip.get("audio_source") is not None:
+                source_audio = clip["audio_source"]
+                samples, sample_rate = source_audio.slice(clip["start"], clip["end"]), source_audio.sample_rate
+            elif "audio_samples" in clip:
+                samples, sample_rate = clip["audio_samples"], clip["audio_sample_rate"]
+            else:
+                audio_format = options.get("audio_format") or DEFAULT_AUDIO_FORMAT
+                samples = decode_audio(clip_path, start, end, **audio_format)
+                sample_rate = audio_format["sample_rate"]
+            logging.info(f"Audio extracted: {samples is not None}")
 
-        # OCR processing - handle as string for now
-        ocr_text = ocr_from_video(clip_path)
+            # Speech recognition and its translation only wait on the network:
+            # they run on the I/O pool while this thread decodes and analyzes frames
+            speech_future = io_executor.submit(
+                VideoProcessor.process_speech, samples, sample_rate, target_language, options,
+            )
+
+        # OCR, image recognition and the fake-detection signals all share a
+        # single decode of the clip, each sampling frames at its own rate
+        sampling = options.get("sampling") or {}
+        ocr_sampler = OCRSampler(sampling.get("ocr", "interval:5"), **(options.get("ocr") or {})) if text_source == "ocr_asr" else None
+        recognizer = FrameRecognizer(policy=sampling.get("recognition"))
+        fake_accumulator = FakeVideoAccumulator(sampling.get("fake_detection", "all")) if fake_detection else None
+        consumers = [c for c in (ocr_sampler, recognizer, fake_accumulator) if c is not None]
+        FrameBus(clip_path, start, end, max_width=options.get("frame_max_width")).run(consumers)
+
+        # OCR processing: text seen across samples is merged into spans, and
+        # only their distinct texts are translated and summarized
+        ocr_spans = ocr_sampler.spans() if ocr_sampler is not None else []
+        ocr_text = ocr_sampler.result() if ocr_sampler is not None else ""
         logging.info(f"OCR text: {ocr_text[:100]}...")
 
         # Image recognition
-        try:
-            image_recognition_results = recognize_images_in_video(clip_path)
-            detections = image_recognition_results.get('detections', [])
-            classifications = image_recognition_results.get('classifications', [])
-            
-            if detections:
-                logging.info(f"Detected objects (first 3): {detections[:3]}")
-            if classifications:
-                logging.info(f"Scene classifications (first 3): {classifications[:3]}")
-        except Exception as e:
-            logging.error(f"Error in image recognition: {str(e)}")
-            image_recognition_results = {'detections': [], 'classifications': []}
+        image_recognition_results = recognizer.result()
+        detections = image_recognition_results.get('detections', [])
+        classifications = image_recognition_results.get('classifications', [])
+        if detections:
+            logging.info(f"Detected objects (first 3): {detections[:3]}")
+        if classifications:
+            logging.info(f"Scene classifications (first 3): {classifications[:3]}")
 
         # Translation
-        speech_translated = translate_text(speech_text, target_language) if speech_text else "No speech to translate."
-        ocr_translated = translate_text(ocr_text, target_language) if ocr_text else "No OCR text to translate."
+        ocr_future = io_executor.submit(translate_text, ocr_text, target_language) if ocr_text else None
+        speech = speech_future.result()
+        speech_text, speech_translated = speech["speech_text"], speech["speech_translated"]
+        logging.info(f"Speech text: {speech_text[:100]}...")
+        ocr_translated = ocr_future.result() if ocr_future else "No OCR text to translate."
 
         # Content analysis
         combined_text = f"{speech_text} {ocr_text}".strip()
@@ -66,16 +178,26 @@ class VideoProcessor:
         clip_name = VideoProcessor.generate_clip_name(speech_text, ocr_text, image_recognition_results)
         logging.info(f"Generated clip name: {clip_name}")
 
-        # Cleanup
-        if os.path.exists(audio_path):
-            os.remove(audio_path)
-            logging.info(f"Removed temporary audio file: {audio_path}")
-
-        return {
-            **clip,
+        result = {
+            **{key: value for key, value in clip.items() if key not in SERVER_SIDE_CLIP_KEYS},
             "clip_name": clip_name,
             "speech_text": speech_text,
+            # Fraction of the clip the voice activity gate found speech in;
+            # None when the gate is off
+            "speech_ratio": speech["speech_ratio"],
+            # Recognized words with their times in seconds from the start of the clip
+            "speech_words": speech["speech_words"],
+            # Hit counts of this process's transcript cache, if enabled
+            "asr_cache": (get_asr_backend(options.get("asr_backend"), options["asr_cache"]).stats()
+                          if options.get("asr_cache") else None),
             "ocr_text": ocr_text,
+            # On-screen text with where and when it was seen (seconds from the start of the clip)
+            "ocr_spans": ocr_spans,
+            # Images read and seconds spent by each tier of two-tier OCR, if enabled
+            "ocr_tiers": ocr_sampler.tier_stats() if ocr_sampler is not None else None,
+            # "subtitles" if the text came from the source's subtitle track,
+            # "ocr_asr" if from speech recognition and OCR
+            "text_source": text_source,
             "speech_translated": speech_translated,
             "ocr_translated": ocr_translated,
             "summary": summary,
@@ -83,7 +205,99 @@ class VideoProcessor:
             "source_url": url,
             "access_time": datetime.now().isoformat(),
         }
+        if fake_accumulator is not None:
+            # Merged across clips by the caller instead of decoding the whole
+            # video again for fake detection; see FakeVideoAccumulator
+            result["fake_detection_state"] = fake_accumulator.state()
+        return result
     
+    @staticmethod
+    def process_speech(samples, sample_rate, target_language, options=None):
+        """
+        Recognize and translate the speech of a clip's audio samples (None if decoding failed).
+
+        options are process_clip's. With voice_activity (detect_speech
+        settings), only the speech spans are sent to the recognizer and audio
+        without speech skips it altogether. asr_backend names the backend (see
+        get_asr_backend); asr_window splits long audio into overlapping
+        windows recognized concurrently (see transcribe_speech), and asr_cache
+        reuses the transcripts of audio recognized before.
+
+        Returns:
+            Dict with speech_text, speech_translated, speech_words and speech_ratio
+        """
+        options = options or {}
+        voice_activity = options.get("voice_activity")
+        speech_ratio = None
+        spans = None
+        if samples is not None and voice_activity is not None:
+            activity = detect_speech(samples, sample_rate, **voice_activity)
+            speech_ratio = activity["speech_ratio"]
+            spans = activity["spans"]
+            samples = speech_samples(samples, sample_rate, spans)
+
+        speech_words = []
+        if samples is not None and len(samples):
+            try:
+                transcript = transcribe_speech([samples], sample_rate, options.get("asr_backend"),
+                                               options.get("asr_window"), options.get("asr_cache"))[0]
+            except Exception as e:
+                logging.error(f"Error in speech recognition: {str(e)}")
+                transcript = Transcript(error=f"Error processing audio: {str(e)}")
+            speech_text = transcript.error or transcript.text
+            if not transcript.error and transcript.words:
+                # Word times are relative to the audio the recognizer got;
+                # with the voice activity gate that's the speech spans only
+                speech_words = [
+                    {**word, "start": to_clip_time(word["start"], spans), "end": to_clip_time(word["end"], spans)}
+                    if spans is not None else word
+                    for word in transcript.words
+                ]
+        elif samples is not None:
+            logging.info("No speech detected, skipping speech recognition")
+            speech_text = ""
+        else:
+            speech_text = "Audio extraction failed. No speech recognition performed."
+
+        return {
+            "speech_text": speech_text,
+            "speech_translated": translate_text(speech_text, target_language) if speech_text else "No speech to translate.",
+            "speech_words": speech_words,
+            "speech_ratio": speech_ratio,
+        }
+
+    @staticmethod
+    def process_subtitles(cues, target_language):
+        """
+        Take a clip's speech from its subtitle cues and translate it.
+
+        Returns:
+            Dict with speech_text, speech_translated, speech_words and speech_ratio, as process_speech
+        """
+        speech_text = " ".join(cue["text"] for cue in cues)
+        return {
+            "speech_text": speech_text,
+            "speech_translated": translate_text(speech_text, target_language) if speech_text else "No speech to translate.",
+            "speech_words": cue_words(cues),
+            "speech_ratio": None,
+        }
+
+    @staticmethod
+    def resolve_clip_range(clip: Dict, output_folder: str):
+        """
+        Work out what to decode for a clip.
+
+        A virtual clip (one with a 'source' and no clip file yet) is read as a
+        time range of its source; otherwise the clip file is read whole.
+
+        Returns:
+            (video_path, start, end) with start/end None for a clip file
+        """
+        clip_path = os.path.join(output_folder, clip["filename"])
+        if clip.get("source") and not os.path.exists(clip_path):
+            return clip["source"], clip["start"], clip["end"]
+        return clip_path, None, None
+
     @staticmethod
     def generate_clip_name(
         speech_text: str, ocr_text: str, image_recognition_results: Dict
@@ -2,57 +2,140 @@ import cv2
 import numpy as np
 from scipy.stats import entropy
 
-def detect_fake_video(video_path):
-    cap = cv2.VideoCapture(video_path)
-    frames = []
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
-        frames.append(frame)
-    cap.release()
-
-    results = {
-        "potential_manipulation": False,
-        "reasons": []
-    }
-
-    # Check for unusual frame rate
-    fps = cap.get(cv2.CAP_PROP_FPS)
-    if fps < 24 or fps > 60:
-        results["potential_manipulation"] = True
-        results["reasons"].append(f"Unusual frame rate: {fps} FPS")
-
-    # Check for consistent video quality
-    if len(frames) > 1:
-        qualities = [cv2.Laplacian(frame, cv2.CV_64F).var() for frame in frames]
-        quality_std = np.std(qualities)
-        if quality_std > 100:  # Threshold can be adjusted
-            results["potential_manipulation"] = True
-            results["reasons"].append("Inconsistent video quality across frames")
+from .frame_bus import FrameBus, FrameConsumer
+from .frame_sampling import ALL
+
+_face_cascade = None
+
+
+def _get_face_cascade():
+    global _face_cascade
+    if _face_cascade is None:
+        _face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+    return _face_cascade
+
+
+class FakeVideoAccumulator(FrameConsumer):
+    """
+    Collects the fake-detection signals of a video as it is decoded.
+
+    Frame quality is reduced to a running count/mean/M2 and the sampled face
+    areas and color entropies are kept in order, so the state of consecutive
+    clips can be merged into the state of the whole video without decoding
+    it again. state()/from_state() turn it into plain data for passing it
+    between processes.
+    """
 
-    # Check for abrupt changes in facial landmarks (simplified)
-    face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-    face_areas = []
-    for frame in frames[::10]:  # Check every 10th frame for efficiency
+    # When fed every frame, face and color checks look at every 10th frame
+    # for efficiency; with a sparser policy they look at each sampled frame
+    SAMPLE_EVERY = 10
+    # The quality threshold in result() is a Laplacian variance of frames at
+    # their source size; a downscaled frame has a different one
+    full_resolution = True
+
+    def __init__(self, policy=ALL):
+        super().__init__(policy)
+        self.fps = None
+        self.quality_count = 0
+        self.quality_mean = 0.0
+        self.quality_m2 = 0.0
+        self.face_areas = []
+        self.color_entropies = []
+
+    def start(self, fps, frame_count):
+        super().start(fps, frame_count)
+        if self.fps is None:
+            self.fps = fps
+
+    def consume(self, frame, index, timestamp):
+        # Check for consistent video quality (Welford's online variance)
+        quality = cv2.Laplacian(frame, cv2.CV_64F).var()
+        self.quality_count += 1
+        delta = quality - self.quality_mean
+        self.quality_mean += delta / self.quality_count
+        self.quality_m2 += delta * (quality - self.quality_mean)
+
+        if self.policy.kind == ALL and index % self.SAMPLE_EVERY:
+            return
+
+        # Facial proportions (simplified)
         gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        faces = face_cascade.detectMultiScale(gray, 1.3, 5)
+        faces = _get_face_cascade().detectMultiScale(gray, 1.3, 5)
         if len(faces) > 0:
-            face_areas.append(faces[0][2] * faces[0][3])  # Width * Height of the first detected face
-    if len(face_areas) > 1:
-        face_area_changes = np.diff(face_areas) / np.array(face_areas[:-1])
-        if np.any(np.abs(face_area_changes) > 0.5):  # Threshold for abrupt change
-            results["potential_manipulation"] = True
-            results["reasons"].append("Abrupt changes in facial proportions detected")
+            self.face_areas.append(int(faces[0][2] * faces[0][3]))  # Width * Height of the first detected face
 
-    # Check for unusual color distribution
-    color_entropies = []
-    for frame in frames[::10]:  # Check every 10th frame for efficiency
+        # Color distribution
         hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
         hist = cv2.calcHist([hsv], [0, 1], None, [180, 256], [0, 180, 0, 256])
-        color_entropies.append(entropy(hist.flatten()))
-    if np.std(color_entropies) > 0.5:  # Threshold can be adjusted
-        results["potential_manipulation"] = True
-        results["reasons"].append("Unusual color distribution changes")
+        self.color_entropies.append(float(entropy(hist.flatten())))
+
+    def merge(self, other):
+        """Fold in the state of the clip that follows this one."""
+        if self.fps is None:
+            self.fps = other.fps
+        count = self.quality_count + other.quality_count
+        if count:
+            delta = other.quality_mean - self.quality_mean
+            self.quality_mean += delta * other.quality_count / count
+            self.quality_m2 += other.quality_m2 + delta ** 2 * self.quality_count * other.quality_count / count
+            self.quality_count = count
+        self.face_areas.extend(other.face_areas)
+        self.color_entropies.extend(other.color_entropies)
+        return self
+
+    def state(self):
+        return {
+            "fps": self.fps,
+            "quality": [self.quality_count, self.quality_mean, self.quality_m2],
+            "face_areas": list(self.face_areas),
+            "color_entropies": list(self.color_entropies),
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        accumulator = cls()
+        accumulator.fps = state["fps"]
+        accumulator.quality_count, accumulator.quality_mean, accumulator.quality_m2 = state["quality"]
+        accumulator.face_areas = list(state["face_areas"])
+        accumulator.color_entropies = list(state["color_entropies"])
+        return accumulator
+
+    def result(self):
+        results = {
+            "potential_manipulation": False,
+            "reasons": []
+        }
+        fps = self.fps or 0
+
+        # Check for unusual frame rate
+        if fps < 24 or fps > 60:
+            results["potential_manipulation"] = True
+            results["reasons"].append(f"Unusual frame rate: {fps} FPS")
+
+        # Check for consistent video quality
+        if self.quality_count > 1:
+            quality_std = np.sqrt(self.quality_m2 / self.quality_count)
+            if quality_std > 100:  # Threshold can be adjusted
+                results["potential_manipulation"] = True
+                results["reasons"].append("Inconsistent video quality across frames")
+
+        # Check for abrupt changes in facial landmarks (simplified)
+        if len(self.face_areas) > 1:
+            face_areas = np.array(self.face_areas, dtype=float)
+            face_area_changes = np.diff(face_areas) / face_areas[:-1]
+            if np.any(np.abs(face_area_changes) > 0.5):  # Threshold for abrupt change
+                results["potential_manipulation"] = True
+                results["reasons"].append("Abrupt changes in facial proportions detected")
+
+        # Check for unusual color distribution
+        if self.color_entropies and np.std(self.color_entropies) > 0.5:  # Threshold can be adjusted
+            results["potential_manipulation"] = True
+            results["reasons"].append("Unusual color distribution changes")
+
+        return results
+
 
-    return results
\ No newline at end of file
+def detect_fake_video(video_path, start=None, end=None, max_width=None, policy=ALL):
+    accumulator = FakeVideoAccumulator(policy)
+    FrameBus(video_path, start, end, max_width=max_width).run([accumulator])
+    return accumulator.result()
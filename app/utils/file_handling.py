@@ -1,41 +1,16 @@
 import os
-import json
-import subprocess
 from flask import current_app
 import yt_dlp
 
+from .media_probe import MediaInfo
+
 def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in current_app.config['ALLOWED_EXTENSIONS']
 
 def get_video_duration(filename):
     try:
-        result = subprocess.run(['ffprobe', '-v', 'quiet', '-print_format', 'json', '-show_format', '-show_streams', filename], 
-                                stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, check=True)
-        data = json.loads(result.stdout)
-        
-        # Try to get duration from format
-        if 'format' in data and 'duration' in data['format']:
-            return float(data['format']['duration'])
-        
-        # If not in format, try to get from streams
-        if 'streams' in data:
-            for stream in data['streams']:
-                if 'duration' in stream:
-                    return float(stream['duration'])
-        
-        # If we still can't find duration, try to calculate from frames
-        if 'streams' in data:
-            for stream in data['streams']:
-                if stream.get('codec_type') == 'video':
-                    if 'nb_frames' in stream and 'avg_frame_rate' in stream:
-                        nb_frames = int(stream['nb_frames'])
-                        fps = eval(stream['avg_frame_rate'])
-                        if fps != 0:
-                            return nb_frames / fps
-        
-        # If all else fails, return 0
-        return 0
+        return MediaInfo.probe(filename).duration
     except Exception as e:
         current_app.logger.error(f"Error getting video duration: {str(e)}")
         return 0
@@ -0,0 +1,216 @@
+# app/utils/frame_bus.py
+
+import logging
+from collections import OrderedDict
+from typing import Iterable, List, Optional
+
+import cv2
+
+from .frame_range import open_video_range
+from .frame_reader import FFmpegFrameReader
+from .frame_sampling import ALL, INTERVAL, SamplingPolicy
+
+# Interval used for a keyframe/scene policy when ffmpeg can't select frames
+FALLBACK_INTERVAL = 1.0  # seconds
+
+
+class FrameConsumer:
+    """
+    Something fed frames by a FrameBus.
+
+    Which frames it gets is decided by its SamplingPolicy (every frame by
+    default); subclasses collect whatever they need in consume().
+    """
+
+    error: Optional[Exception] = None
+    # Consumers whose measurements depend on the source resolution get the
+    # frames as decoded, whatever the bus's max_width
+    full_resolution = False
+
+    def __init__(self, policy=ALL):
+        self.policy = SamplingPolicy.parse(policy)
+
+    def start(self, fps: float, frame_count: int) -> None:
+        """Called once before the first frame, with the range's frame count (0 if unknown)."""
+        self.policy.prepare(fps, frame_count)
+
+    def wants(self, index: int) -> bool:
+        """Return True if the frame at index (counted from the start of the range) should be consumed."""
+        return self.policy.wants(index)
+
+    def consume(self, frame, index: int, timestamp: float) -> None:
+        """Handle one decoded BGR frame; timestamp is in seconds from the start of the range."""
+        raise NotImplementedError
+
+
+class FrameBus:
+    """
+    Decode a video (or a time range of one) once and fan its frames out to consumers.
+
+    Consumers sampling by frame index share one decode; frames none of them
+    wants are only grabbed, not converted. Consumers with a keyframe or
+    scene policy get a pass of their own in which ffmpeg selects the frames
+    (one pass per distinct policy); a keyframe pass doesn't even decode the
+    other frames.
+
+    With max_width set, sources wider than that are decoded and downscaled
+    by ffmpeg (see FFmpegFrameReader) instead of OpenCV, so consumers never
+    see, and nobody pays for converting, the full-size frames. ffmpeg then
+    only outputs the frames some consumer wants. A pass with a
+    full_resolution consumer is decoded at the source size instead, and the
+    frames the other consumers want are downscaled one by one.
+    """
+
+    def __init__(self, video_path: str, start: Optional[float] = None, end: Optional[float] = None,
+                 max_width: Optional[int] = None):
+        self.video_path = video_path
+        self.start = start
+        self.end = end
+        self.max_width = max_width
+        self.frames_decoded = 0
+
+    def run(self, consumers: Iterable[FrameConsumer]) -> List[FrameConsumer]:
+        """
+        Feed every frame of the range to the consumers that want it.
+
+        A consumer that raises is logged, gets the exception stored in its
+        error attribute, and is not fed any further frames; the others carry
+        on. If the video can't be opened every consumer gets an IOError.
+
+        Returns:
+            The consumers, for convenience
+        """
+        consumers = list(consumers)
+        shared = [c for c in consumers if not c.policy.filtered]
+        filtered = OrderedDict()
+        for consumer in consumers:
+            if consumer.policy.filtered:
+                filtered.setdefault(consumer.policy.spec, []).append(consumer)
+
+        self.frames_decoded = 0
+        for spec, group in filtered.items():
+            full_resolution = any(c.full_resolution for c in group)
+            try:
+                keyframes_only, select = group[0].policy.ffmpeg_selection()
+                reader = FFmpegFrameReader(self.video_path, self.start, self.end,
+                                           max_width=None if full_resolution else self.max_width,
+                                           keyframes_only=keyframes_only, select=select)
+            except Exception as e:
+                logging.warning(f"Cannot select '{spec}' frames with ffmpeg, sampling every "
+                                f"{FALLBACK_INTERVAL}s instead: {str(e)}")
+                for consumer in group:
+                    consumer.policy = SamplingPolicy(INTERVAL, FALLBACK_INTERVAL)
+                shared.extend(group)
+                continue
+            self._dispatch(group, reader.fps, reader.frame_count, reader.frames, scaled=not full_resolution)
+
+        if shared:
+            try:
+                fps, frame_count, frames, scaled = self._open(full_resolution=any(c.full_resolution for c in shared))
+            except IOError as e:
+                logging.error(str(e))
+                for consumer in shared:
+                    consumer.error = e
+                return consumers
+            self._dispatch(shared, fps, frame_count, frames, scaled)
+
+        logging.info(f"Frame bus decoded {self.frames_decoded} frames of {self.video_path} "
+                     f"for {len(consumers)} consumers in {len(filtered) + bool(shared)} passes")
+        return consumers
+
+    def _dispatch(self, consumers: List[FrameConsumer], fps: float, frame_count: int, frames,
+                  scaled: bool = False) -> None:
+        """
+        Run one decoding pass, handing each frame to the consumers that want it.
+
+        Unless the frames are scaled already, consumers that aren't
+        full_resolution get them downscaled to max_width.
+        """
+        active = []
+        for consumer in consumers:
+            if self._call(consumer, consumer.start, fps, frame_count):
+                active.append(consumer)
+        if not active:
+            return
+
+        def wanted(index):
+            return any(c.wants(index) for c in active)
+
+        frame_iterator = frames(wanted)
+        try:
+            for index, frame in frame_iterator:
+                self.frames_decoded += 1
+                if frame is None:
+                    continue
+                timestamp = index / fps if fps > 0 else 0
+                small = None
+                for consumer in [c for c in active if c.wants(index)]:
+                    if scaled or consumer.full_resolution:
+                        consumer_frame = frame
+                    else:
+                        small = small if small is not None else self._fit(frame)
+                        consumer_frame = small
+                    if not self._call(consumer, consumer.consume, consumer_frame, index, timestamp):
+                        active.remove(consumer)
+                if not active:
+                    break
+        finally:
+            frame_iterator.close()
+
+    def _open(self, full_resolution: bool = False):
+        """
+        Return (fps, frame_count, frames, scaled) for the range.
+
+        frames(wants) yields (index, frame) for the frames of the range, with
+        frame None for the ones wants(index) turned down (an ffmpeg reader may
+        leave those out altogether). scaled is True if
+        ffmpeg already downscaled the frames to max_width.
+        """
+        if self.max_width and not full_resolution:
+            try:
+                reader = FFmpegFrameReader(self.video_path, self.start, self.end, max_width=self.max_width)
+            except Exception as e:
+                logging.warning(f"Falling back to OpenCV decoding of {self.video_path}: {str(e)}")
+            else:
+                if reader.width < reader.source_size[0]:
+                    return reader.fps, reader.frame_count, reader.frames, True
+
+        cap, fps, first_frame, last_frame = open_video_range(self.video_path, self.start, self.end)
+        if not cap.isOpened():
+            cap.release()
+            raise IOError(f"Could not open video file: {self.video_path}")
+
+        def frames(wants):
+            try:
+                index = 0
+                while self.end is None or first_frame + index < last_frame:
+                    if wants(index):
+                        ret, frame = cap.read()
+                    else:
+                        ret, frame = cap.grab(), None
+                    if not ret:
+                        break
+                    yield index, frame
+                    index += 1
+            finally:
+                cap.release()
+
+        return fps, max(last_frame - first_frame, 0), frames, False
+
+    def _fit(self, frame):
+        """Downscale a frame wider than max_width to that width."""
+        height, width = frame.shape[:2]
+        if not self.max_width or width <= self.max_width:
+            return frame
+        size = (self.max_width, max(int(round(height * self.max_width / width)), 1))
+        return cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+
+    @staticmethod
+    def _call(consumer: FrameConsumer, method, *args) -> bool:
+        try:
+            method(*args)
+            return True
+        except Exception as e:
+            logging.error(f"{type(consumer).__name__} failed: {str(e)}")
+            consumer.error = e
+            return False
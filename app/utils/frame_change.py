@@ -0,0 +1,58 @@
+# app/utils/frame_change.py
+
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+# Frames are compared as grayscale thumbnails this wide: area averaging
+# irons out compression noise, while a caption is still many pixels
+THUMBNAIL_WIDTH = 160
+# A thumbnail pixel counts as changed if it moved by more than this many grey levels
+PIXEL_THRESHOLD = 25
+# Share of changed pixels that makes a frame different; a new line of
+# caption text changes several times this much
+CHANGED_FRACTION = 0.002
+
+
+class FrameChangeDetector:
+    """
+    Tells whether a frame looks different from the last one that was analyzed.
+
+    changed() compares a downscaled grayscale copy of the frame with that of
+    the last frame it said had changed, so slow drift adds up until it
+    counts as a change instead of slipping through frame by frame.
+
+    region limits the comparison to the text-bearing part of the picture, as
+    (left, top, right, bottom) fractions of the frame, e.g. (0, 0.66, 1, 1)
+    for the lower third.
+    """
+
+    def __init__(self, pixel_threshold: int = PIXEL_THRESHOLD, changed_fraction: float = CHANGED_FRACTION,
+                 region: Optional[Tuple[float, float, float, float]] = None):
+        self.pixel_threshold = pixel_threshold
+        self.changed_fraction = changed_fraction
+        self.region = region
+        self.reference = None
+
+    def thumbnail(self, frame: np.ndarray) -> np.ndarray:
+        if self.region:
+            height, width = frame.shape[:2]
+            left, top, right, bottom = self.region
+            frame = frame[int(top * height):int(bottom * height), int(left * width):int(right * width)]
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        height, width = gray.shape
+        if width > THUMBNAIL_WIDTH:
+            gray = cv2.resize(gray, (THUMBNAIL_WIDTH, max(int(height * THUMBNAIL_WIDTH / width), 1)),
+                              interpolation=cv2.INTER_AREA)
+        return gray
+
+    def changed(self, frame: np.ndarray) -> bool:
+        """Return True (and remember the frame) if it differs from the last changed frame."""
+        thumbnail = self.thumbnail(frame)
+        if self.reference is not None and self.reference.shape == thumbnail.shape:
+            differing = np.count_nonzero(cv2.absdiff(thumbnail, self.reference) > self.pixel_threshold)
+            if differing <= self.changed_fraction * thumbnail.size:
+                return False
+        self.reference = thumbnail
+        return True
@@ -0,0 +1,75 @@
+# app/utils/frame_range.py
+
+import cv2
+
+
+def open_video_range(video_path, start=None, end=None):
+    """
+    Open a video with OpenCV, positioned at the first frame of a time range.
+
+    Lets the analyzers work on a (source, start, end) virtual clip as well as
+    on a clip file: without a range the whole video is covered.
+
+    Args:
+        video_path: Path to the video file
+        start: Range start in seconds, or None for the beginning
+        end: Range end in seconds, or None for the end of the video
+
+    Returns:
+        (capture, fps, first_frame, last_frame) with last_frame exclusive
+    """
+    cap = cv2.VideoCapture(video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+    first_frame = int(round(start * fps)) if start and fps else 0
+    last_frame = frame_count
+    if end is not None and fps:
+        end_frame = int(round(end * fps))
+        last_frame = min(end_frame, frame_count) if frame_count > 0 else end_frame
+
+    if first_frame:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, first_frame)
+
+    return cap, fps, first_frame, last_frame
+
+
+def read_frames_sequentially(cap, frame_indices):
+    """
+    Read the given frames of a capture by walking forward through the stream.
+
+    Replaces a cap.set(CAP_PROP_POS_FRAMES, idx) + cap.read() per sample:
+    on long-GOP video every such seek decodes again from the previous
+    keyframe. Here skipped frames are only grab()bed and just the targets
+    are retrieve()d, so each frame is decoded at most once.
+
+    Args:
+        cap: An opened cv2.VideoCapture, e.g. from open_video_range
+        frame_indices: Frame indices relative to the capture's current
+            position, in any order
+
+    Yields:
+        (frame_index, frame) in increasing index order; an index is yielded
+        once per occurrence in frame_indices, and indices past the end of
+        the stream are skipped just like a failed seek-and-read
+    """
+    position = 0
+    frame = None
+    for frame_idx in sorted(frame_indices):
+        if frame_idx < 0:
+            continue
+        if frame_idx == position - 1:
+            # Same index asked for twice
+            if frame is not None:
+                yield frame_idx, frame
+            continue
+
+        while position < frame_idx:
+            if not cap.grab():
+                return
+            position += 1
+        ret, frame = cap.read()
+        position += 1
+        if not ret:
+            return
+        yield frame_idx, frame
@@ -0,0 +1,288 @@
+# app/utils/frame_reader.py
+
+import logging
+import queue
+import re
+import subprocess
+import threading
+from typing import Callable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .media_probe import MediaInfo
+
+# Size of the pipe buffer ffmpeg writes frames into; a few frames of 720p
+PIPE_BUFFER_SIZE = 8 * 1024 * 1024
+# How long to wait for the showinfo line of a selected frame
+TIMESTAMP_TIMEOUT = 10  # seconds
+# Longest select expression (in eq/between terms) frames() hands ffmpeg for
+# the frames wanted; sparser than that, all frames come through the pipe
+MAX_SELECT_TERMS = 200
+
+_SHOWINFO_PTS = re.compile(r"\[Parsed_showinfo_\d+ @ [^\]]+\] n:\s*\d+ .*?pts_time:\s*(-?[\d.]+)")
+
+
+class FFmpegFrameReader:
+    """
+    Read frames of a video (or a time range of one) from an ffmpeg rawvideo pipe.
+
+    ffmpeg does the decoding, scaling and conversion to BGR24 in its own
+    threads, so a 4K source can be analyzed at e.g. 1280 px wide without
+    Python ever touching the full-size pixels. Each frame is read straight
+    into its own buffer and wrapped as a NumPy array without copying.
+
+    Iterating yields (index, frame) pairs, index counted from the start of
+    the range at the output frame rate.
+
+    frames() asks ffmpeg for only the frames its wants callback accepts, so
+    a consumer sampling a few frames of a clip doesn't have every other one
+    piped to it.
+
+    With keyframes_only or a select expression ffmpeg only hands over the
+    frames it selected (keyframes_only also stops it from decoding any other
+    frame). Their source timestamps are read from a showinfo filter on
+    stderr and their index is the source frame index at that time.
+
+    Args:
+        video_path: Path to the video file
+        start: Range start in seconds, or None for the beginning
+        end: Range end in seconds, or None for the end of the video
+        fps: Output frame rate, or None for the source rate
+        width: Output width; height follows the aspect ratio unless given
+        height: Output height
+        max_width: Only downscale when the source is wider than this
+        keyframes_only: Decode and return keyframes only
+        select: ffmpeg select expression picking the frames to return
+    """
+
+    def __init__(self, video_path: str, start: Optional[float] = None, end: Optional[float] = None,
+                 fps: Optional[float] = None, width: Optional[int] = None, height: Optional[int] = None,
+                 max_width: Optional[int] = None, keyframes_only: bool = False,
+                 select: Optional[str] = None):
+        self.video_path = video_path
+        self.start = start
+        self.end = end
+        self.keyframes_only = keyframes_only
+        self.select = select
+
+        info = MediaInfo.probe(video_path)
+        video = info.video_stream
+        if not video:
+            raise IOError(f"No video stream in {video_path}")
+        source_width, source_height = _display_size(video)
+        self.source_size = (source_width, source_height)
+
+        if width is None and max_width and source_width > max_width:
+            width = max_width
+        self.width = _even(width) if width else source_width
+        if height:
+            self.height = _even(height)
+        elif width:
+            self.height = _even(source_height * self.width / source_width)
+        else:
+            self.height = source_height
+
+        self.output_fps = fps
+        self.fps = fps or info.fps
+        duration = (end if end is not None else info.duration) - (start or 0)
+        if fps or start or end is not None:
+            self.frame_count = max(int(round(duration * self.fps)), 0)
+        else:
+            self.frame_count = info.total_frames
+
+    @property
+    def selective(self) -> bool:
+        return self.keyframes_only or bool(self.select)
+
+    def _command(self, indices: Optional[List[int]] = None):
+        # showinfo reports at info level
+        command = ['ffmpeg', '-v', 'info' if self.selective else 'error', '-nostdin', '-hide_banner']
+        if self.keyframes_only:
+            command += ['-skip_frame', 'nokey']
+        if self.start:
+            command += ['-ss', str(self.start)]
+        command += ['-i', self.video_path]
+        if self.end is not None:
+            command += ['-t', str(self.end - (self.start or 0))]
+
+        filters = []
+        if self.select:
+            filters.append(f"select='{self.select}'")
+        if self.selective:
+            filters.append("showinfo")
+        if self.output_fps:
+            filters.append(f"fps={self.output_fps}")
+        if indices is not None:
+            # After the fps filter, so n counts output frames as index does
+            filters.append(f"select='{_select_indices(indices)}'")
+        filters.append(f"scale={self.width}:{self.height}")
+        command += ['-map', '0:v:0', '-vf', ','.join(filters)]
+        if self.selective or indices is not None:
+            # Pass selected frames through as they are instead of duplicating
+            # them to a constant rate
+            command += ['-fps_mode', 'passthrough']
+        return command + [
+            '-pix_fmt', 'bgr24',
+            '-f', 'rawvideo',
+            '-'
+        ]
+
+    def frames(self, wants: Optional[Callable[[int], bool]] = None) -> Iterator[Tuple[int, np.ndarray]]:
+        """
+        Yield (index, frame) for the frames of the range, with frame None where wants(index) is False.
+
+        With the frame count known, wants is asked about every index up front
+        and ffmpeg only outputs (and scales and converts) the frames wanted;
+        the others aren't yielded at all. Otherwise every frame comes through
+        the pipe, the unwanted ones read into a reused scratch buffer instead
+        of being handed out.
+        """
+        frame_size = self.width * self.height * 3
+        indices = self._wanted_indices(wants)
+        process = subprocess.Popen(self._command(indices), stdout=subprocess.PIPE,
+                                   stderr=subprocess.PIPE if self.selective else subprocess.DEVNULL,
+                                   bufsize=PIPE_BUFFER_SIZE)
+        if indices is not None:
+            frames = self._read_selected(process, indices, frame_size)
+        elif self.selective:
+            frames = self._read_selective(process, wants, frame_size)
+        else:
+            frames = self._read_all(process, wants, frame_size)
+        count = 0
+        try:
+            for count, (index, frame) in enumerate(frames, 1):
+                yield index, frame
+        finally:
+            frames.close()
+            process.stdout.close()
+            if process.poll() is None:
+                process.kill()
+            process.wait()
+            logging.info(f"Read {count} frames of {self.video_path} at {self.width}x{self.height} from ffmpeg")
+
+    def _wanted_indices(self, wants: Optional[Callable[[int], bool]]) -> Optional[List[int]]:
+        """The indices to have ffmpeg select, or None to pipe every frame."""
+        if wants is None or self.selective or not self.frame_count:
+            return None
+        indices = [index for index in range(self.frame_count) if wants(index)]
+        if len(indices) == self.frame_count or _select_terms(indices) > MAX_SELECT_TERMS:
+            return None
+        return indices
+
+    def _read_selected(self, process, indices: List[int], frame_size: int):
+        for index in indices:
+            buffer = bytearray(frame_size)
+            if not _read_exactly(process.stdout, buffer):
+                return
+            yield index, self._wrap(buffer)
+
+    def _read_selective(self, process, wants, frame_size: int):
+        timestamps = self._follow_timestamps(process.stderr)
+        index = 0
+        while True:
+            # The index of a selected frame is only known once ffmpeg has logged it
+            buffer = bytearray(frame_size)
+            if not _read_exactly(process.stdout, buffer):
+                return
+            index = self._next_selected_index(timestamps, index)
+            yield index, self._wrap(buffer) if wants is None or wants(index) else None
+            index += 1
+
+    def _read_all(self, process, wants, frame_size: int):
+        scratch = bytearray(frame_size)
+        index = 0
+        while True:
+            wanted = wants is None or wants(index)
+            buffer = bytearray(frame_size) if wanted else scratch
+            if not _read_exactly(process.stdout, buffer):
+                return
+            yield index, self._wrap(buffer) if wanted else None
+            index += 1
+
+    def _wrap(self, buffer: bytearray) -> np.ndarray:
+        return np.frombuffer(buffer, dtype=np.uint8).reshape(self.height, self.width, 3)
+
+    def __iter__(self) -> Iterator[Tuple[int, np.ndarray]]:
+        return self.frames()
+
+    @staticmethod
+    def _follow_timestamps(stderr) -> "queue.Queue":
+        """Collect showinfo pts times from ffmpeg's stderr on a background thread."""
+        timestamps = queue.Queue()
+
+        def follow():
+            for line in iter(stderr.readline, b''):
+                match = _SHOWINFO_PTS.search(line.decode(errors='replace'))
+                if match:
+                    timestamps.put(float(match.group(1)))
+            stderr.close()
+            timestamps.put(None)
+
+        threading.Thread(target=follow, name="showinfo-reader", daemon=True).start()
+        return timestamps
+
+    def _next_selected_index(self, timestamps: "queue.Queue", next_index: int) -> int:
+        try:
+            pts_time = timestamps.get(timeout=TIMESTAMP_TIMEOUT)
+        except queue.Empty:
+            pts_time = None
+        if pts_time is None:
+            # ffmpeg is done logging: keep the end marker for the frames still
+            # in the pipe and number them on from the previous one
+            timestamps.put(None)
+            return next_index
+        return max(int(round(pts_time * self.fps)), 0)
+
+
+def _index_runs(indices: List[int]) -> List[Tuple[int, int]]:
+    """Sorted indices as (first, last) runs of consecutive ones."""
+    runs = []
+    for index in indices:
+        if runs and index == runs[-1][1] + 1:
+            runs[-1] = (runs[-1][0], index)
+        else:
+            runs.append((index, index))
+    return runs
+
+
+def _select_terms(indices: List[int]) -> int:
+    return len(_index_runs(indices))
+
+
+def _select_indices(indices: List[int]) -> str:
+    """An ffmpeg select expression true for the frames (n) at indices."""
+    return '+'.join(
+        f"eq(n,{first})" if first == last else f"between(n,{first},{last})"
+        for first, last in _index_runs(indices)
+    ) or '0'
+
+
+def _read_exactly(stream, buffer: bytearray) -> bool:
+    """Fill buffer from stream; False on end of stream before a full frame."""
+    view = memoryview(buffer)
+    filled = 0
+    while filled < len(buffer):
+        count = stream.readinto(view[filled:])
+        if not count:
+            return False
+        filled += count
+    return True
+
+
+def _even(value: float) -> int:
+    # yuv420 sources and most encoders want even dimensions
+    return max(int(round(value / 2)) * 2, 2)
+
+
+def _display_size(video_stream) -> Tuple[int, int]:
+    """Width and height of frames as ffmpeg outputs them, i.e. after autorotation."""
+    width, height = int(video_stream.get('width', 0)), int(video_stream.get('height', 0))
+    rotation = video_stream.get('tags', {}).get('rotate')
+    for side_data in video_stream.get('side_data_list', []):
+        rotation = side_data.get('rotation', rotation)
+    try:
+        if abs(int(float(rotation or 0))) % 180 == 90:
+            return height, width
+    except ValueError:
+        pass
+    return width, height
@@ -0,0 +1,84 @@
+# app/utils/frame_sampling.py
+
+from typing import Optional
+
+import numpy as np
+
+ALL = "all"
+INTERVAL = "interval"
+COUNT = "count"
+KEYFRAMES = "keyframes"
+SCENE = "scene"
+
+
+class SamplingPolicy:
+    """
+    Which frames of a range an analysis stage wants to see.
+
+    Policies are written as short specs so they can be set per stage in the
+    config:
+
+    - "all": every frame
+    - "interval:5": one frame every 5 seconds
+    - "count:10": 10 frames spread evenly over the range
+    - "keyframes": only keyframes; the decoder skips everything else
+    - "scene:0.3": frames whose ffmpeg scene change score exceeds 0.3
+
+    The first three pick frames by index and can share a decode with other
+    stages. Keyframe and scene policies are filtered policies: ffmpeg
+    selects the frames itself in a pass of their own (see FrameBus).
+    """
+
+    def __init__(self, kind: str = ALL, value: Optional[float] = None):
+        if kind not in (ALL, INTERVAL, COUNT, KEYFRAMES, SCENE):
+            raise ValueError(f"Unknown sampling policy: {kind}")
+        if kind in (INTERVAL, COUNT, SCENE) and (value is None or value <= 0):
+            raise ValueError(f"Sampling policy '{kind}' needs a positive value")
+        self.kind = kind
+        self.value = value
+        self._step = 1
+        self._indices = None
+
+    @classmethod
+    def parse(cls, spec) -> "SamplingPolicy":
+        """Build a policy from a spec like "interval:5", or pass a policy through."""
+        if isinstance(spec, SamplingPolicy):
+            return spec
+        kind, _, value = str(spec).strip().partition(':')
+        return cls(kind, float(value) if value else None)
+
+    @property
+    def spec(self) -> str:
+        return f"{self.kind}:{self.value:g}" if self.value is not None else self.kind
+
+    @property
+    def filtered(self) -> bool:
+        """True if ffmpeg has to select the frames, in a decode of their own."""
+        return self.kind in (KEYFRAMES, SCENE)
+
+    def ffmpeg_selection(self):
+        """Return (keyframes_only, select expression) for a filtered policy."""
+        if self.kind == KEYFRAMES:
+            return True, None
+        if self.kind == SCENE:
+            return False, f"gt(scene,{self.value:g})"
+        return False, None
+
+    def prepare(self, fps: float, frame_count: int) -> None:
+        """Resolve the policy against the range about to be decoded."""
+        if self.kind == INTERVAL:
+            self._step = max(int(self.value * int(fps)), 1)
+        elif self.kind == COUNT:
+            num_frames = min(int(self.value), frame_count)
+            self._indices = set(np.linspace(0, frame_count - 1, num_frames, dtype=int).tolist()) if num_frames > 0 else set()
+
+    def wants(self, index: int) -> bool:
+        if self.kind == INTERVAL:
+            return index % self._step == 0
+        if self.kind == COUNT:
+            return index in (self._indices or ())
+        # Filtered policies only ever see the frames ffmpeg selected
+        return True
+
+    def __repr__(self):
+        return f"SamplingPolicy({self.spec!r})"
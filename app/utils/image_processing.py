@@ -1,10 +1,15 @@
 import cv2
 import numpy as np
-import pytesseract
 from ultralytics import YOLO
 from tensorflow.keras.applications.resnet50 import ResNet50, preprocess_input, decode_predictions
 import logging
 
+from .frame_bus import FrameBus, FrameConsumer
+from .frame_change import CHANGED_FRACTION, PIXEL_THRESHOLD, FrameChangeDetector
+from .ocr_engine import DEFAULT_OCR_THREADS, get_ocr_engine
+from .ocr_spans import SpanTracker, lines_from_data
+from .text_regions import ocr_text_regions
+
 class VideoAnalyzer:
     def __init__(self):
         self.resnet_model = ResNet50(weights='imagenet')
@@ -58,54 +63,52 @@ class VideoAnalyzer:
             logging.error(f"Error in object detection: {str(e)}")
             return []
 
-def recognize_images_in_video(video_path, num_frames=10):
-    """Enhanced version of recognize_images_in_video with both classification and detection"""
-    try:
-        analyzer = VideoAnalyzer()
-        cap = cv2.VideoCapture(video_path)
-        
-        if not cap.isOpened():
-            logging.error(f"Could not open video file: {video_path}")
-            return {'classifications': [], 'detections': [], 'error': 'Could not open video file'}
-            
-        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        
+class FrameRecognizer(FrameConsumer):
+    """
+    Frame bus consumer running a VideoAnalyzer on sampled frames.
+
+    Samples num_frames frames spread evenly over the range unless given
+    another sampling policy.
+    """
+
+    def __init__(self, num_frames=10, analyzer=None, policy=None):
+        super().__init__(policy or f"count:{num_frames}")
+        self.analyzer = analyzer
+        self.fps = 0
+        self.frame_count = 0
+        self.classifications = []
+        self.detections = []
+        self.frame_timestamps = []
+
+    def start(self, fps, frame_count):
+        self.fps = fps
+        self.frame_count = frame_count
         if frame_count == 0 or fps == 0:
             logging.error(f"Invalid video properties: frames={frame_count}, fps={fps}")
-            return {'classifications': [], 'detections': [], 'error': 'Invalid video properties'}
-            
-        # Ensure we don't try to sample more frames than exist
-        num_frames = min(num_frames, frame_count)
-        frames_to_sample = np.linspace(0, frame_count - 1, num_frames, dtype=int)
-        
-        results = {
-            'classifications': [],
-            'detections': [],
-            'frame_timestamps': []
-        }
-        
-        for frame_idx in frames_to_sample:
-            cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
-            ret, frame = cap.read()
-            if not ret:
-                continue
-                
-            timestamp = frame_idx / fps if fps > 0 else 0
-            frame_results = analyzer.process_frame(frame)
-            
-            results['classifications'].extend(frame_results['classifications'])
-            results['detections'].extend([
-                {**det, 'timestamp': timestamp}
-                for det in frame_results['detections']
-            ])
-            results['frame_timestamps'].append(timestamp)
-        
-        cap.release()
-        
+            raise ValueError('Invalid video properties')
+
+        if self.analyzer is None:
+            self.analyzer = VideoAnalyzer()
+        # A count policy never samples more frames than exist
+        super().start(fps, frame_count)
+
+    def consume(self, frame, index, timestamp):
+        frame_results = self.analyzer.process_frame(frame)
+
+        self.classifications.extend(frame_results['classifications'])
+        self.detections.extend([
+            {**det, 'timestamp': timestamp}
+            for det in frame_results['detections']
+        ])
+        self.frame_timestamps.append(timestamp)
+
+    def result(self):
+        if self.error is not None:
+            return {'classifications': [], 'detections': [], 'error': str(self.error)}
+
         # Aggregate classifications
         class_counts = {}
-        for cls in results['classifications']:
+        for cls in self.classifications:
             label = cls['label']
             if label in class_counts:
                 class_counts[label]['count'] += 1
@@ -129,51 +132,86 @@ def recognize_images_in_video(video_path, num_frames=10):
         
         final_results = {
             'classifications': aggregated_classifications[:5],  # Top 5 classifications
-            'detections': results['detections'],  # All detections with timestamps
-            'analyzed_frames': len(results['frame_timestamps']),
-            'video_duration': frame_count / fps if fps > 0 else 0
+            'detections': self.detections,  # All detections with timestamps
+            'analyzed_frames': len(self.frame_timestamps),
+            'video_duration': self.frame_count / self.fps if self.fps > 0 else 0
         }
         
         # Ensure results is serializable
         logging.info(f"Successfully processed video with {len(final_results['detections'])} detections")
         return final_results
+
+def recognize_images_in_video(video_path, num_frames=10, start=None, end=None, max_width=None, policy=None):
+    """Enhanced version of recognize_images_in_video with both classification and detection"""
+    recognizer = FrameRecognizer(num_frames, policy=policy)
+    FrameBus(video_path, start, end, max_width=max_width).run([recognizer])
+    return recognizer.result()
         
-    except Exception as e:
-        logging.error(f"Error in recognize_images_in_video: {str(e)}")
-        return {
-            'classifications': [],
-            'detections': [],
-            'error': str(e)
-        }
-        
+def ocr_from_video(video_path, region=None, pixel_threshold=PIXEL_THRESHOLD, changed_fraction=CHANGED_FRACTION,
+                   text_regions=True, engine=None, threads=DEFAULT_OCR_THREADS, spans=False):
+    """
+    OCR every frame of a video, word by word with positions.
+
+    Tesseract only runs on frames that changed since the last frame it ran
+    on (see FrameChangeDetector; region restricts the comparison to where
+    the text is). Unchanged frames repeat the previous frame's words at
+    their own timestamp, so the timeline still has an entry for every frame.
 
-def ocr_from_video(video_path):
+    With text_regions, tesseract only reads the crops propose_text_regions
+    finds, and the bboxes are mapped back to the full frame. engine and
+    threads pick the OCR engine (see get_ocr_engine).
+
+    With spans, the lines read are merged across frames by a SpanTracker and
+    its spans are returned instead of the per-frame words.
+    """
     video = cv2.VideoCapture(video_path)
     fps = video.get(cv2.CAP_PROP_FPS)
     ocr_results = []
+    detector = FrameChangeDetector(pixel_threshold, changed_fraction, region)
+    ocr_engine = get_ocr_engine(engine, threads)
+    tracker = SpanTracker() if spans else None
+    frame_words = []
+    frame_lines = []
+    frames_read = 0
+    frames_ocred = 0
 
     while video.isOpened():
         ret, frame = video.read()
         if not ret:
             break
+        frames_read += 1
 
         # Get frame timestamp
         timestamp = video.get(cv2.CAP_PROP_POS_FRAMES) / fps
 
-        # Process frame with Tesseract
-        d = pytesseract.image_to_data(frame, output_type=pytesseract.Output.DICT)
-        
-        # Collect results with position information
-        for i in range(len(d['text'])):
-            if int(d['conf'][i]) > 60:  # Filter by confidence
-                result = {
-                    'text': d['text'][i],
-                    'bbox': [d['left'][i], d['top'][i], 
-                            d['width'][i], d['height'][i]],
-                    'confidence': int(d['conf'][i]) / 100,
-                    'timestamp': timestamp
-                }
-                ocr_results.append(result)
+        if detector.changed(frame):
+            frames_ocred += 1
+            # Process frame with Tesseract
+            if text_regions:
+                d = ocr_text_regions(frame, engine=ocr_engine)
+            else:
+                d = ocr_engine.image_to_data(frame)
+
+            # Collect results with position information
+            frame_words = []
+            for i in range(len(d['text'])):
+                if int(d['conf'][i]) > 60:  # Filter by confidence
+                    frame_words.append({
+                        'text': d['text'][i],
+                        'bbox': [d['left'][i], d['top'][i], 
+                                d['width'][i], d['height'][i]],
+                        'confidence': int(d['conf'][i]) / 100,
+                    })
+            if tracker is not None:
+                frame_lines = lines_from_data(d, min_confidence=60)
+
+        if tracker is not None:
+            tracker.add(timestamp, frame_lines)
+        else:
+            ocr_results.extend({**word, 'timestamp': timestamp} for word in frame_words)
 
     video.release()
-    return ocr_results
\ No newline at end of file
+    logging.info(f"OCR ran on {frames_ocred} of {frames_read} frames of {video_path}")
+    if tracker is not None:
+        return tracker.spans()
+    return ocr_results
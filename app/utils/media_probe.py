@@ -0,0 +1,277 @@
+# app/utils/media_probe.py
+
+import copy
+import hashlib
+import json
+import logging
+import os
+import subprocess
+import tempfile
+import time
+from fractions import Fraction
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+# Probes are also kept on disk here, one file per file version, so other
+# processes (clip workers, later requests) don't probe a file again. Entries
+# nobody has read for PROBE_CACHE_MAX_AGE are deleted.
+PROBE_CACHE_DIR = os.path.join(tempfile.gettempdir(), "media_probe_cache")
+PROBE_CACHE_MAX_AGE = 7 * 24 * 3600  # seconds
+PROBE_CACHE_VERSION = 2
+
+# Subtitle codecs carrying text (bitmap ones like dvd_subtitle or
+# hdmv_pgs_subtitle would need OCR)
+TEXT_SUBTITLE_CODECS = ('subrip', 'srt', 'ass', 'ssa', 'webvtt', 'mov_text', 'text')
+
+_probe_cache: Dict[Tuple, "MediaInfo"] = {}
+_cache_lock = Lock()
+
+
+def file_identity(path: str) -> Tuple[str, int, int, int]:
+    """
+    Identify a version of a file: (real path, size, mtime in ns, inode).
+
+    Any write, or another file moved in under the same name, gives a new
+    identity, so a cached probe is never used for a file it wasn't made from.
+    """
+    real_path = os.path.realpath(path)
+    stat = os.stat(real_path)
+    return real_path, stat.st_size, stat.st_mtime_ns, stat.st_ino
+
+
+class MediaInfo:
+    """
+    Stream, format, keyframe and audio layout information for a media file.
+
+    Everything comes from a single ffprobe call that only demuxes (no
+    decoding and no -count_packets). The result is cached in memory and in
+    PROBE_CACHE_DIR under the file's identity (see file_identity), so a file
+    is probed once no matter how many steps need to know about it.
+    """
+
+    def __init__(self, path: str, identity: Tuple, data: Dict):
+        self.path = path
+        self.identity = identity
+        self.format = data.get('format', {})
+        self.streams = data.get('streams', [])
+        self.keyframes = data.get('keyframes', [])
+        self.video_packets = data.get('video_packets', 0)
+
+    @classmethod
+    def probe(cls, path: str) -> "MediaInfo":
+        """Return the MediaInfo for path, running ffprobe only if no cached probe matches."""
+        identity = file_identity(path)
+        with _cache_lock:
+            info = _probe_cache.get(identity)
+
+        if info is None:
+            info = cls._read_cached(path, identity)
+            if info is None:
+                info = cls(path, identity, cls._run_ffprobe(path))
+                info._write_cached()
+            with _cache_lock:
+                _probe_cache[identity] = info
+
+        if info.path != path:
+            # The same file asked for under another name (relative path, symlink)
+            info = copy.copy(info)
+            info.path = path
+        return info
+
+    @staticmethod
+    def _run_ffprobe(path: str) -> Dict:
+        ffprobe_cmd = [
+            'ffprobe',
+            '-v', 'error',
+            '-print_format', 'json',
+            '-show_format',
+            '-show_streams',
+            path
+        ]
+        output = subprocess.check_output(ffprobe_cmd, stderr=subprocess.PIPE)
+        data = json.loads(output)
+        streams = data.get('streams', [])
+
+        video_index = (_find_video_stream(streams) or {}).get('index')
+        keyframes, video_packets = _read_packets(path, video_index) if video_index is not None else ([], 0)
+        logging.info(f"Probed {path}: {len(streams)} streams, {len(keyframes)} keyframes")
+
+        return {
+            'format': data.get('format', {}),
+            'streams': streams,
+            'keyframes': keyframes,
+            'video_packets': video_packets
+        }
+
+    @classmethod
+    def _read_cached(cls, path: str, identity: Tuple) -> Optional["MediaInfo"]:
+        cache_file = _cache_file(identity)
+        if not os.path.exists(cache_file):
+            return None
+        try:
+            with open(cache_file, 'r') as f:
+                cached = json.load(f)
+            # Reading an entry keeps it from expiring
+            os.utime(cache_file)
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable probe cache {cache_file}: {str(e)}")
+            return None
+        if cached.get('version') != PROBE_CACHE_VERSION or tuple(cached.get('identity', ())) != identity:
+            return None
+        return cls(path, identity, cached['data'])
+
+    def _write_cached(self) -> None:
+        cache_file = _cache_file(self.identity)
+        try:
+            os.makedirs(PROBE_CACHE_DIR, exist_ok=True)
+            _remove_expired_probes()
+            # Written under a temporary name and renamed, so another process
+            # never reads a half-written entry
+            fd, partial_path = tempfile.mkstemp(dir=PROBE_CACHE_DIR, suffix='.partial')
+            with os.fdopen(fd, 'w') as f:
+                json.dump({
+                    'version': PROBE_CACHE_VERSION,
+                    'identity': list(self.identity),
+                    'data': {
+                        'format': self.format,
+                        'streams': self.streams,
+                        'keyframes': self.keyframes,
+                        'video_packets': self.video_packets
+                    }
+                }, f)
+            os.replace(partial_path, cache_file)
+        except OSError as e:
+            # An unwritable cache folder only costs us the cache
+            logging.warning(f"Could not write probe cache {cache_file}: {str(e)}")
+
+    @property
+    def video_stream(self) -> Optional[Dict]:
+        return _find_video_stream(self.streams)
+
+    @property
+    def audio_streams(self) -> List[Dict]:
+        return [s for s in self.streams if s.get('codec_type') == 'audio']
+
+    @property
+    def subtitle_streams(self) -> List[Dict]:
+        return [s for s in self.streams if s.get('codec_type') == 'subtitle']
+
+    @property
+    def text_subtitle_streams(self) -> List[Dict]:
+        return [s for s in self.subtitle_streams if s.get('codec_name') in TEXT_SUBTITLE_CODECS]
+
+    @property
+    def audio_layout(self) -> Optional[Dict]:
+        """Sample rate, channel count and layout of the first audio stream."""
+        if not self.audio_streams:
+            return None
+        audio = self.audio_streams[0]
+        return {
+            'codec_name': audio.get('codec_name'),
+            'sample_rate': int(audio.get('sample_rate', 0) or 0),
+            'channels': int(audio.get('channels', 0) or 0),
+            'channel_layout': audio.get('channel_layout')
+        }
+
+    @property
+    def duration(self) -> float:
+        if _is_number(self.format.get('duration')):
+            return float(self.format['duration'])
+        for stream in self.streams:
+            if _is_number(stream.get('duration')):
+                return float(stream['duration'])
+        if self.fps and self.total_frames:
+            return self.total_frames / self.fps
+        return 0
+
+    @property
+    def fps(self) -> float:
+        video = self.video_stream or {}
+        for key in ('avg_frame_rate', 'r_frame_rate'):
+            try:
+                rate = float(Fraction(video.get(key, '0/0')))
+            except (ValueError, ZeroDivisionError):
+                continue
+            if rate > 0:
+                return rate
+        return 0
+
+    @property
+    def total_frames(self) -> int:
+        video = self.video_stream or {}
+        if _is_number(video.get('nb_frames')):
+            return int(video['nb_frames'])
+        # Every video packet holds one frame, and we already counted them
+        # while demuxing for the keyframe index.
+        return self.video_packets
+
+
+def _cache_file(identity: Tuple) -> str:
+    return os.path.join(PROBE_CACHE_DIR, hashlib.sha1(json.dumps(list(identity)).encode()).hexdigest() + '.json')
+
+
+def _remove_expired_probes() -> None:
+    cutoff = time.time() - PROBE_CACHE_MAX_AGE
+    for entry in os.scandir(PROBE_CACHE_DIR):
+        try:
+            if entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+        except OSError:
+            continue
+
+
+def _find_video_stream(streams: List[Dict]) -> Optional[Dict]:
+    # Cover art is reported as a video stream too
+    return next(
+        (s for s in streams if s.get('codec_type') == 'video'
+         and not s.get('disposition', {}).get('attached_pic')),
+        None
+    )
+
+
+def _read_packets(path: str, stream_index: int) -> Tuple[List[float], int]:
+    """
+    Demux one stream and return its keyframe times (sorted) and packet count.
+
+    ffprobe lists only that stream's packets, as CSV read line by line, so a
+    multi-hour file's packet list is never held in memory.
+    """
+    ffprobe_cmd = [
+        'ffprobe',
+        '-v', 'error',
+        '-select_streams', str(stream_index),
+        '-show_entries', 'packet=pts_time,flags',
+        '-print_format', 'csv=print_section=0',
+        path
+    ]
+    keyframes = []
+    packets = 0
+    with subprocess.Popen(ffprobe_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True) as process:
+        for line in process.stdout:
+            fields = line.strip().split(',')
+            if not fields[0]:
+                continue
+            packets += 1
+            # pts_time,flags, e.g. "2.000000,K__"; pts_time is N/A for some packets
+            if 'K' in fields[-1] and _is_number(fields[0]):
+                keyframes.append(float(fields[0]))
+        stderr = process.stderr.read()
+    if process.returncode:
+        raise subprocess.CalledProcessError(process.returncode, ffprobe_cmd, stderr=stderr)
+    return sorted(keyframes), packets
+
+
+def _is_number(value) -> bool:
+    try:
+        float(value)
+        return True
+    except (TypeError, ValueError):
+        return False
+
+
+def get_video_info(input_file: str) -> Tuple[int, float, Optional[float]]:
+    """Return (total_frames, fps, duration) of a video from its cached probe."""
+    info = MediaInfo.probe(input_file)
+    duration = info.duration or None
+    logging.info(f"Video info: Total frames: {info.total_frames}, FPS: {info.fps}, Duration: {duration}")
+    return info.total_frames, info.fps, duration
@@ -0,0 +1,194 @@
+# app/utils/network_io.py
+
+import logging
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Optional, Tuple, Type
+
+# Settings used when none are configured; see NETWORK_IO in the config
+DEFAULT_NETWORK_IO = {
+    'workers': 8,  # threads shared by all remote calls of a process
+    'limits': {'asr': 4, 'translate': 4},  # concurrent calls per service
+    'attempts': 3,  # tries per call, the first one included
+    'backoff': 0.5,  # seconds before the first retry, doubled for each one after it
+    'max_backoff': 8.0,
+    'breaker_failures': 5,  # consecutive failed calls that open a service's circuit
+    'breaker_reset': 30.0,  # seconds an open circuit waits before letting a trial call through
+}
+DEFAULT_SERVICE_LIMIT = 4
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a service whose circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Stops calling a service that keeps failing.
+
+    After failure_threshold consecutive failures the circuit opens and
+    calls fail straight away with CircuitOpenError, instead of each one
+    waiting out its timeouts and retries. After reset_timeout one trial
+    call is let through: success closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if self.clock() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def before_call(self) -> None:
+        with self._lock:
+            state = self.state
+            if state == "open" or (state == "half-open" and self._trial_running):
+                raise CircuitOpenError(f"{self.name} is unavailable, not calling it for now")
+            if state == "half-open":
+                self._trial_running = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self._trial_running or self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    logging.warning(f"Opening circuit of {self.name} after {self.failures} failures")
+                self.opened_at = self.clock()
+            self._trial_running = False
+
+
+class RemoteService:
+    """
+    A remote dependency (the ASR or the translation service) and the rules for calling it.
+
+    Calls are limited to limit at a time across all threads, failed calls
+    are retried with exponential backoff and jitter, and a CircuitBreaker
+    cuts the service off while it is down.
+    """
+
+    def __init__(self, name: str, limit: int = DEFAULT_SERVICE_LIMIT, attempts: int = 3,
+                 backoff: float = 0.5, max_backoff: float = 8.0, breaker_failures: int = 5,
+                 breaker_reset: float = 30.0, sleep: Callable[[float], None] = time.sleep):
+        self.name = name
+        self.attempts = max(attempts, 1)
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.breaker = CircuitBreaker(name, breaker_failures, breaker_reset)
+        self.sleep = sleep
+        self._slots = threading.BoundedSemaphore(limit)
+
+    def call(self, func: Callable, *args, retry_on: Tuple[Type[BaseException], ...] = (Exception,), **kwargs):
+        """
+        Call func(*args, **kwargs) under the service's limits.
+
+        Only exceptions in retry_on are retried and count as failures of the
+        service; others (e.g. "no speech recognized") are raised at once.
+        """
+        self.breaker.before_call()
+        with self._slots:
+            for attempt in range(1, self.attempts + 1):
+                try:
+                    result = func(*args, **kwargs)
+                except retry_on as e:
+                    if attempt == self.attempts:
+                        self.breaker.record_failure()
+                        raise
+                    delay = min(self.backoff * 2 ** (attempt - 1), self.max_backoff)
+                    delay *= random.uniform(0.5, 1.0)
+                    logging.warning(f"{self.name} call failed ({str(e)}), retry {attempt} in {delay:.2f}s")
+                    self.sleep(delay)
+                except Exception:
+                    # The service answered, just not with a result
+                    self.breaker.record_success()
+                    raise
+                else:
+                    self.breaker.record_success()
+                    return result
+
+
+class IOExecutor:
+    """
+    One thread pool for a process's network-bound work.
+
+    Remote calls (speech recognition, translation) are submitted here so
+    they run while the calling thread gets on with CPU-bound OCR and frame
+    analysis. call()/submit_call() go through the named RemoteService.
+    """
+
+    def __init__(self, settings: Optional[Dict] = None):
+        self.settings = {**DEFAULT_NETWORK_IO, **(settings or {})}
+        self._executor = ThreadPoolExecutor(max_workers=self.settings['workers'], thread_name_prefix="io")
+        self._services = {}
+        self._lock = threading.Lock()
+
+    def service(self, name: str) -> RemoteService:
+        with self._lock:
+            if name not in self._services:
+                settings = self.settings
+                self._services[name] = RemoteService(
+                    name,
+                    limit=settings['limits'].get(name, DEFAULT_SERVICE_LIMIT),
+                    attempts=settings['attempts'],
+                    backoff=settings['backoff'],
+                    max_backoff=settings['max_backoff'],
+                    breaker_failures=settings['breaker_failures'],
+                    breaker_reset=settings['breaker_reset'],
+                )
+            return self._services[name]
+
+    def call(self, service: str, func: Callable, *args, **kwargs):
+        """Call func through the named service on the calling thread."""
+        return self.service(service).call(func, *args, **kwargs)
+
+    def submit(self, func: Callable, *args, **kwargs) -> Future:
+        """Run func on the pool; it must not wait on other futures of this pool."""
+        return self._executor.submit(func, *args, **kwargs)
+
+    def submit_call(self, service: str, func: Callable, *args, **kwargs) -> Future:
+        """Call func through the named service on the pool."""
+        return self._executor.submit(self.call, service, func, *args, **kwargs)
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
+
+
+_io_executor = None
+_io_lock = threading.Lock()
+
+
+def get_io_executor(settings: Optional[Dict] = None) -> IOExecutor:
+    """
+    Return the process's IOExecutor, created on first use.
+
+    Passing settings (the NETWORK_IO config) that differ from the current
+    ones replaces it; the old pool finishes its queued calls in the
+    background.
+    """
+    global _io_executor
+    with _io_lock:
+        wanted = {**DEFAULT_NETWORK_IO, **(settings or {})}
+        if _io_executor is None or (settings is not None and _io_executor.settings != wanted):
+            if _io_executor is not None:
+                _io_executor.shutdown(wait=False)
+            _io_executor = IOExecutor(settings)
+        return _io_executor
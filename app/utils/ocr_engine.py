@@ -0,0 +1,179 @@
+# app/utils/ocr_engine.py
+
+import logging
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+import pytesseract
+
+try:
+    import tesserocr
+except ImportError:  # optional; without it OCR goes through the tesseract command line
+    tesserocr = None
+
+DEFAULT_OCR_ENGINE = "tesserocr"
+DEFAULT_OCR_THREADS = 2
+DEFAULT_LANGUAGE = "eng"
+# Keys of the image_to_data dicts the engines return
+DATA_KEYS = ('block_num', 'text', 'conf', 'left', 'top', 'width', 'height')
+
+
+class OCREngine:
+    """
+    Tesseract behind one interface, taking NumPy images (BGR or grayscale).
+
+    image_to_data() returns words in pytesseract.image_to_data's DICT
+    layout (DATA_KEYS) and image_to_string() the plain text. map() runs
+    either over several images on up to threads worker threads.
+    """
+
+    name = None
+
+    def __init__(self, threads: int = 1, language: str = DEFAULT_LANGUAGE):
+        self.threads = max(threads, 1)
+        self.language = language
+        self._executor = ThreadPoolExecutor(self.threads, thread_name_prefix="ocr") if self.threads > 1 else None
+
+    def image_to_data(self, image: np.ndarray, config: str = "") -> Dict[str, list]:
+        raise NotImplementedError
+
+    def image_to_string(self, image: np.ndarray, config: str = "") -> str:
+        raise NotImplementedError
+
+    def map(self, method: str, images: List[np.ndarray], config: str = "") -> list:
+        """Apply image_to_data or image_to_string to each image, in order."""
+        func = getattr(self, method)
+        if self._executor is None or len(images) < 2:
+            return [func(image, config) for image in images]
+        return list(self._executor.map(lambda image: func(image, config), images))
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+
+
+class PytesseractEngine(OCREngine):
+    """
+    The tesseract command line through pytesseract.
+
+    Every call writes the image to a temporary file and starts a tesseract
+    process, which is a large share of the cost for small crops.
+    """
+
+    name = "pytesseract"
+
+    def image_to_data(self, image, config=""):
+        d = pytesseract.image_to_data(image, lang=self.language, config=config,
+                                      output_type=pytesseract.Output.DICT)
+        return {key: d[key] for key in DATA_KEYS}
+
+    def image_to_string(self, image, config=""):
+        return pytesseract.image_to_string(image, lang=self.language, config=config)
+
+
+class TesserocrEngine(OCREngine):
+    """
+    The tesseract library in process, through tesserocr.
+
+    Each thread keeps its own PyTessBaseAPI, loaded once and reused for
+    every image; pixels are handed over from memory. tesserocr releases
+    the GIL while recognizing, so threads run in parallel.
+    """
+
+    name = "tesserocr"
+
+    def __init__(self, threads=1, language=DEFAULT_LANGUAGE):
+        super().__init__(threads, language)
+        self._local = threading.local()
+        self._apis = []
+        self._lock = threading.Lock()
+
+    def _api(self, image, config):
+        api = getattr(self._local, "api", None)
+        if api is None:
+            api = self._local.api = tesserocr.PyTessBaseAPI(lang=self.language)
+            with self._lock:
+                self._apis.append(api)
+        api.SetPageSegMode(_page_segmentation_mode(config))
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+        gray = np.ascontiguousarray(gray, dtype=np.uint8)
+        height, width = gray.shape
+        api.SetImageBytes(gray.tobytes(), width, height, 1, width)
+        return api
+
+    def image_to_data(self, image, config=""):
+        api = self._api(image, config)
+        api.Recognize()
+        data = {key: [] for key in DATA_KEYS}
+        iterator = api.GetIterator()
+        if iterator is None:
+            return data
+
+        level = tesserocr.RIL.WORD
+        block = 0
+        for word in tesserocr.iterate_level(iterator, level):
+            if word.IsAtBeginningOf(tesserocr.RIL.BLOCK):
+                block += 1
+            text = word.GetUTF8Text(level)
+            box = word.BoundingBox(level)
+            if not text or box is None:
+                continue
+            left, top, right, bottom = box
+            data['block_num'].append(block)
+            data['text'].append(text)
+            data['conf'].append(word.Confidence(level))
+            data['left'].append(left)
+            data['top'].append(top)
+            data['width'].append(right - left)
+            data['height'].append(bottom - top)
+        return data
+
+    def image_to_string(self, image, config=""):
+        return self._api(image, config).GetUTF8Text()
+
+    def close(self):
+        super().close()
+        with self._lock:
+            for api in self._apis:
+                api.End()
+            self._apis = []
+
+
+OCR_ENGINES = {
+    engine.name: engine
+    for engine in (PytesseractEngine, TesserocrEngine)
+}
+
+_engines: Dict = {}
+_engines_lock = threading.Lock()
+
+
+def get_ocr_engine(name: Optional[str] = None, threads: int = DEFAULT_OCR_THREADS,
+                   language: str = DEFAULT_LANGUAGE) -> OCREngine:
+    """
+    Return the engine registered under name, created once per process.
+
+    tesserocr is an optional dependency; if it isn't installed, the
+    pytesseract engine is used instead.
+    """
+    name = name or DEFAULT_OCR_ENGINE
+    if name not in OCR_ENGINES:
+        raise ValueError(f"Unknown OCR engine: {name}")
+    key = (name, threads, language)
+    with _engines_lock:
+        if key not in _engines:
+            if name == TesserocrEngine.name and tesserocr is None:
+                logging.warning("tesserocr is not installed, running OCR through pytesseract")
+                name = PytesseractEngine.name
+            _engines[key] = OCR_ENGINES[name](threads, language)
+        return _engines[key]
+
+
+def _page_segmentation_mode(config: str) -> int:
+    """Read --psm N from a tesseract config string; 3 (automatic) is tesseract's default."""
+    match = re.search(r"--psm\s+(\d+)", config or "")
+    return int(match.group(1)) if match else 3
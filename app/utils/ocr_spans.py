@@ -0,0 +1,146 @@
+# app/utils/ocr_spans.py
+
+import re
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional
+
+# Texts at least this similar (difflib ratio, after normalization) are the
+# same caption read twice; OCR rarely reads a line identically twice
+TEXT_SIMILARITY = 0.8
+# Boxes of the same caption in two frames overlap at least this much (IoU)
+BOX_OVERLAP = 0.3
+# Observations a span may miss in a row before it is closed, so a frame
+# where OCR dropped the caption doesn't split it in two
+PATIENCE = 1
+
+
+def lines_from_data(d: Dict[str, list], min_confidence: float = 0) -> List[Dict]:
+    """
+    Group the words of an image_to_data dict into lines, one per block.
+
+    Only words with a confidence above min_confidence (0-100, as tesseract
+    reports it; non-words have -1) are kept.
+
+    Returns:
+        {'text', 'bbox', 'confidence'} dicts, bbox as [left, top, width,
+        height] around the line's words and confidence their mean, 0-1
+    """
+    blocks = {}
+    for i, text in enumerate(d['text']):
+        confidence = float(d['conf'][i])
+        if not str(text).strip() or confidence <= min_confidence:
+            continue
+        blocks.setdefault(d['block_num'][i], []).append(i)
+
+    lines = []
+    for indices in blocks.values():
+        left = min(d['left'][i] for i in indices)
+        top = min(d['top'][i] for i in indices)
+        right = max(d['left'][i] + d['width'][i] for i in indices)
+        bottom = max(d['top'][i] + d['height'][i] for i in indices)
+        lines.append({
+            'text': " ".join(str(d['text'][i]).strip() for i in indices),
+            'bbox': [left, top, right - left, bottom - top],
+            'confidence': round(sum(float(d['conf'][i]) for i in indices) / len(indices) / 100, 3),
+        })
+    return lines
+
+
+class SpanTracker:
+    """
+    Merges what OCR reads in successive frames into spans of on-screen text.
+
+    add() takes the lines read in one frame. A line continues an open span
+    if its text is near-identical and its box overlaps the span's; otherwise
+    it starts a new span. A span missing from more than patience frames in
+    a row is closed, so a caption coming back later is a new span.
+
+    Spans are {'text', 'bbox', 'first_seen', 'last_seen', 'confidence'}
+    dicts; text and bbox are those of the most confident reading and
+    confidence the highest seen.
+    """
+
+    def __init__(self, similarity: float = TEXT_SIMILARITY, box_overlap: float = BOX_OVERLAP,
+                 patience: int = PATIENCE):
+        self.similarity = similarity
+        self.box_overlap = box_overlap
+        self.patience = patience
+        self._spans = []
+        self._open = []  # [span, normalized text, frames missed]
+
+    def add(self, timestamp: float, lines: List[Dict]) -> None:
+        matched = set()
+        for line in lines:
+            key = _normalize(line['text'])
+            if not key:
+                continue
+            best, best_score = None, self.similarity
+            for i, (span, span_key, _) in enumerate(self._open):
+                if i in matched or not _overlaps(span['bbox'], line.get('bbox'), self.box_overlap):
+                    continue
+                score = 1.0 if span_key == key else SequenceMatcher(None, span_key, key).ratio()
+                if score >= best_score:
+                    best, best_score = i, score
+            if best is None:
+                span = {
+                    'text': line['text'],
+                    'bbox': line.get('bbox'),
+                    'first_seen': timestamp,
+                    'last_seen': timestamp,
+                    'confidence': line.get('confidence'),
+                }
+                self._spans.append(span)
+                self._open.append([span, key, 0])
+                matched.add(len(self._open) - 1)
+            else:
+                self._extend(best, timestamp, line, key)
+                matched.add(best)
+
+        still_open = []
+        for i, entry in enumerate(self._open):
+            if i not in matched:
+                entry[2] += 1
+            if entry[2] <= self.patience:
+                still_open.append(entry)
+        self._open = still_open
+
+    def _extend(self, index: int, timestamp: float, line: Dict, key: str) -> None:
+        entry = self._open[index]
+        span = entry[0]
+        span['last_seen'] = timestamp
+        entry[2] = 0
+        confidence = line.get('confidence')
+        if confidence is not None and (span['confidence'] is None or confidence > span['confidence']):
+            span.update(text=line['text'], bbox=line.get('bbox'), confidence=confidence)
+            entry[1] = key
+
+    def spans(self) -> List[Dict]:
+        return sorted(self._spans, key=lambda span: span['first_seen'])
+
+
+def unique_texts(spans: List[Dict]) -> List[str]:
+    """The distinct texts of spans in order of first appearance; what gets translated."""
+    texts = []
+    seen = set()
+    for span in sorted(spans, key=lambda span: span['first_seen']):
+        key = _normalize(span['text'])
+        if key and key not in seen:
+            seen.add(key)
+            texts.append(span['text'])
+    return texts
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", re.sub(r"[^\w\s]", "", str(text).lower())).strip()
+
+
+def _overlaps(a: Optional[List[int]], b: Optional[List[int]], threshold: float) -> bool:
+    """IoU of two [left, top, width, height] boxes is at least threshold; unknown boxes always overlap."""
+    if a is None or b is None:
+        return True
+    width = min(a[0] + a[2], b[0] + b[2]) - max(a[0], b[0])
+    height = min(a[1] + a[3], b[1] + b[3]) - max(a[1], b[1])
+    if width <= 0 or height <= 0:
+        return False
+    intersection = width * height
+    return intersection / (a[2] * a[3] + b[2] * b[3] - intersection) >= threshold
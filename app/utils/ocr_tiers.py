@@ -0,0 +1,174 @@
+# app/utils/ocr_tiers.py
+
+import logging
+import time
+from typing import Dict, List
+
+import cv2
+import numpy as np
+
+from .ocr_engine import DATA_KEYS, OCREngine, get_ocr_engine
+from .text_regions import CROP_CONFIG, Box, crop_region, propose_text_regions
+
+# The fast tier reads images scaled by this factor
+FAST_SCALE = 0.5
+# Blocks with a word below this confidence (0-100, as tesseract reports it)
+# are read again by the fine tier
+RECHECK_CONFIDENCE = 70
+# Line height (px) below which the fast tier loses text: a proposed region
+# it read nothing in is only read again if downscaling took it under this.
+# Larger empty regions are taken for proposer false positives.
+MIN_LINE_HEIGHT = 24
+
+
+class TwoTierOCR:
+    """
+    Coarse-to-fine OCR: a cheap pass everywhere, a careful one only where it is needed.
+
+    The fast tier reads each text region (or the whole frame, without
+    text_regions) downscaled by scale and binarized. Every block holding a
+    word whose confidence is below threshold is read again by the fine
+    tier, and its words replace the fast tier's. So is a proposed text
+    region the fast tier read nothing in if scaling made it shorter than
+    min_line_height: small text often doesn't survive downscaling at all.
+
+    The fine tier reads crops of the frame as it is passed in, unscaled and
+    not binarized. In the pipeline that frame is already capped at
+    ANALYSIS_MAX_WIDTH (see FrameBus), so "fine" means that resolution,
+    not the source's.
+
+    Counts and times of both tiers add up in stats(), with the fine reads
+    split by why they were made, to tune scale and threshold against.
+    """
+
+    def __init__(self, engine: OCREngine = None, text_regions: bool = True, scale: float = FAST_SCALE,
+                 threshold: float = RECHECK_CONFIDENCE, min_line_height: int = MIN_LINE_HEIGHT):
+        self.engine = engine or get_ocr_engine()
+        self.text_regions = text_regions
+        self.scale = scale
+        self.threshold = threshold
+        self.min_line_height = min_line_height
+        self.frames = 0
+        self.counts = {'fast': 0, 'fine': 0}
+        self.seconds = {'fast': 0.0, 'fine': 0.0}
+        # Fine reads of blocks the fast tier was unsure of / read nothing in
+        self.fine_reasons = {'unsure': 0, 'empty': 0}
+
+    def image_to_data(self, frame: np.ndarray) -> Dict[str, list]:
+        """
+        OCR a frame in two tiers.
+
+        Returns:
+            The words in pytesseract.image_to_data's DICT layout, in frame coordinates
+        """
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        self.frames += 1
+        if self.text_regions:
+            boxes = propose_text_regions(gray)
+            crops = [crop_region(gray, box) for box in boxes]
+            config = CROP_CONFIG
+        else:
+            boxes = None
+            crops = [(gray, 0, 0)]
+            config = ""
+
+        # Fast tier: downscaled, binarized images
+        started = time.perf_counter()
+        small = [self._fast_image(crop) for crop, _, _ in crops]
+        results = self.engine.map("image_to_data", small, config)
+        self._record('fast', len(crops), started)
+
+        blocks = {}
+        for index, ((crop, left, top), image, d) in enumerate(zip(crops, small, results)):
+            factor = crop.shape[1] / image.shape[1]
+            for i in range(len(d['text'])):
+                block = index + 1 if self.text_regions else d['block_num'][i]
+                blocks.setdefault(block, []).append({
+                    'text': d['text'][i],
+                    'conf': d['conf'][i],
+                    'left': int(d['left'][i] * factor) + left,
+                    'top': int(d['top'][i] * factor) + top,
+                    'width': int(np.ceil(d['width'][i] * factor)),
+                    'height': int(np.ceil(d['height'][i] * factor)),
+                })
+
+        # Fine tier: unscaled crops of the blocks the fast tier wasn't sure of
+        # and of the proposed regions too small for it that it read nothing in
+        unsure = [
+            block for block, words in blocks.items()
+            if any(str(w['text']).strip() and 0 <= float(w['conf']) < self.threshold for w in words)
+        ]
+        empty = []
+        if boxes is not None:
+            empty = [
+                block for block, (_, _, _, height) in enumerate(boxes, 1)
+                if height * self.scale < self.min_line_height
+                and not any(str(w['text']).strip() for w in blocks.get(block, []))
+            ]
+        self.fine_reasons['unsure'] += len(unsure)
+        self.fine_reasons['empty'] += len(empty)
+        unsure = sorted(unsure + empty)
+        if unsure:
+            started = time.perf_counter()
+            targets = [boxes[block - 1] if boxes is not None else _bounds(blocks[block]) for block in unsure]
+            fine_crops = [crop_region(gray, box) for box in targets]
+            fine = self.engine.map("image_to_data", [crop for crop, _, _ in fine_crops], CROP_CONFIG)
+            self._record('fine', len(unsure), started)
+            for block, (_, left, top), d in zip(unsure, fine_crops, fine):
+                blocks[block] = [
+                    {
+                        'text': d['text'][i],
+                        'conf': d['conf'][i],
+                        'left': d['left'][i] + left,
+                        'top': d['top'][i] + top,
+                        'width': d['width'][i],
+                        'height': d['height'][i],
+                    }
+                    for i in range(len(d['text']))
+                ]
+
+        data = {key: [] for key in DATA_KEYS}
+        for block in sorted(blocks):
+            for word in blocks[block]:
+                data['block_num'].append(block)
+                for key, value in word.items():
+                    data[key].append(value)
+        return data
+
+    def _fast_image(self, image: np.ndarray) -> np.ndarray:
+        height, width = image.shape[:2]
+        size = (max(int(width * self.scale), 1), max(int(height * self.scale), 1))
+        small = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+        _, binary = cv2.threshold(small, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+        # Tesseract reads dark text on a light background; text is the minority of the pixels
+        if np.count_nonzero(binary) < binary.size / 2:
+            binary = cv2.bitwise_not(binary)
+        return binary
+
+    def _record(self, tier: str, count: int, started: float) -> None:
+        self.counts[tier] += count
+        self.seconds[tier] += time.perf_counter() - started
+
+    def stats(self) -> Dict:
+        """Images read and seconds spent per tier; the fine reads also by reason (unsure, empty)."""
+        stats = {
+            'frames': self.frames,
+            **{tier: {'count': self.counts[tier], 'seconds': round(self.seconds[tier], 3)} for tier in self.counts},
+        }
+        stats['fine'].update(self.fine_reasons)
+        return stats
+
+    def log_stats(self) -> None:
+        stats = self.stats()
+        logging.info(f"Two-tier OCR on {stats['frames']} frames: "
+                     f"fast {stats['fast']['count']} images in {stats['fast']['seconds']:.2f}s, "
+                     f"fine {stats['fine']['count']} in {stats['fine']['seconds']:.2f}s "
+                     f"({stats['fine']['unsure']} unsure, {stats['fine']['empty']} empty)")
+
+
+def _bounds(words: List[Dict]) -> Box:
+    words = [w for w in words if str(w['text']).strip()] or words
+    left, top = min(w['left'] for w in words), min(w['top'] for w in words)
+    right = max(w['left'] + w['width'] for w in words)
+    bottom = max(w['top'] + w['height'] for w in words)
+    return left, top, right - left, bottom - top
@@ -0,0 +1,129 @@
+# app/utils/subtitles.py
+
+import logging
+import re
+import subprocess
+from typing import Dict, List, Optional
+
+from .media_probe import MediaInfo
+
+SRT_TIME = r"(\d+):(\d{2}):(\d{2})[,.](\d{3})"
+# Markup left in cue text: HTML-like tags (<i>, <font ...>) and ASS override blocks ({\an8})
+CUE_MARKUP = re.compile(r"<[^>]*>|\{[^}]*\}")
+
+
+def choose_subtitle_stream(info: MediaInfo) -> Optional[Dict]:
+    """
+    Pick the text subtitle stream to read a source's dialogue from.
+
+    Forced subtitles only cover foreign-language lines, so they are never
+    used; the default stream is preferred among the others.
+    """
+    candidates = [s for s in info.text_subtitle_streams if not s.get('disposition', {}).get('forced')]
+    if not candidates:
+        return None
+    return next((s for s in candidates if s.get('disposition', {}).get('default')), candidates[0])
+
+
+def extract_subtitle_cues(path: str, stream: Dict) -> Optional[List[Dict]]:
+    """
+    Extract a subtitle stream with ffmpeg as timed cues.
+
+    The stream is converted to SubRip on ffmpeg's stdout whatever its
+    codec, so one parser covers them all.
+
+    Returns:
+        {'start', 'end', 'text'} dicts in seconds from the start of the file,
+        or None if extraction failed
+    """
+    ffmpeg_cmd = [
+        'ffmpeg',
+        '-v', 'error',
+        '-i', path,
+        '-map', f"0:{stream['index']}",
+        '-f', 'srt',
+        '-'
+    ]
+    try:
+        output = subprocess.run(ffmpeg_cmd, check=True, capture_output=True).stdout
+    except (OSError, subprocess.CalledProcessError) as e:
+        stderr = getattr(e, 'stderr', b'') or b''
+        logging.error(f"Error extracting subtitle stream {stream['index']} of {path}: {str(e)} {stderr.decode(errors='replace')}")
+        return None
+    cues = parse_srt(output.decode('utf-8', errors='replace'))
+    logging.info(f"Extracted {len(cues)} subtitle cues from stream {stream['index']} of {path}")
+    return cues
+
+
+def load_subtitle_cues(path: str) -> Optional[List[Dict]]:
+    """
+    Return the cues of the source's text subtitle track.
+
+    None if it has none, or none could be read from it; the source then
+    goes through speech recognition and OCR as usual.
+    """
+    stream = choose_subtitle_stream(MediaInfo.probe(path))
+    if stream is None:
+        return None
+    return extract_subtitle_cues(path, stream) or None
+
+
+def parse_srt(text: str) -> List[Dict]:
+    """Parse SubRip into cues, markup stripped and lines of a cue joined by spaces."""
+    cues = []
+    for block in re.split(r"\r?\n\s*\r?\n", text.strip()):
+        lines = block.strip().splitlines()
+        for i, line in enumerate(lines):
+            times = re.match(rf"\s*{SRT_TIME}\s*-->\s*{SRT_TIME}", line)
+            if times:
+                break
+        else:
+            continue
+        cue_text = " ".join(CUE_MARKUP.sub("", cue_line).strip() for cue_line in lines[i + 1:])
+        cue_text = re.sub(r"\s+", " ", cue_text).strip()
+        if cue_text:
+            cues.append({'start': _seconds(times.groups()[:4]), 'end': _seconds(times.groups()[4:]), 'text': cue_text})
+    return cues
+
+
+def clip_cues(cues: List[Dict], start: float, end: float) -> List[Dict]:
+    """The cues overlapping [start, end), with times in seconds from start."""
+    return [
+        {
+            'start': round(max(cue['start'], start) - start, 3),
+            'end': round(min(cue['end'], end) - start, 3),
+            'text': cue['text'],
+        }
+        for cue in cues
+        if cue['end'] > start and cue['start'] < end
+    ]
+
+
+def subtitles_for_clip(cues: Optional[List[Dict]], start: float, end: float) -> Optional[List[Dict]]:
+    """
+    The cues of a clip, or None if the clip has none.
+
+    A clip falling in a gap between cues may still have speech or on-screen
+    text the track doesn't cover, so it goes through ASR and OCR as usual.
+    """
+    if not cues:
+        return None
+    return clip_cues(cues, start, end) or None
+
+
+def cue_words(cues: List[Dict]) -> List[Dict]:
+    """Spread the words of each cue evenly over its time, like the words of a recognizer without word timing."""
+    words = []
+    for cue in cues:
+        tokens = cue['text'].split()
+        step = (cue['end'] - cue['start']) / len(tokens) if tokens else 0
+        words.extend(
+            {'word': token, 'start': round(cue['start'] + i * step, 3), 'end': round(cue['start'] + (i + 1) * step, 3)}
+            for i, token in enumerate(tokens)
+        )
+    return words
+
+
+def _seconds(parts) -> float:
+    hours, minutes, seconds, millis = (int(p) for p in parts)
+    return hours * 3600 + minutes * 60 + seconds + millis / 1000
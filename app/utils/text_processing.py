@@ -1,14 +1,20 @@
 import logging
 import re
-from threading import Lock
+from threading import Lock, local
 import cv2
-import pytesseract
 from googletrans import Translator
 from langdetect import detect
 import spacy
 from spacy.cli import download
 from summa import keywords, summarizer
 
+from .frame_bus import FrameBus, FrameConsumer
+from .network_io import get_io_executor
+from .ocr_engine import DEFAULT_OCR_THREADS, get_ocr_engine
+from .ocr_spans import SpanTracker, lines_from_data, unique_texts
+from .ocr_tiers import TwoTierOCR
+from .text_regions import ocr_text_regions
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 
 
@@ -30,29 +36,75 @@ nlp_de = spacy.load("de_core_news_sm")
 nlp_models = {}
 model_locks = {model: Lock() for model in SPACY_MODELS}
 
-def ocr_from_video(video_path):
-    video = cv2.VideoCapture(video_path)
-    fps = video.get(cv2.CAP_PROP_FPS)
-    ocr_text = ""
-    frame_count = 0
-
-    while video.isOpened():
-        ret, frame = video.read()
-        if not ret:
-            break
-
-        if frame_count % (5 * int(fps)) == 0:  # Process every 5 seconds
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            ocr_text += pytesseract.image_to_string(gray) + " "
-
-        frame_count += 1
-
-    video.release()
-    return ocr_text.strip()
+class OCRSampler(FrameConsumer):
+    """
+    Frame bus consumer running OCR on the frames its sampling policy picks (every 5 seconds by default).
+
+    With text_regions, only the crops propose_text_regions finds are read
+    instead of whole frames. engine and threads pick the OCR engine (see
+    get_ocr_engine). The lines read are merged across samples into spans
+    (see SpanTracker), so a caption on screen for a minute counts once.
+    two_tier holds TwoTierOCR settings ('scale', 'threshold'); with it,
+    frames are read coarse to fine.
+    """
+
+    def __init__(self, policy="interval:5", text_regions=True, engine=None, threads=DEFAULT_OCR_THREADS,
+                 two_tier=None):
+        super().__init__(policy)
+        self.text_regions = text_regions
+        self.engine = get_ocr_engine(engine, threads)
+        self.two_tier = TwoTierOCR(self.engine, text_regions, **two_tier) if two_tier is not None else None
+        self.tracker = SpanTracker()
+
+    def consume(self, frame, index, timestamp):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if self.two_tier is not None:
+            d = self.two_tier.image_to_data(gray)
+        elif self.text_regions:
+            d = ocr_text_regions(gray, engine=self.engine)
+        else:
+            d = self.engine.image_to_data(gray)
+        self.tracker.add(timestamp, lines_from_data(d))
+
+    def spans(self):
+        return self.tracker.spans()
+
+    def tier_stats(self):
+        """Per-tier counts and times of two-tier OCR, or None if it is off."""
+        if self.two_tier is None:
+            return None
+        self.two_tier.log_stats()
+        return self.two_tier.stats()
+
+    def result(self):
+        """The distinct texts seen, one per line in order of appearance."""
+        return "\n".join(unique_texts(self.spans()))
+
+def ocr_from_video(video_path, start=None, end=None, options=None):
+    """
+    Return the distinct texts OCR finds in a video (or a time range of it).
+
+    options are process_clip's (see analysis_options): frames are capped at
+    frame_max_width, sampled by sampling['ocr'] and read with the ocr
+    settings (engine, threads, text_regions, two_tier), as in process_clip.
+    """
+    options = options or {}
+    sampling = options.get("sampling") or {}
+    sampler = OCRSampler(sampling.get("ocr", "interval:5"), **(options.get("ocr") or {}))
+    FrameBus(video_path, start, end, max_width=options.get("frame_max_width")).run([sampler])
+    return sampler.result()
+
+_translators = local()
+
+def _get_translator():
+    """One Translator, and so one pool of keep-alive connections, per thread."""
+    if not hasattr(_translators, 'translator'):
+        _translators.translator = Translator()
+    return _translators.translator
 
 def translate_text(text, target_language='en'):
-    translator = Translator()
-    return translator.translate(text, dest=target_language).text
+    # Limited, retried and circuit-broken like every other remote call
+    return get_io_executor().call("translate", lambda: _get_translator().translate(text, dest=target_language).text)
 
 def load_spacy_model(model_name):
     with model_locks[model_name]:
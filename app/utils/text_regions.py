@@ -0,0 +1,134 @@
+# app/utils/text_regions.py
+
+from typing import Dict, List, Tuple
+
+import cv2
+import numpy as np
+
+from .ocr_engine import OCREngine, get_ocr_engine
+
+Box = Tuple[int, int, int, int]  # left, top, width, height
+
+# Proposals are computed on a copy of the frame scaled to this width
+ANALYSIS_WIDTH = 960
+# Text lines at analysis width: glyphs between these heights in pixels
+MIN_TEXT_HEIGHT = 6
+MAX_TEXT_HEIGHT = 120
+MIN_ASPECT_RATIO = 1.2  # lines of text are wider than tall
+MIN_FILL = 0.3  # share of a candidate box covered by edge pixels
+# Boxes closer than this (at analysis width) are merged into one crop;
+# side by side, boxes up to a line height apart are words of the same line
+MERGE_GAP = 8
+# Margin added around each crop, in frame pixels; tesseract needs some background around glyphs
+CROP_PADDING = 6
+# Each crop is one block of text
+CROP_CONFIG = "--psm 6"
+
+
+def propose_text_regions(frame: np.ndarray) -> List[Box]:
+    """
+    Find the boxes of a frame likely to contain text.
+
+    Text is dense in strong, short edges: the morphological gradient of the
+    frame is thresholded, smeared horizontally so the letters of a line run
+    together, and the resulting blobs are kept if they are shaped like lines
+    of text. Nearby boxes are merged.
+
+    Returns:
+        (left, top, width, height) boxes in frame pixels, top to bottom
+    """
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    height, width = gray.shape
+    scale = min(ANALYSIS_WIDTH / width, 1.0)
+    if scale < 1.0:
+        gray = cv2.resize(gray, (ANALYSIS_WIDTH, int(height * scale)), interpolation=cv2.INTER_AREA)
+
+    gradient = cv2.morphologyEx(gray, cv2.MORPH_GRADIENT, cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3)))
+    _, edges = cv2.threshold(gradient, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+    lines = cv2.morphologyEx(edges, cv2.MORPH_CLOSE, cv2.getStructuringElement(cv2.MORPH_RECT, (15, 3)))
+    contours, _ = cv2.findContours(lines, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    boxes = []
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        if not MIN_TEXT_HEIGHT <= h <= MAX_TEXT_HEIGHT or w < h * MIN_ASPECT_RATIO:
+            continue
+        if np.count_nonzero(edges[y:y + h, x:x + w]) < MIN_FILL * w * h:
+            continue
+        boxes.append((x, y, w, h))
+
+    boxes = merge_boxes(boxes, MERGE_GAP)
+    return sorted(
+        (
+            (int(x / scale), int(y / scale), int(np.ceil(w / scale)), int(np.ceil(h / scale)))
+            for x, y, w, h in boxes
+        ),
+        key=lambda box: (box[1], box[0])
+    )
+
+
+def merge_boxes(boxes: List[Box], gap: int) -> List[Box]:
+    """Merge boxes that overlap or are close to each other (see MERGE_GAP), until none are."""
+    boxes = list(boxes)
+    merged = True
+    while merged:
+        merged = False
+        result = []
+        for box in boxes:
+            for i, other in enumerate(result):
+                if _near(box, other, gap):
+                    result[i] = _union(box, other)
+                    merged = True
+                    break
+            else:
+                result.append(box)
+        boxes = result
+    return boxes
+
+
+def crop_region(frame: np.ndarray, box: Box, padding: int = CROP_PADDING) -> Tuple[np.ndarray, int, int]:
+    """Return the padded crop of box and the frame coordinates of its top-left corner."""
+    x, y, w, h = box
+    left, top = max(x - padding, 0), max(y - padding, 0)
+    return frame[top:y + h + padding, left:x + w + padding], left, top
+
+
+def ocr_text_regions(frame: np.ndarray, boxes: List[Box] = None, engine: OCREngine = None) -> Dict[str, list]:
+    """
+    Run tesseract on the text regions of a frame only.
+
+    The crops are read on the engine's threads (get_ocr_engine() by default).
+
+    Returns:
+        The words in pytesseract.image_to_data's DICT layout, with 'left'
+        and 'top' in frame coordinates and 'block_num' numbering the regions
+    """
+    if boxes is None:
+        boxes = propose_text_regions(frame)
+    engine = engine or get_ocr_engine()
+    crops = [crop_region(frame, box) for box in boxes]
+    results = engine.map("image_to_data", [crop for crop, _, _ in crops], CROP_CONFIG)
+
+    data = {key: [] for key in ('block_num', 'text', 'conf', 'left', 'top', 'width', 'height')}
+    for block, ((_, left, top), d) in enumerate(zip(crops, results), start=1):
+        for i in range(len(d['text'])):
+            data['block_num'].append(block)
+            data['text'].append(d['text'][i])
+            data['conf'].append(d['conf'][i])
+            data['left'].append(d['left'][i] + left)
+            data['top'].append(d['top'][i] + top)
+            data['width'].append(d['width'][i])
+            data['height'].append(d['height'][i])
+    return data
+
+
+def _near(a: Box, b: Box, gap: int) -> bool:
+    horizontal_gap = max(gap, a[3], b[3])
+    return (a[0] <= b[0] + b[2] + horizontal_gap and b[0] <= a[0] + a[2] + horizontal_gap
+            and a[1] <= b[1] + b[3] + gap and b[1] <= a[1] + a[3] + gap)
+
+
+def _union(a: Box, b: Box) -> Box:
+    left, top = min(a[0], b[0]), min(a[1], b[1])
+    right, bottom = max(a[0] + a[2], b[0] + b[2]), max(a[1] + a[3], b[1] + b[3])
+    return left, top, right - left, bottom - top
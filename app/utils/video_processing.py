@@ -1,47 +1,145 @@
 import os
+import time
+import logging
+import subprocess
 import yt_dlp
 import multiprocessing
-from moviepy.editor import VideoFileClip
+from bisect import bisect_right
+
+from .media_probe import MediaInfo
+
+# Codecs that can be stream-copied into an .mp4 clip as they are
+MP4_VIDEO_CODECS = {'h264', 'hevc', 'mpeg4', 'av1'}
+MP4_AUDIO_CODECS = {'aac', 'mp3', 'ac3', 'eac3', 'opus', 'alac'}
 
 
 def process_chunk(chunk_info):
-    input_file, start_time, end_time, output_path = chunk_info
-    subclip = VideoFileClip(input_file).subclip(start_time, end_time)
-    subclip.write_videofile(output_path, codec="libx264", audio_codec="aac")
-    subclip.close()
+    """
+    Write one chunk of a video and report how it was written.
+
+    Stream-copied chunks start at the keyframe at or before start_time. If
+    copying fails the chunk is re-encoded instead.
+
+    Returns:
+    dict: The chunk's output_path, the method used ("copy" or "reencode")
+    and its processing_time in seconds.
+    """
+    input_file, start_time, end_time, output_path, method, preset, threads = chunk_info
+    started = time.perf_counter()
+
+    if method == "copy":
+        try:
+            _run_ffmpeg_chunk(input_file, start_time, end_time, output_path, ['-c', 'copy'])
+        except subprocess.CalledProcessError as e:
+            logging.warning(f"Stream copy failed for {output_path}, re-encoding: {e.stderr}")
+            method = "reencode"
 
-def process_video_file(input_file, output_folder, clip_duration=10):
+    if method == "reencode":
+        _run_ffmpeg_chunk(input_file, start_time, end_time, output_path, [
+            '-c:v', 'libx264', '-preset', preset, '-threads', str(threads),
+            '-c:a', 'aac'
+        ])
+
+    processing_time = time.perf_counter() - started
+    logging.info(f"Wrote {output_path} ({method}) in {processing_time:.2f}s")
+    return {"output_path": output_path, "method": method, "processing_time": processing_time}
+
+def _run_ffmpeg_chunk(input_file, start_time, end_time, output_path, codec_args):
+    command = [
+        'ffmpeg',
+        '-ss', str(start_time),
+        '-i', input_file,
+        '-t', str(end_time - start_time),
+        *codec_args,
+        '-y',
+        output_path
+    ]
+    subprocess.run(command, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+
+def can_stream_copy(input_file):
+    """Return True if every video and audio stream of input_file can be copied into an mp4 clip."""
+    try:
+        info = MediaInfo.probe(input_file)
+    except Exception as e:
+        logging.warning(f"Could not probe {input_file}, clips will be re-encoded: {str(e)}")
+        return False
+    video = info.video_stream
+    if not video or video.get('codec_name') not in MP4_VIDEO_CODECS:
+        return False
+    return all(a.get('codec_name') in MP4_AUDIO_CODECS for a in info.audio_streams)
+
+def process_video_file(input_file, output_folder, clip_duration=10, mode="auto",
+                       preset="veryfast", threads=None, processes=None):
     """
     Process a video file by splitting it into smaller clips.
 
+    A library entry point: the routes split videos with open_clip_source
+    (see clip_splitting), so mode, preset and threads are left to the
+    caller instead of being app settings.
+
     Args:
     input_file (str): Path to the input video file.
     output_folder (str): Path to the folder where output clips will be saved.
     clip_duration (int, optional): Duration of each clip in seconds. Defaults to 10.
+    mode (str, optional): "copy" to stream-copy chunks, "reencode" to re-encode them
+        with libx264/aac, or "auto" to copy whenever the codecs allow. Defaults to "auto".
+    preset (str, optional): x264 preset used when re-encoding. Defaults to "veryfast".
+    threads (int, optional): Encoder threads per chunk. Defaults to an even share
+        of the CPU cores across the worker processes.
+    processes (int, optional): Number of worker processes. Defaults to the CPU count.
 
     Returns:
-    list: A list of dictionaries containing information about each clip.
+    list: A list of dictionaries containing information about each clip, including
+    how it was written ("method") and how long that took ("processing_time").
+    A stream-copied clip starts at the keyframe at or before the requested
+    start, so its start_time and duration are those of the frames it
+    actually holds; end_time is the requested end either way.
 
     Raises:
     IOError: If there's an error opening the video file.
     RuntimeError: If there's an unexpected error during processing.
     """
-    clip = VideoFileClip(input_file)
-    total_duration = clip.duration
-    clip.close()
+    info = MediaInfo.probe(input_file)
+    total_duration = info.duration
+
+    if mode == "auto":
+        mode = "copy" if can_stream_copy(input_file) else "reencode"
+    processes = processes or os.cpu_count() or 1
+    # Re-encoding chunks in parallel already keeps every core busy; letting
+    # each x264 instance spawn a thread per core on top only adds contention.
+    threads = threads or max(1, (os.cpu_count() or 1) // processes)
+    logging.info(f"Splitting {input_file} with mode={mode}, preset={preset}, threads={threads}, processes={processes}")
 
     chunks = []
     for i in range(0, int(total_duration), clip_duration):
         start_time = i
         end_time = min(i + clip_duration, total_duration)
         output_path = os.path.join(output_folder, f"clip_{i//clip_duration + 1}.mp4")
-        chunks.append((input_file, start_time, end_time, output_path))
+        chunks.append((input_file, start_time, end_time, output_path, mode, preset, threads))
+
+    with multiprocessing.Pool(processes) as pool:
+        chunk_stats = pool.map(process_chunk, chunks)
 
-    with multiprocessing.Pool() as pool:
-        pool.map(process_chunk, chunks)
+    # Return clip info as before, plus how each chunk was produced
+    clips = []
+    for i, (chunk, stats) in enumerate(zip(chunks, chunk_stats)):
+        start_time = chunk[1]
+        if stats["method"] == "copy":
+            start_time = _keyframe_at_or_before(info.keyframes, start_time)
+        clips.append({
+            "filename": f"clip_{i+1}.mp4",
+            "start_time": start_time,
+            "end_time": chunk[2],
+            "duration": chunk[2] - start_time,
+            "method": stats["method"],
+            "processing_time": stats["processing_time"]
+        })
+    return clips
 
-    # Return clip info as before
-    return [{"filename": f"clip_{i+1}.mp4", "start_time": chunk[1], "end_time": chunk[2], "duration": chunk[2] - chunk[1]} for i, chunk in enumerate(chunks)]
+def _keyframe_at_or_before(keyframes, time):
+    """Where a stream copy seeking to time really starts; time itself without a keyframe index."""
+    index = bisect_right(keyframes, time)
+    return keyframes[index - 1] if index else time
 
 def download_streaming_video(url, output_path):
     try:
@@ -0,0 +1,118 @@
+# app/utils/voice_activity.py
+
+import logging
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+DEFAULT_FRAME_MS = 30
+# Mean frame power, in dB relative to full scale, below which a frame is silence
+DEFAULT_ENERGY_DB = -45.0
+# Spectral flatness (geometric over arithmetic mean of the power spectrum)
+# above which a frame is noise: white noise sits around 0.56, voiced speech
+# well below 0.2
+DEFAULT_FLATNESS = 0.4
+DEFAULT_MIN_SPEECH = 0.25  # seconds; shorter bursts are dropped
+DEFAULT_PADDING = 0.2  # seconds kept around each span so words aren't clipped
+
+_EPSILON = 1e-10
+
+
+def frame_features(samples: np.ndarray, sample_rate: int, frame_ms: int = DEFAULT_FRAME_MS) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Compute the energy (dBFS) and spectral flatness of consecutive frames of int16 PCM.
+
+    All frames are analyzed at once as one 2-D array, so this costs a few
+    vectorized passes over the clip rather than a loop per frame.
+
+    Returns:
+        (energy_db, flatness), one value per frame
+    """
+    if samples.ndim > 1:
+        samples = samples.mean(axis=1)
+    frame_length = max(int(sample_rate * frame_ms / 1000), 1)
+    frame_count = len(samples) // frame_length
+    if not frame_count:
+        return np.empty(0), np.empty(0)
+
+    frames = np.asarray(samples[:frame_count * frame_length], dtype=np.float32).reshape(frame_count, frame_length)
+    frames /= 32768.0
+
+    energy_db = 10 * np.log10(np.mean(frames ** 2, axis=1) + _EPSILON)
+
+    power = np.abs(np.fft.rfft(frames * np.hanning(frame_length).astype(np.float32), axis=1)) ** 2 + _EPSILON
+    flatness = np.exp(np.mean(np.log(power), axis=1)) / np.mean(power, axis=1)
+    return energy_db, flatness
+
+
+def detect_speech(samples: np.ndarray, sample_rate: int, frame_ms: int = DEFAULT_FRAME_MS,
+                  energy_db: float = DEFAULT_ENERGY_DB, flatness: float = DEFAULT_FLATNESS,
+                  min_speech: float = DEFAULT_MIN_SPEECH, padding: float = DEFAULT_PADDING) -> Dict:
+    """
+    Find the stretches of a clip that contain speech.
+
+    A frame counts as speech if it is loud enough (energy_db) and tonal
+    rather than noise-like (flatness). Speech frames are widened by padding
+    on both sides, which also bridges the short pauses between words, and
+    runs shorter than min_speech are dropped.
+
+    Args:
+        samples: int16 PCM, mono or (samples, channels)
+        sample_rate: Sample rate of samples
+        frame_ms: Analysis frame length in milliseconds
+        energy_db: Minimum frame energy in dBFS
+        flatness: Maximum spectral flatness
+        min_speech: Shortest speech run kept, in seconds
+        padding: Seconds added before and after each speech run
+
+    Returns:
+        Dict with 'spans' (list of (start, end) in seconds from the start of
+        the clip) and 'speech_ratio' (fraction of the clip they cover)
+    """
+    energy, spectral_flatness = frame_features(samples, sample_rate, frame_ms)
+    frame_seconds = frame_ms / 1000
+    duration = len(samples) / sample_rate if sample_rate else 0
+    if not len(energy) or duration <= 0:
+        return {'spans': [], 'speech_ratio': 0.0}
+
+    speech = (energy > energy_db) & (spectral_flatness < flatness)
+
+    spans = []
+    min_frames = max(int(round(min_speech / frame_seconds)), 1)
+    for first, last in _runs(speech):
+        if last - first < min_frames:
+            continue
+        start = round(max(first * frame_seconds - padding, 0.0), 3)
+        end = round(min(last * frame_seconds + padding, duration), 3)
+        if spans and start <= spans[-1][1]:
+            spans[-1] = (spans[-1][0], end)
+        else:
+            spans.append((start, end))
+
+    speech_ratio = sum(end - start for start, end in spans) / duration
+    logging.info(f"Voice activity: {len(spans)} speech spans, {speech_ratio:.0%} of {duration:.1f}s")
+    return {'spans': spans, 'speech_ratio': round(speech_ratio, 3)}
+
+
+def speech_samples(samples: np.ndarray, sample_rate: int, spans: List[Tuple[float, float]]) -> np.ndarray:
+    """Return the samples inside spans, joined into one array."""
+    pieces = [samples[int(start * sample_rate):int(end * sample_rate)] for start, end in spans]
+    if not pieces:
+        return samples[:0]
+    return np.concatenate(pieces)
+
+
+def _runs(mask: np.ndarray) -> List[Tuple[int, int]]:
+    """Return the [first, last) frame ranges where mask is True."""
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return list(zip(np.flatnonzero(edges == 1).tolist(), np.flatnonzero(edges == -1).tolist()))
+
+
+def to_clip_time(time: float, spans: List[Tuple[float, float]]) -> float:
+    """Map a time in the joined speech_samples of spans back to a time in the clip."""
+    elapsed = 0.0
+    for start, end in spans:
+        if time <= elapsed + (end - start):
+            return round(start + time - elapsed, 3)
+        elapsed += end - start
+    return round(spans[-1][1], 3) if spans else time
@@ -0,0 +1,106 @@
+"""
+Compare the pytesseract OCR path with the in-process tesserocr engine.
+
+Usage:
+    python benchmarks/ocr_engines.py [--threads N] <image or video> [...]
+
+Images are used as they are; from videos, 10 frames spread over the video
+are taken. Each engine reads the frames twice: whole, and as the text
+region crops the pipeline sends to OCR (see propose_text_regions). The
+script also checks that both engines recognize the same text.
+
+pytesseract writes every image to a temporary file and starts a tesseract
+process for it. That overhead is fixed per call, so it weighs most on the
+small crops. tesserocr keeps one loaded tesseract per thread and reads the
+pixels from memory. An engine that can't run here (no tesseract command,
+or tesserocr not installed) is left out of the comparison.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+import pytesseract
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.utils import ocr_engine  # noqa: E402
+from app.utils.ocr_engine import PytesseractEngine, TesserocrEngine  # noqa: E402
+from app.utils.text_regions import CROP_CONFIG, crop_region, propose_text_regions  # noqa: E402
+
+
+def load_frames(path):
+    image = cv2.imread(path)
+    if image is not None:
+        return [image]
+    cap = cv2.VideoCapture(path)
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    frames = []
+    for frame_idx in np.linspace(0, frame_count - 1, min(10, frame_count), dtype=int):
+        cap.set(cv2.CAP_PROP_POS_FRAMES, int(frame_idx))
+        ret, frame = cap.read()
+        if ret:
+            frames.append(frame)
+    cap.release()
+    return frames
+
+
+def read_all(engine, images, config):
+    return [" ".join(text.split()) for text in engine.map("image_to_string", images, config)]
+
+
+def timed(function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - started
+
+
+def available_engines(threads):
+    engines = []
+    try:
+        pytesseract.get_tesseract_version()
+    except pytesseract.TesseractNotFoundError:
+        print("the tesseract command is not installed; the pytesseract engine can't be timed")
+    else:
+        engines.append(PytesseractEngine(threads))
+    if ocr_engine.tesserocr is None:
+        print("tesserocr is not installed; the tesserocr engine can't be timed")
+    else:
+        engines.append(TesserocrEngine(threads))
+    return engines
+
+
+def main(paths, threads):
+    engines = available_engines(threads)
+    if not engines:
+        return
+
+    for path in paths:
+        frames = [cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) for frame in load_frames(path)]
+        crops = [crop_region(frame, box)[0] for frame in frames for box in propose_text_regions(frame)]
+        print(f"{path}: {len(frames)} frames, {len(crops)} text regions, {threads} threads")
+
+        for name, images, config in (("whole frames", frames, ""), ("text regions", crops, CROP_CONFIG)):
+            results = []
+            for engine in engines:
+                texts, elapsed = timed(read_all, engine, images, config)
+                results.append((engine.name, texts, elapsed))
+            line = "  ".join(f"{engine_name}: {elapsed:7.2f}s" for engine_name, _, elapsed in results)
+            if len(results) > 1:
+                line += (f"  speedup: {results[0][2] / results[1][2]:5.2f}x"
+                         f"  same text: {results[0][1] == results[1][1]}")
+            print(f"  {name:<14} {line}")
+
+    for engine in engines:
+        engine.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+")
+    parser.add_argument("--threads", type=int, default=ocr_engine.DEFAULT_OCR_THREADS)
+    args = parser.parse_args()
+    main(args.paths, args.threads)
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+import speech_recognition as sr
+from unittest.mock import patch
+from app.utils.asr_backends import (AudioSegment, GoogleASRBackend, StubASRBackend, get_asr_backend,
+                                    REQUEST_FAILED_MESSAGE)
+from app.utils.audio_processing import speech_to_text, speech_to_text_batch
+from app.utils.network_io import IOExecutor
+
+
+def _segment(seed, seconds=1.0):
+    rng = np.random.default_rng(seed)
+    return AudioSegment((rng.standard_normal(int(seconds * 16000)) * 3000).astype(np.int16), 16000)
+
+
+def test_stub_backend_is_deterministic():
+    backend = StubASRBackend()
+
+    first, second, again, silent = backend.transcribe_batch(
+        [_segment(1), _segment(2), _segment(1), AudioSegment(np.zeros(800, np.int16), 16000)]
+    )
+
+    assert first.text == again.text
+    assert first.text != second.text
+    assert first.text.endswith("1.00s")
+    assert silent.text == "" and silent.error is None
+    assert backend.batches == [4]
+
+
+def test_google_backend_reports_failures_per_segment():
+    backend = GoogleASRBackend()
+    outcomes = iter(["hello", sr.UnknownValueError(), sr.RequestError("offline"), ValueError("bad audio")])
+
+    def recognize(audio, language):
+        outcome = next(outcomes)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    with patch.object(backend.recognizer, 'recognize_google', side_effect=recognize), \
+            patch('app.utils.asr_backends.get_io_executor', return_value=IOExecutor({'attempts': 1})):
+        transcripts = backend.transcribe_batch([_segment(i) for i in range(4)])
+
+    assert [t.text for t in transcripts] == ["hello", "", "", ""]
+    assert [t.error for t in transcripts[:3]] == [None, None, REQUEST_FAILED_MESSAGE]
+    assert transcripts[3].error == "Error processing audio: bad audio"
+
+
+def test_speech_to_text_uses_the_named_backend():
+    samples = _segment(3).samples
+    stub = get_asr_backend("stub")
+
+    assert speech_to_text(samples, 16000, backend="stub") == stub.transcribe(AudioSegment(samples, 16000)).text
+    assert speech_to_text_batch([samples, samples], 16000, backend="stub")[0].startswith("speech ")
+    assert stub.batches[-1] == 2
+    with pytest.raises(ValueError):
+        get_asr_backend("nope")
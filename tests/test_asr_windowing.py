@@ -0,0 +1,78 @@
+import threading
+import time
+
+import numpy as np
+from app.utils.asr_backends import ASRBackend, AudioSegment, Transcript
+from app.utils.asr_windowing import split_windows, stitch_transcripts, transcribe_windowed
+
+RATE = 100
+WORDS = [f"word{i}" for i in range(100)]
+
+
+class ScriptBackend(ASRBackend):
+    """Each second of audio holds the index of the word spoken in it."""
+
+    name = "script"
+
+    def __init__(self, timed=True, delay=0.0):
+        self.timed = timed
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def transcribe(self, segment):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.delay)
+        with self.lock:
+            self.active -= 1
+        seconds = segment.samples[::RATE]
+        # A word cut off by the window edge isn't recognized
+        if len(segment.samples) % RATE:
+            seconds = seconds[:-1]
+        words = [{"word": WORDS[index], "start": float(i), "end": i + 1.0} for i, index in enumerate(seconds)]
+        return Transcript(" ".join(w["word"] for w in words), words=words if self.timed else None)
+
+
+def _speech(seconds):
+    return np.repeat(np.arange(seconds, dtype=np.int16), RATE)
+
+
+def test_split_windows_overlap_and_cover_the_segment():
+    windows = split_windows(AudioSegment(_speech(70), RATE, offset=5.0), window=30, overlap=2)
+
+    assert [w.offset for w in windows] == [5.0, 33.0, 61.0]
+    assert [w.duration for w in windows] == [30.0, 30.0, 14.0]
+    assert split_windows(AudioSegment(_speech(20), RATE), window=30)[0].duration == 20.0
+
+
+def test_windowed_transcript_has_each_word_once_with_clip_times():
+    backend = ScriptBackend(delay=0.05)
+
+    transcript, = transcribe_windowed(backend, [AudioSegment(_speech(70), RATE)], window=30, overlap=2, workers=2)
+
+    assert transcript.text == " ".join(WORDS[:70])
+    assert [w["start"] for w in transcript.words] == [float(i) for i in range(70)]
+    assert backend.peak == 2
+
+
+def test_stitching_estimated_times_falls_back_to_word_matching():
+    backend = ScriptBackend(timed=False)
+    windows = split_windows(AudioSegment(_speech(50), RATE), window=20, overlap=3)
+
+    transcript = stitch_transcripts(windows, backend.transcribe_batch(windows))
+
+    assert transcript.text == " ".join(WORDS[:50])
+
+
+def test_failed_windows_are_skipped():
+    windows = split_windows(AudioSegment(_speech(50), RATE), window=30, overlap=2)
+    transcripts = [Transcript(error="Could not request results"), ScriptBackend().transcribe(windows[1])]
+
+    transcript = stitch_transcripts(windows, transcripts)
+
+    assert transcript.error is None
+    assert transcript.words[0] == {"word": "word28", "start": 28.0, "end": 29.0}
+    assert stitch_transcripts(windows[:1], transcripts[:1]).error == "Could not request results"
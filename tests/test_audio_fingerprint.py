@@ -0,0 +1,95 @@
+import numpy as np
+from app.utils.asr_backends import AudioSegment, CachedASRBackend, StubASRBackend
+from app.utils.audio_fingerprint import DEFAULT_MIN_MATCH, FingerprintCache, fingerprint
+
+RATE = 16000
+
+
+def _jingle(seed, seconds=5):
+    """Harmonic notes changing pitch every 100 ms."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(RATE // 10) / RATE
+    notes = [
+        sum(np.sin(2 * np.pi * rng.uniform(100, 300) * k * t) * rng.uniform(0, 1) / k for k in range(1, 12))
+        for _ in range(seconds * 10)
+    ]
+    return (np.concatenate(notes) * 5000).astype(np.int16)
+
+
+def _shared(a, b):
+    return len(np.intersect1d(a, b)) / max(len(a), len(b))
+
+
+def test_fingerprint_matches_the_same_audio_only():
+    jingle = fingerprint(_jingle(1), RATE)
+    rng = np.random.default_rng(0)
+    noisy = fingerprint((_jingle(1) + rng.normal(0, 500, 5 * RATE)).astype(np.int16), RATE)
+
+    quieter = fingerprint((_jingle(1) * 0.5).astype(np.int16), RATE)
+
+    assert len(jingle) > 100
+    assert _shared(jingle, quieter) > DEFAULT_MIN_MATCH
+    assert _shared(jingle, noisy) > 0.15
+    assert _shared(jingle, fingerprint(_jingle(2), RATE)) < 0.1
+
+
+def test_cached_backend_reuses_transcripts_of_repeated_audio(tmp_path):
+    backend = StubASRBackend(text="good evening, here is the news")
+    cached = CachedASRBackend(backend, FingerprintCache(str(tmp_path / "asr.sqlite3")))
+
+    first, = cached.transcribe_batch([AudioSegment(_jingle(1), RATE)])
+    again, other = cached.transcribe_batch([AudioSegment(_jingle(1), RATE), AudioSegment(_jingle(2), RATE)])
+
+    assert first.text == again.text == other.text == "good evening, here is the news"
+    # The repeat never reached the backend: one segment per call went through
+    assert backend.batches == [1, 1]
+    assert cached.stats() == {'hits': 1, 'misses': 2, 'hit_rate': 0.333}
+
+    # The table outlives the process that filled it
+    reopened = CachedASRBackend(StubASRBackend(), FingerprintCache(str(tmp_path / "asr.sqlite3")))
+    assert reopened.transcribe(AudioSegment(_jingle(2), RATE)).text == "good evening, here is the news"
+
+
+def test_partly_overlapping_audio_is_not_a_hit(tmp_path):
+    # Same 15 s intro, different 15 s of news
+    yesterday = np.concatenate([_jingle(1, 15), _jingle(3, 15)])
+    today = np.concatenate([_jingle(1, 15), _jingle(4, 15)])
+    backend = StubASRBackend()
+    cached = CachedASRBackend(backend, FingerprintCache(str(tmp_path / "asr.sqlite3")))
+
+    first, = cached.transcribe_batch([AudioSegment(yesterday, RATE)])
+    second, = cached.transcribe_batch([AudioSegment(today, RATE)])
+
+    assert first.text != second.text
+    assert backend.batches == [1, 1]
+    assert cached.stats()['hits'] == 0
+
+
+def test_storing_audio_again_updates_its_recording(tmp_path):
+    cache = FingerprintCache(str(tmp_path / "asr.sqlite3"))
+    hashes = fingerprint(_jingle(1), RATE)
+
+    cache.store(hashes, 5.0, RATE, "stub", "first")
+    cache.store(fingerprint((_jingle(1) * 0.5).astype(np.int16), RATE), 5.0, RATE, "stub", "second")
+
+    assert cache._db.execute("SELECT COUNT(*) FROM recordings").fetchone()[0] == 1
+    assert cache.lookup(hashes, 5.0, RATE, "stub")['text'] == "second"
+
+
+def test_cache_drops_the_least_recently_matched_recordings(tmp_path):
+    cache = FingerprintCache(str(tmp_path / "asr.sqlite3"), max_recordings=2)
+    jingles = [fingerprint(_jingle(seed), RATE) for seed in (1, 2, 3)]
+    cache.store(jingles[0], 5.0, RATE, "stub", "one")
+    cache.store(jingles[1], 5.0, RATE, "stub", "two")
+    # Matching the first makes the second the stalest
+    cache.lookup(jingles[0], 5.0, RATE, "stub")
+
+    cache.store(jingles[2], 5.0, RATE, "stub", "three")
+
+    assert cache.lookup(jingles[0], 5.0, RATE, "stub")['text'] == "one"
+    assert cache.lookup(jingles[1], 5.0, RATE, "stub") is None
+    assert cache.lookup(jingles[2], 5.0, RATE, "stub")['text'] == "three"
+    orphans = cache._db.execute(
+        "SELECT COUNT(*) FROM hashes WHERE recording_id NOT IN (SELECT id FROM recordings)"
+    ).fetchone()[0]
+    assert orphans == 0
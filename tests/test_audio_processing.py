@@ -0,0 +1,93 @@
+import pickle
+import numpy as np
+import speech_recognition as sr
+from unittest.mock import patch, MagicMock
+from app.utils.audio_processing import SourceAudio, decode_audio, speech_to_text, asr_audio_format, transcribe_clips
+
+@patch('app.utils.audio_processing.subprocess.run')
+def test_decode_audio_pipes_pcm_into_numpy(mock_run):
+    mock_run.return_value = MagicMock(stdout=np.arange(8, dtype=np.int16).tobytes())
+
+    samples = decode_audio("clip.mp4", start=5.0, end=7.0, sample_rate=16000, channels=2)
+
+    command = mock_run.call_args[0][0]
+    assert command[command.index('-ar') + 1] == "16000"
+    assert command[command.index('-ac') + 1] == "2"
+    assert command[command.index('-t') + 1] == "2.0"
+    assert command[-1] == "pipe:1"
+    assert samples.shape == (4, 2)
+    assert samples[1].tolist() == [2, 3]
+
+@patch('app.utils.audio_processing.sr.Recognizer.recognize_google', return_value="hello")
+def test_speech_to_text_accepts_pcm_samples(mock_recognize):
+    samples = np.zeros(16000, dtype=np.int16)
+
+    assert speech_to_text(samples, 16000) == "hello"
+
+    audio = mock_recognize.call_args[0][0]
+    assert isinstance(audio, sr.AudioData)
+    assert audio.sample_rate == 16000
+    assert len(audio.frame_data) == 32000
+
+def test_asr_audio_format_from_config():
+    assert asr_audio_format({}) == {'sample_rate': 16000, 'channels': 1}
+    config = {'ASR_AUDIO_FORMATS': {'google': {'sample_rate': 8000}}}
+    assert asr_audio_format(config) == {'sample_rate': 8000, 'channels': 1}
+
+def test_source_audio_slices_clips_from_the_memory_map(tmp_path):
+    path = tmp_path / SourceAudio.FILENAME
+    np.arange(32000, dtype=np.int16).tofile(path)
+    source_audio = SourceAudio(str(path), sample_rate=16000)
+
+    clip = source_audio.slice(0.5, 1.0)
+
+    assert clip.tolist() == list(range(8000, 16000))
+    assert isinstance(clip.base, np.memmap)
+    # Worker processes get the location, not the samples
+    restored = pickle.loads(pickle.dumps(source_audio))
+    assert restored._samples is None
+    assert restored.slice(1.5).tolist() == list(range(24000, 32000))
+
+@patch('app.utils.audio_processing.subprocess.run')
+def test_source_audio_decode_writes_raw_pcm(mock_run, tmp_path):
+    mock_run.side_effect = lambda command, **kwargs: open(command[-1], 'wb').write(b'\0' * 64)
+
+    source_audio = SourceAudio.decode("video.mp4", str(tmp_path), sample_rate=8000, channels=2)
+
+    command = mock_run.call_args[0][0]
+    assert command[command.index('-f') + 1] == "s16le"
+    assert command[command.index('-ar') + 1] == "8000"
+    assert source_audio.path == str(tmp_path / SourceAudio.FILENAME)
+    assert source_audio.samples.shape == (16, 2)
+    source_audio.remove()
+    assert not (tmp_path / SourceAudio.FILENAME).exists()
+
+def test_transcribe_clips_decodes_a_batch_at_a_time_and_skips_silence():
+    calls = []
+    audio = {"a.mp4": None, "b.mp4": np.ones(16000, dtype=np.int16), "c.mp4": np.ones(16000, dtype=np.int16)}
+    spans = {16000: [(0.0, 0.5)]}
+
+    def decode(clip_path, **audio_format):
+        calls.append(("decode", clip_path))
+        return audio[clip_path]
+
+    def detect(samples, sample_rate, **settings):
+        # b has speech in its first half, c none
+        return {"spans": spans.pop(len(samples), []), "speech_ratio": 0.0}
+
+    def transcribe(sample_arrays, sample_rate, *args):
+        calls.append(("transcribe", [len(samples) for samples in sample_arrays]))
+        return ["hello"] * len(sample_arrays)
+
+    with patch('app.utils.audio_processing.decode_audio', side_effect=decode), \
+            patch('app.utils.audio_processing.detect_speech', side_effect=detect), \
+            patch('app.utils.audio_processing.speech_to_text_batch', side_effect=transcribe):
+        texts = list(transcribe_clips(["a.mp4", "b.mp4", "c.mp4"], voice_activity={}, batch_size=2))
+
+    assert texts == [
+        ("a.mp4", "Audio extraction failed. No speech recognition performed."),
+        ("b.mp4", "hello"),
+        ("c.mp4", ""),
+    ]
+    # Only b's speech span reaches the recognizer, before c is decoded
+    assert calls == [("decode", "a.mp4"), ("decode", "b.mp4"), ("transcribe", [8000]), ("decode", "c.mp4")]
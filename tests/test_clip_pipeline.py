@@ -0,0 +1,101 @@
+import threading
+import time
+import pytest
+from app.utils.clip_pipeline import prefetch, process_clips_ordered
+
+def test_prefetch_preserves_order():
+    assert list(prefetch(range(10), maxsize=2)) == list(range(10))
+
+def test_prefetch_produces_ahead_while_consumer_works():
+    produced = []
+
+    def producer():
+        for i in range(3):
+            produced.append(i)
+            yield i
+
+    items = prefetch(producer(), maxsize=1)
+    assert next(items) == 0
+    time.sleep(0.2)
+    # The next clip is already produced while the first one is "analyzed"
+    assert produced[:2] == [0, 1]
+    assert list(items) == [1, 2]
+
+def test_prefetch_bounded_queue_limits_read_ahead():
+    produced = []
+
+    def producer():
+        for i in range(100):
+            produced.append(i)
+            yield i
+
+    items = prefetch(producer(), maxsize=2)
+    next(items)
+    time.sleep(0.2)
+    # One item handed over, two queued, one blocked in put()
+    assert len(produced) <= 4
+    items.close()
+
+def test_prefetch_reraises_producer_errors_after_earlier_items():
+    def producer():
+        yield 1
+        raise RuntimeError("split failed")
+
+    items = prefetch(producer())
+    assert next(items) == 1
+    with pytest.raises(RuntimeError, match="split failed"):
+        next(items)
+
+def test_prefetch_closes_producer_when_consumer_stops():
+    closed = threading.Event()
+
+    def producer():
+        try:
+            for i in range(100):
+                yield i
+        finally:
+            closed.set()
+
+    items = prefetch(producer(), maxsize=1)
+    next(items)
+    items.close()
+    assert closed.wait(timeout=2)
+
+def test_prefetch_closes_the_sources_of_a_generator_expression():
+    closed = threading.Event()
+
+    def clip_source():
+        try:
+            for i in range(100):
+                yield i
+        finally:
+            closed.set()
+
+    source = clip_source()
+    items = prefetch((i * 2 for i in source), maxsize=1, sources=[source])
+    next(items)
+    items.close()
+    assert closed.wait(timeout=2)
+
+def slow_square(clip):
+    # Later clips finish first, so results have to be reordered
+    time.sleep(0.05 * (4 - clip['index']))
+    if clip['index'] == 2:
+        raise ValueError("bad clip")
+    return {'square': clip['index'] ** 2}
+
+@pytest.mark.parametrize("max_workers", [1, 3])
+def test_process_clips_ordered_yields_in_clip_order(max_workers):
+    clips = [{'index': i} for i in range(5)]
+
+    results = list(process_clips_ordered(clips, slow_square, max_workers=max_workers))
+
+    assert [index for index, _, _, _ in results] == [0, 1, 2, 3, 4]
+    assert [clip for _, clip, _, _ in results] == clips
+    assert results[0][2] == {'square': 0}
+    assert results[4][2] == {'square': 16}
+
+    # A failing clip surfaces as an error without stopping the others
+    assert results[2][2] is None
+    assert isinstance(results[2][3], ValueError)
+    assert all(error is None for i, _, _, error in results if i != 2)
@@ -0,0 +1,66 @@
+import pytest
+from app.utils.clip_planning import (
+    snap_to_keyframe, plan_boundaries, choose_boundaries, parse_scene_and_silence_log
+)
+
+KEYFRAMES = [0.0, 2.0, 4.0, 9.5, 12.0, 19.0, 20.5, 27.0]
+
+def test_snap_to_keyframe_within_tolerance():
+    assert snap_to_keyframe(10.0, KEYFRAMES, 1.0) == (9.5, True)
+    assert snap_to_keyframe(20.0, KEYFRAMES, 1.0) == (20.5, True)
+
+def test_snap_to_keyframe_outside_tolerance():
+    assert snap_to_keyframe(16.0, KEYFRAMES, 1.0) == (16.0, False)
+    assert snap_to_keyframe(5.0, [], 1.0) == (5.0, False)
+
+def test_plan_boundaries_snaps_and_reports_exact_times():
+    clips = plan_boundaries(28.0, 10, KEYFRAMES, tolerance=1.0)
+
+    assert [(clip['start'], clip['end']) for clip in clips] == [(0.0, 9.5), (9.5, 20.5), (20.5, 28.0)]
+    assert all(clip['keyframe_aligned'] for clip in clips)
+    assert [clip['filename'] for clip in clips] == ["clip_001.mp4", "clip_002.mp4", "clip_003.mp4"]
+
+def test_plan_boundaries_keeps_nominal_boundary_without_nearby_keyframe():
+    clips = plan_boundaries(28.0, 8, KEYFRAMES, tolerance=0.5)
+
+    assert [clip['start'] for clip in clips] == [0.0, 8.0, 16.0, 24.0]
+    assert [clip['keyframe_aligned'] for clip in clips] == [True, False, False, False]
+    assert clips[-1]['end'] == 28.0
+
+def test_choose_boundaries_prefers_silence_then_scene():
+    # Silence inside the first window, only a scene cut inside the second
+    clips = choose_boundaries(
+        70.0, scene_changes=[5.0, 40.0, 44.0], silences=[(20.0, 22.0)],
+        min_duration=10, max_duration=30, keyframes=[0.0, 44.0]
+    )
+    assert [(c['start'], c['end']) for c in clips] == [(0.0, 21.0), (21.0, 44.0), (44.0, 70.0)]
+    assert [c['keyframe_aligned'] for c in clips] == [True, False, True]
+
+def test_choose_boundaries_cuts_on_scene_change_inside_silence():
+    clips = choose_boundaries(40.0, scene_changes=[15.5], silences=[(15.0, 17.0)],
+                              min_duration=10, max_duration=30)
+    assert clips[1]['start'] == 15.5
+
+def test_choose_boundaries_respects_window_without_candidates():
+    clips = choose_boundaries(100.0, scene_changes=[], silences=[], min_duration=10, max_duration=30)
+    durations = [c['end'] - c['start'] for c in clips]
+    assert all(10 <= d <= 30 for d in durations)
+    assert clips[-1]['end'] == 100.0
+
+def test_choose_boundaries_keeps_last_clip_above_min_duration():
+    # A silence late in the window would leave a 2 s tail
+    clips = choose_boundaries(33.0, scene_changes=[], silences=[(30.0, 32.0)],
+                              min_duration=10, max_duration=30)
+    assert clips[-1]['end'] - clips[-1]['start'] >= 10
+
+def test_parse_scene_and_silence_log():
+    log = "\n".join([
+        "[Parsed_showinfo_2 @ 0x1] config in time_base: 1/12800, frame_rate: 25/1",
+        "[silencedetect @ 0x2] silence_start: 5.01551",
+        "[silencedetect @ 0x2] silence_end: 7.012426 | silence_duration: 1.996916",
+        "[Parsed_showinfo_2 @ 0x1] n:   0 pts: 128000 pts_time:10      duration:    512",
+        "[silencedetect @ 0x2] silence_start: 18.5",
+    ])
+    scene_changes, silences = parse_scene_and_silence_log(log, duration=20.0)
+    assert scene_changes == [10.0]
+    assert silences == [(5.01551, 7.012426), (18.5, 20.0)]
@@ -0,0 +1,158 @@
+import os
+import threading
+import time
+import pytest
+from unittest.mock import patch, MagicMock
+from app.utils.clip_splitting import (split_video_segments, read_clip_manifest, plan_virtual_clips, materialize_clip,
+                                      open_clip_source, remove_expired_sources)
+
+@pytest.fixture
+def mock_video_file(tmp_path):
+    video_file = tmp_path / "test_video.mp4"
+    video_file.write_text("mock video content")
+    return str(video_file)
+
+@pytest.fixture
+def mock_output_folder(tmp_path):
+    output_folder = tmp_path / "output"
+    output_folder.mkdir()
+    return str(output_folder)
+
+def fake_segment_muxer(rows):
+    def popen(command, **kwargs):
+        segment_list = command[command.index('-segment_list') + 1]
+        with open(segment_list, 'w') as f:
+            f.write("\n".join(rows) + "\n")
+        process = MagicMock()
+        process.poll.return_value = 0
+        process.returncode = 0
+        return process
+    return popen
+
+@patch('app.utils.clip_splitting.plan_clips')
+@patch('app.utils.clip_splitting.subprocess.Popen')
+def test_split_video_segments_single_pass(mock_run, mock_plan_clips, mock_output_folder):
+    mock_plan_clips.return_value = [
+        {'filename': "clip_001.mp4", 'start': 0.0, 'end': 30.08, 'keyframe_aligned': True},
+        {'filename': "clip_002.mp4", 'start': 30.08, 'end': 60.04, 'keyframe_aligned': True},
+        {'filename': "clip_003.mp4", 'start': 60.04, 'end': 75.0, 'keyframe_aligned': True},
+    ]
+    mock_run.side_effect = fake_segment_muxer([
+        "clip_001.mp4,0.000000,30.080000",
+        "clip_002.mp4,30.080000,60.040000",
+        "clip_003.mp4,60.040000,75.000000",
+    ])
+
+    clips = split_video_segments("input.mp4", mock_output_folder, clip_duration=30)
+
+    mock_run.assert_called_once()
+    command = mock_run.call_args[0][0]
+    assert command[command.index('-f') + 1] == 'segment'
+    assert command[command.index('-segment_times') + 1] == '30.080000,60.040000'
+
+    assert [clip['filename'] for clip in clips] == ["clip_001.mp4", "clip_002.mp4", "clip_003.mp4"]
+    assert clips[1]['start'] == 30.08
+    assert clips[2]['end'] == 75.0
+    assert all(clip['keyframe_aligned'] for clip in clips)
+
+    assert read_clip_manifest(mock_output_folder) == clips
+
+def test_read_clip_manifest_missing(mock_output_folder):
+    assert read_clip_manifest(mock_output_folder) is None
+
+@patch('app.utils.clip_splitting.plan_clips')
+def test_plan_virtual_clips_writes_no_clip_files(mock_plan_clips, mock_video_file, mock_output_folder):
+    mock_plan_clips.return_value = [
+        {'filename': "clip_001.mp4", 'start': 0.0, 'end': 30.0, 'keyframe_aligned': True},
+        {'filename': "clip_002.mp4", 'start': 30.0, 'end': 42.0, 'keyframe_aligned': False},
+    ]
+
+    clips = plan_virtual_clips(mock_video_file, mock_output_folder, clip_duration=30)
+
+    assert all(clip['source'] == mock_video_file for clip in clips)
+    assert read_clip_manifest(mock_output_folder) == clips
+    assert not [f for f in os.listdir(mock_output_folder) if f.endswith('.mp4')]
+
+@patch('app.utils.clip_splitting.plan_clips')
+@patch('app.utils.clip_splitting.subprocess.Popen')
+def test_open_clip_source_yields_the_manifest_clips(mock_run, mock_plan_clips, mock_output_folder):
+    mock_plan_clips.return_value = [
+        {'filename': "clip_001.mp4", 'start': 0.0, 'end': 30.0, 'keyframe_aligned': True},
+        {'filename': "clip_002.mp4", 'start': 30.0, 'end': 42.0, 'keyframe_aligned': True},
+    ]
+    mock_run.side_effect = fake_segment_muxer([
+        "clip_001.mp4,0.000000,30.040000",
+        "clip_002.mp4,30.040000,42.000000",
+    ])
+
+    planned, clip_source = open_clip_source("input.mp4", mock_output_folder, clip_duration=30)
+    clips = list(clip_source)
+
+    assert [clip['end'] for clip in planned] == [30.0, 42.0]
+    # The clips analyzed are the muxer's real boundaries, as recorded in the manifest
+    assert [clip['end'] for clip in clips] == [30.04, 42.0]
+    assert read_clip_manifest(mock_output_folder) == clips
+
+@patch('app.utils.clip_splitting.plan_clips')
+@patch('app.utils.clip_splitting.cut_clip')
+def test_materialize_clip_cuts_on_demand_once(mock_cut_clip, mock_plan_clips, mock_video_file, mock_output_folder):
+    mock_plan_clips.return_value = [
+        {'filename': "clip_001.mp4", 'start': 0.0, 'end': 30.0, 'keyframe_aligned': True},
+    ]
+    mock_cut_clip.side_effect = lambda source, clip, path, output_format=None: open(path, 'w').close()
+    plan_virtual_clips(mock_video_file, mock_output_folder, clip_duration=30)
+
+    clip_path = materialize_clip(mock_output_folder, "clip_001.mp4")
+    assert clip_path == os.path.join(mock_output_folder, "clip_001.mp4")
+    assert os.path.exists(clip_path)
+
+    materialize_clip(mock_output_folder, "clip_001.mp4")
+    mock_cut_clip.assert_called_once()
+    assert materialize_clip(mock_output_folder, "clip_999.mp4") is None
+
+@patch('app.utils.clip_splitting.plan_clips')
+@patch('app.utils.clip_splitting.cut_clip')
+def test_materialize_clip_cuts_different_clips_concurrently(mock_cut_clip, mock_plan_clips, mock_video_file, mock_output_folder):
+    mock_plan_clips.return_value = [
+        {'filename': "clip_001.mp4", 'start': 0.0, 'end': 30.0, 'keyframe_aligned': False},
+        {'filename': "clip_002.mp4", 'start': 30.0, 'end': 60.0, 'keyframe_aligned': False},
+    ]
+    both_cutting = threading.Barrier(2, timeout=5)
+
+    def cut(source, clip, path, output_format=None):
+        # Only passes if the other clip is being cut at the same time
+        both_cutting.wait()
+        open(path, 'w').close()
+
+    mock_cut_clip.side_effect = cut
+    plan_virtual_clips(mock_video_file, mock_output_folder, clip_duration=30)
+
+    threads = [threading.Thread(target=materialize_clip, args=(mock_output_folder, f"clip_00{i}.mp4")) for i in (1, 2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not both_cutting.broken
+    assert sorted(f for f in os.listdir(mock_output_folder) if f.endswith('.mp4')) == ["clip_001.mp4", "clip_002.mp4"]
+    assert not [f for f in os.listdir(mock_output_folder) if f.endswith('.partial')]
+
+@patch('app.utils.clip_splitting.plan_clips')
+def test_remove_expired_sources_only_deletes_old_downloads(mock_plan_clips, mock_video_file, tmp_path):
+    mock_plan_clips.return_value = [{'filename': "clip_001.mp4", 'start': 0.0, 'end': 30.0, 'keyframe_aligned': True}]
+    output_root = tmp_path / "outputs"
+    old_download, new_download = output_root / "old" / "temp_video.mp4", output_root / "new" / "temp_video.mp4"
+    for download in (old_download, new_download):
+        download.parent.mkdir(parents=True)
+        download.write_text("video")
+        plan_virtual_clips(str(download), str(download.parent), clip_duration=30)
+    # An upload analyzed in place isn't ours to delete, however old
+    plan_virtual_clips(mock_video_file, str(output_root / "upload"), clip_duration=30)
+    an_hour_ago = time.time() - 3600
+    for path in (old_download, mock_video_file):
+        os.utime(path, (an_hour_ago, an_hour_ago))
+
+    assert remove_expired_sources(str(output_root), max_age=600) == 1
+    assert not old_download.exists()
+    assert new_download.exists() and os.path.exists(mock_video_file)
+    assert materialize_clip(str(old_download.parent), "clip_001.mp4") is None
@@ -0,0 +1,174 @@
+import io
+import cv2
+import numpy as np
+import pytest
+from unittest.mock import patch, MagicMock
+from app.utils.frame_bus import FrameBus, FrameConsumer
+from app.utils.frame_sampling import SamplingPolicy
+from app.utils.frame_reader import FFmpegFrameReader
+from app.utils.fake_video_detection import FakeVideoAccumulator, detect_fake_video
+
+@pytest.fixture
+def synthetic_video(tmp_path):
+    # 4 s at 25 fps, every frame a different gray level
+    path = str(tmp_path / "synthetic.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 25, (64, 48))
+    for i in range(100):
+        frame = np.full((48, 64, 3), i * 2, dtype=np.uint8)
+        frame[10:20, 10:20] = 255 - i * 2
+        writer.write(frame)
+    writer.release()
+    return path
+
+class Recorder(FrameConsumer):
+    def __init__(self, policy):
+        super().__init__(policy)
+        self.indices = []
+
+    def consume(self, frame, index, timestamp):
+        self.indices.append(index)
+
+class Failing(FrameConsumer):
+    def consume(self, frame, index, timestamp):
+        raise RuntimeError("boom")
+
+def test_frame_bus_feeds_each_consumer_at_its_own_rate(synthetic_video):
+    every_second, every_two_seconds, failing = Recorder("interval:1"), Recorder("interval:2"), Failing()
+    bus = FrameBus(synthetic_video)
+    bus.run([every_second, every_two_seconds, failing])
+
+    assert bus.frames_decoded == 100
+    assert every_second.indices == [0, 25, 50, 75]
+    assert every_two_seconds.indices == [0, 50]
+    assert isinstance(failing.error, RuntimeError)
+
+def test_frame_bus_reads_time_range(synthetic_video):
+    recorder = Recorder("interval:1")
+    bus = FrameBus(synthetic_video, start=1.0, end=3.0)
+    bus.run([recorder])
+
+    assert bus.frames_decoded == 50
+    assert recorder.indices == [0, 25]
+
+def test_sampling_policy_specs():
+    assert SamplingPolicy.parse("interval:5").spec == "interval:5"
+    assert SamplingPolicy.parse("keyframes").filtered
+    assert SamplingPolicy.parse("scene:0.4").ffmpeg_selection() == (False, "gt(scene,0.4)")
+    with pytest.raises(ValueError):
+        SamplingPolicy.parse("count")
+
+    policy = SamplingPolicy.parse("count:4")
+    policy.prepare(25, 100)
+    assert [i for i in range(100) if policy.wants(i)] == [0, 33, 66, 99]
+
+@patch('app.utils.frame_bus.FFmpegFrameReader')
+def test_frame_bus_runs_filtered_policies_in_their_own_pass(mock_reader, synthetic_video):
+    frame = np.zeros((48, 64, 3), dtype=np.uint8)
+    mock_reader.return_value.fps = 25.0
+    mock_reader.return_value.frame_count = 100
+    mock_reader.return_value.frames.side_effect = lambda wants: (item for item in [(0, frame), (50, frame)])
+    keyframes, counted = Recorder("keyframes"), Recorder("count:2")
+
+    bus = FrameBus(synthetic_video)
+    bus.run([keyframes, counted])
+
+    assert mock_reader.call_args.kwargs["keyframes_only"] is True
+    assert keyframes.indices == [0, 50]
+    assert counted.indices == [0, 99]
+    assert bus.frames_decoded == 102
+
+@patch('app.utils.frame_bus.FFmpegFrameReader', side_effect=IOError("no ffmpeg"))
+def test_frame_bus_falls_back_to_interval_sampling(mock_reader, synthetic_video):
+    scenes = Recorder("scene:0.3")
+    FrameBus(synthetic_video).run([scenes])
+
+    assert scenes.indices == [0, 25, 50, 75]
+
+class SizeRecorder(FrameConsumer):
+    def __init__(self, policy, full_resolution=False):
+        super().__init__(policy)
+        self.full_resolution = full_resolution
+        self.widths = []
+
+    def consume(self, frame, index, timestamp):
+        self.widths.append(frame.shape[1])
+
+def test_frame_bus_keeps_source_size_for_full_resolution_consumers(synthetic_video):
+    scaled, full = SizeRecorder("interval:1"), SizeRecorder("interval:2", full_resolution=True)
+
+    bus = FrameBus(synthetic_video, max_width=32)
+    bus.run([scaled, full])
+
+    # One decode at the source size; only the frames the other consumer wants are shrunk
+    assert bus.frames_decoded == 100
+    assert full.widths == [64, 64]
+    assert scaled.widths == [32] * 4
+    assert FakeVideoAccumulator.full_resolution
+
+def test_fake_accumulator_merged_over_clips_matches_whole_video(synthetic_video):
+    merged = FakeVideoAccumulator()
+    for start, end in [(0.0, 2.0), (2.0, 4.0)]:
+        clip_state = FakeVideoAccumulator()
+        FrameBus(synthetic_video, start, end).run([clip_state])
+        merged.merge(FakeVideoAccumulator.from_state(clip_state.state()))
+
+    whole = FakeVideoAccumulator()
+    FrameBus(synthetic_video).run([whole])
+
+    assert merged.quality_count == whole.quality_count == 100
+    assert merged.quality_mean == pytest.approx(whole.quality_mean)
+    assert merged.quality_m2 == pytest.approx(whole.quality_m2)
+    assert merged.color_entropies == pytest.approx(whole.color_entropies)
+    assert merged.result() == detect_fake_video(synthetic_video)
+
+def test_ffmpeg_frame_reader_command_scales_and_seeks():
+    info = MagicMock(video_stream={'width': 3840, 'height': 2160}, fps=25.0, duration=60.0, total_frames=1500)
+    with patch('app.utils.frame_reader.MediaInfo.probe', return_value=info):
+        reader = FFmpegFrameReader("source.mp4", start=10.0, end=20.0, max_width=1280)
+
+    assert (reader.width, reader.height) == (1280, 720)
+    assert reader.frame_count == 250
+    command = reader._command()
+    assert command[command.index('-ss') + 1] == "10.0"
+    assert command[command.index('-t') + 1] == "10.0"
+    assert command[command.index('-vf') + 1] == "scale=1280:720"
+    assert command[command.index('-pix_fmt') + 1] == "bgr24"
+
+@patch('app.utils.frame_reader.subprocess.Popen')
+def test_ffmpeg_frame_reader_wraps_pipe_frames(mock_popen):
+    # Without a frame count every frame comes through the pipe
+    info = MagicMock(video_stream={'width': 4, 'height': 2}, fps=10.0, duration=0.3, total_frames=0)
+    raw = bytes(range(24)) * 3
+    mock_popen.return_value.stdout = io.BufferedReader(io.BytesIO(raw), buffer_size=5)
+    mock_popen.return_value.poll.return_value = 0
+    with patch('app.utils.frame_reader.MediaInfo.probe', return_value=info):
+        reader = FFmpegFrameReader("source.mp4")
+
+    frames = list(reader.frames(lambda index: index != 1))
+
+    assert [index for index, _ in frames] == [0, 1, 2]
+    assert frames[1][1] is None
+    assert frames[2][1].shape == (2, 4, 3)
+    assert frames[2][1].tobytes() == bytes(range(24))
+
+@patch('app.utils.frame_reader.subprocess.Popen')
+def test_ffmpeg_frame_reader_pipes_only_the_wanted_frames(mock_popen):
+    info = MagicMock(video_stream={'width': 4, 'height': 2}, fps=25.0, duration=4.0, total_frames=100)
+    frame = bytes(range(24))
+    # More frames than selected on the pipe: the reader must stop at the wanted ones
+    pipe = io.BytesIO(frame * 10)
+    pipe.close = lambda: None
+    mock_popen.return_value.stdout = pipe
+    mock_popen.return_value.poll.return_value = 0
+    with patch('app.utils.frame_reader.MediaInfo.probe', return_value=info):
+        reader = FFmpegFrameReader("source.mp4")
+
+    frames = list(reader.frames(lambda index: index % 25 == 0 or index == 51))
+
+    command = mock_popen.call_args[0][0]
+    filters = command[command.index('-vf') + 1]
+    assert "select='eq(n,0)+eq(n,25)+between(n,50,51)+eq(n,75)'" in filters
+    assert command[command.index('-fps_mode') + 1] == 'passthrough'
+    assert [index for index, _ in frames] == [0, 25, 50, 51, 75]
+    assert all(f.tobytes() == frame for _, f in frames)
+    assert pipe.tell() == 5 * len(frame)
@@ -0,0 +1,38 @@
+import cv2
+import numpy as np
+from app.utils.frame_change import FrameChangeDetector
+
+
+def _frame(caption=None, seed=0):
+    rng = np.random.default_rng(seed)
+    frame = np.full((720, 1280, 3), 90, dtype=np.uint8)
+    frame[100:400, 200:900] = (30, 120, 200)
+    # Compression-like noise
+    frame = np.clip(frame + rng.integers(-6, 7, frame.shape), 0, 255).astype(np.uint8)
+    if caption:
+        cv2.putText(frame, caption, (80, 650), cv2.FONT_HERSHEY_SIMPLEX, 1.5, (255, 255, 255), 3)
+    return frame
+
+
+def test_only_frames_with_new_content_count_as_changed():
+    detector = FrameChangeDetector()
+
+    changes = [
+        detector.changed(_frame()),
+        detector.changed(_frame(seed=1)),
+        detector.changed(_frame("Breaking news", seed=2)),
+        detector.changed(_frame("Breaking news", seed=3)),
+        detector.changed(_frame("Markets close higher", seed=4)),
+    ]
+
+    assert changes == [True, False, True, False, True]
+
+
+def test_region_ignores_changes_outside_the_text_area():
+    detector = FrameChangeDetector(region=(0, 0.66, 1, 1))
+    moved = _frame("Breaking news")
+    moved[100:400, 200:900] = (200, 40, 40)
+
+    assert detector.changed(_frame("Breaking news"))
+    assert not detector.changed(moved)
+    assert detector.changed(_frame("Weather"))
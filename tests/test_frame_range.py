@@ -0,0 +1,67 @@
+import cv2
+import pytest
+import numpy as np
+from app.utils.frame_range import read_frames_sequentially
+
+class MockCapture:
+    """Capture over numbered frames that counts how many frames it decodes."""
+
+    def __init__(self, frame_count, gop=250):
+        self.frame_count = frame_count
+        self.gop = gop
+        self.position = 0
+        self.decoded = 0
+
+    def set(self, prop, value):
+        assert prop == cv2.CAP_PROP_POS_FRAMES
+        # Seeking decodes from the previous keyframe up to the target
+        self.decoded += value - (value // self.gop) * self.gop
+        self.position = value
+        return True
+
+    def grab(self):
+        if self.position >= self.frame_count:
+            return False
+        self.position += 1
+        self.decoded += 1
+        return True
+
+    def read(self):
+        if not self.grab():
+            return False, None
+        return True, np.full((2, 2), self.position - 1)
+
+def seek_and_read(cap, frame_indices, fps):
+    samples = []
+    for frame_idx in frame_indices:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
+        ret, frame = cap.read()
+        if not ret:
+            continue
+        samples.append((frame_idx, frame_idx / fps, int(frame[0, 0])))
+    return samples
+
+@pytest.mark.parametrize("frame_indices", [
+    np.linspace(0, 999, 10, dtype=int),  # recognize_images_in_video
+    range(0, 1000, 25),  # detect_objects_in_clip, one frame per second
+])
+def test_sequential_sampler_matches_seek_sampling(frame_indices):
+    fps = 25
+    seeking = MockCapture(1000)
+    expected = seek_and_read(seeking, frame_indices, fps)
+
+    sequential = MockCapture(1000)
+    samples = [
+        (frame_idx, frame_idx / fps, int(frame[0, 0]))
+        for frame_idx, frame in read_frames_sequentially(sequential, frame_indices)
+    ]
+
+    assert samples == expected
+    # Every frame up to the last sample is decoded once instead of again
+    # from the previous keyframe for each sample
+    assert sequential.decoded == max(frame_indices) + 1
+    assert sequential.decoded < seeking.decoded
+
+def test_sequential_sampler_handles_repeated_and_missing_indices():
+    samples = list(read_frames_sequentially(MockCapture(10), [7, 2, 2, 12]))
+    assert [(frame_idx, int(frame[0, 0])) for frame_idx, frame in samples] == [(2, 2), (2, 2), (7, 7)]
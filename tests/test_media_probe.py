@@ -0,0 +1,119 @@
+import io
+import json
+import os
+import pytest
+from unittest.mock import patch
+from app.utils import media_probe
+from app.utils.media_probe import MediaInfo, get_video_info
+
+FFPROBE_OUTPUT = json.dumps({
+    "streams": [
+        {"index": 0, "codec_type": "video", "codec_name": "h264", "avg_frame_rate": "25/1", "r_frame_rate": "25/1"},
+        {"index": 1, "codec_type": "audio", "codec_name": "aac", "sample_rate": "44100", "channels": 2,
+         "channel_layout": "stereo"},
+    ],
+    "format": {"duration": "3.000000"},
+}).encode()
+
+# Packets of the video stream only, as ffprobe lists them with -select_streams
+PACKETS_CSV = "0.000000,K__\n0.040000,___\n2.000000,K__\nN/A,K__\n"
+
+
+class FakePopen:
+    """Stands in for the packet-listing ffprobe process."""
+
+    def __init__(self, cmd, **kwargs):
+        self.cmd = cmd
+        self.stdout = io.StringIO(PACKETS_CSV)
+        self.stderr = io.StringIO("")
+        self.returncode = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+@pytest.fixture(autouse=True)
+def mock_popen():
+    with patch('app.utils.media_probe.subprocess.Popen', side_effect=FakePopen) as popen:
+        yield popen
+
+@pytest.fixture(autouse=True)
+def probe_cache_dir(tmp_path):
+    media_probe._probe_cache.clear()
+    with patch('app.utils.media_probe.PROBE_CACHE_DIR', str(tmp_path / "probe_cache")):
+        yield str(tmp_path / "probe_cache")
+
+@pytest.fixture
+def mock_video_file(tmp_path):
+    video_file = tmp_path / "test_video.mp4"
+    video_file.write_text("mock video content")
+    return str(video_file)
+
+@patch('app.utils.media_probe.subprocess.check_output')
+def test_probe_lists_packets_of_the_video_stream_only(mock_check_output, mock_popen, mock_video_file):
+    mock_check_output.return_value = FFPROBE_OUTPUT
+
+    info = MediaInfo.probe(mock_video_file)
+
+    mock_check_output.assert_called_once()
+    assert '-count_packets' not in mock_check_output.call_args[0][0]
+    assert '-show_entries' not in mock_check_output.call_args[0][0]
+    # Packets are only listed for the video stream
+    packets_cmd = mock_popen.call_args[0][0]
+    assert packets_cmd[packets_cmd.index('-select_streams') + 1] == '0'
+    assert info.duration == 3.0
+    assert info.fps == 25.0
+    assert info.keyframes == [0.0, 2.0]
+    # Video packets count as frames when nb_frames is missing
+    assert info.total_frames == 4
+    assert info.audio_layout == {'codec_name': 'aac', 'sample_rate': 44100, 'channels': 2, 'channel_layout': 'stereo'}
+    assert get_video_info(mock_video_file) == (4, 25.0, 3.0)
+    mock_check_output.assert_called_once()
+
+@patch('app.utils.media_probe.subprocess.check_output')
+def test_probe_is_reused_from_disk_cache(mock_check_output, mock_video_file, probe_cache_dir):
+    mock_check_output.return_value = FFPROBE_OUTPUT
+    MediaInfo.probe(mock_video_file)
+
+    # A new process only has the disk cache to go on
+    media_probe._probe_cache.clear()
+    info = MediaInfo.probe(mock_video_file)
+
+    mock_check_output.assert_called_once()
+    assert info.keyframes == [0.0, 2.0]
+    # Nothing is written next to the file itself
+    assert sorted(os.listdir(os.path.dirname(mock_video_file))) == ["probe_cache", os.path.basename(mock_video_file)]
+
+@patch('app.utils.media_probe.subprocess.check_output')
+def test_probe_is_redone_when_the_file_changes(mock_check_output, mock_video_file):
+    mock_check_output.return_value = FFPROBE_OUTPUT
+    MediaInfo.probe(mock_video_file)
+
+    # Same size, only the middle differs
+    with open(mock_video_file, 'w') as f:
+        f.write("mock VIDEO content")
+    media_probe._probe_cache.clear()
+    MediaInfo.probe(mock_video_file)
+
+    assert mock_check_output.call_count == 2
+
+@patch('app.utils.media_probe.subprocess.check_output')
+def test_probe_of_each_file_is_bound_to_its_path(mock_check_output, tmp_path):
+    mock_check_output.return_value = FFPROBE_OUTPUT
+    first, second = tmp_path / "a.mp4", tmp_path / "b.mp4"
+    first.write_text("x" * 100 + "first" + "x" * 100)
+    second.write_text("x" * 100 + "other" + "x" * 100)
+
+    assert MediaInfo.probe(str(first)).path == str(first)
+    assert MediaInfo.probe(str(second)).path == str(second)
+    assert mock_check_output.call_count == 2
+    assert [call[0][0][-1] for call in mock_check_output.call_args_list] == [str(first), str(second)]
+
+    # The same file under another name is probed once, but reported under the name asked for
+    link = tmp_path / "link.mp4"
+    link.symlink_to(first)
+    assert MediaInfo.probe(str(link)).path == str(link)
+    assert mock_check_output.call_count == 2
@@ -0,0 +1,105 @@
+import threading
+import time
+
+import pytest
+from app.utils.network_io import CircuitBreaker, CircuitOpenError, IOExecutor, RemoteService
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_remote_service_retries_with_exponential_backoff():
+    delays = []
+    service = RemoteService("translate", attempts=4, backoff=1.0, max_backoff=3.0, sleep=delays.append)
+    outcomes = iter([ConnectionError("reset"), ConnectionError("reset"), ConnectionError("reset"), "bonjour"])
+
+    def flaky():
+        outcome = next(outcomes)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    assert service.call(flaky) == "bonjour"
+    # Full delays of 1, 2 and 3 (capped) seconds, each shortened by up to half for jitter
+    assert [0.5 <= delay / cap <= 1.0 for delay, cap in zip(delays, [1, 2, 3])] == [True] * 3
+    assert service.breaker.failures == 0
+
+
+def test_non_retryable_errors_are_raised_at_once():
+    calls = []
+
+    def no_speech():
+        calls.append(1)
+        raise LookupError("nothing recognized")
+
+    service = RemoteService("asr", attempts=3, sleep=lambda delay: None)
+    with pytest.raises(LookupError):
+        service.call(no_speech, retry_on=(ConnectionError,))
+    assert len(calls) == 1
+
+
+def test_circuit_breaker_opens_and_lets_one_trial_through():
+    clock = Clock()
+    breaker = CircuitBreaker("asr", failure_threshold=2, reset_timeout=30, clock=clock)
+
+    breaker.before_call()
+    breaker.record_failure()
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    clock.now = 31
+    breaker.before_call()  # the trial call
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    clock.now = 62
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_failing_service_is_cut_off():
+    service = RemoteService("translate", attempts=2, breaker_failures=2, sleep=lambda delay: None)
+    calls = []
+
+    def down():
+        calls.append(1)
+        raise ConnectionError("unreachable")
+
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            service.call(down)
+    with pytest.raises(CircuitOpenError):
+        service.call(down)
+    assert len(calls) == 4
+
+
+def test_io_executor_limits_concurrent_calls_per_service():
+    io_executor = IOExecutor({'workers': 6, 'limits': {'asr': 2}})
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    def request():
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.05)
+        with lock:
+            active[0] -= 1
+        return "ok"
+
+    futures = [io_executor.submit_call("asr", request) for _ in range(6)]
+
+    assert [f.result() for f in futures] == ["ok"] * 6
+    assert peak[0] == 2
+    io_executor.shutdown()
@@ -0,0 +1,118 @@
+import threading
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import numpy as np
+from app.utils import ocr_engine
+from app.utils.ocr_engine import PytesseractEngine, TesserocrEngine, get_ocr_engine
+
+
+class FakeAPI:
+    created = []
+
+    def __init__(self, lang):
+        self.lang = lang
+        self.images = []
+        self.ended = False
+        FakeAPI.created.append(self)
+
+    def SetPageSegMode(self, mode):
+        self.mode = mode
+
+    def SetImageBytes(self, data, width, height, bytes_per_pixel, bytes_per_line):
+        self.images.append((len(data), width, height, bytes_per_pixel))
+
+    def Recognize(self):
+        pass
+
+    def GetIterator(self):
+        return [("Breaking", (10, 5, 80, 25), True), ("news", (90, 5, 140, 25), False)]
+
+    def GetUTF8Text(self):
+        return f"text of {self.images[-1][1]}x{self.images[-1][2]}"
+
+    def End(self):
+        self.ended = True
+
+
+class FakeWord:
+    def __init__(self, text, box, block_start):
+        self.text, self.box, self.block_start = text, box, block_start
+
+    def IsAtBeginningOf(self, level):
+        return self.block_start
+
+    def GetUTF8Text(self, level):
+        return self.text
+
+    def BoundingBox(self, level):
+        return self.box
+
+    def Confidence(self, level):
+        return 92.5
+
+
+fake_tesserocr = SimpleNamespace(
+    PyTessBaseAPI=FakeAPI,
+    RIL=SimpleNamespace(WORD=3, BLOCK=0),
+    iterate_level=lambda iterator, level: [FakeWord(*word) for word in iterator],
+)
+
+
+def test_tesserocr_engine_reads_frames_from_memory():
+    FakeAPI.created = []
+    frame = np.zeros((40, 200, 3), dtype=np.uint8)
+
+    with patch.object(ocr_engine, "tesserocr", fake_tesserocr):
+        engine = TesserocrEngine()
+        data = engine.image_to_data(frame, "--psm 6")
+        engine.image_to_string(frame)
+        engine.close()
+
+    api, = FakeAPI.created
+    assert api.images == [(8000, 200, 40, 1), (8000, 200, 40, 1)]
+    assert api.mode == 3 and api.ended
+    assert data == {
+        'block_num': [1, 1], 'text': ['Breaking', 'news'], 'conf': [92.5, 92.5],
+        'left': [10, 90], 'top': [5, 5], 'width': [70, 50], 'height': [20, 20],
+    }
+
+
+def test_tesserocr_engine_keeps_one_api_per_thread():
+    FakeAPI.created = []
+    crops = [np.zeros((20, width), dtype=np.uint8) for width in range(30, 90, 5)]
+    barrier = threading.Barrier(3)
+
+    def image_to_string(self, image, config=""):
+        barrier.wait(timeout=5)
+        return original(self, image, config)
+
+    original = TesserocrEngine.image_to_string
+    with patch.object(ocr_engine, "tesserocr", fake_tesserocr), \
+            patch.object(TesserocrEngine, "image_to_string", image_to_string):
+        engine = TesserocrEngine(threads=3)
+        texts = engine.map("image_to_string", crops[:3])
+        texts += engine.map("image_to_string", crops[3:6])
+        engine.close()
+
+    assert texts == [f"text of {width}x20" for width in range(30, 60, 5)]
+    assert len(FakeAPI.created) == 3
+
+
+def test_pytesseract_engine_returns_the_common_keys():
+    d = {'level': [5], 'block_num': [1], 'par_num': [1], 'text': ['news'], 'conf': [88],
+         'left': [1], 'top': [2], 'width': [3], 'height': [4]}
+
+    with patch("app.utils.ocr_engine.pytesseract.image_to_data", return_value=d) as image_to_data:
+        data = PytesseractEngine().image_to_data(np.zeros((10, 10), dtype=np.uint8), "--psm 6")
+
+    assert set(data) == set(ocr_engine.DATA_KEYS)
+    assert image_to_data.call_args.kwargs['config'] == "--psm 6"
+
+
+def test_falls_back_to_pytesseract_without_tesserocr():
+    with patch.object(ocr_engine, "tesserocr", None), patch.dict(ocr_engine._engines, clear=True):
+        engine = get_ocr_engine("tesserocr", threads=1)
+
+        assert isinstance(engine, PytesseractEngine)
+        assert get_ocr_engine("tesserocr", threads=1) is engine
@@ -0,0 +1,58 @@
+from app.utils.ocr_spans import SpanTracker, lines_from_data, unique_texts
+
+CAPTION_BOX = [80, 940, 900, 60]
+
+
+def _line(text, confidence=0.9, bbox=CAPTION_BOX):
+    return {'text': text, 'bbox': bbox, 'confidence': confidence}
+
+
+def test_lines_group_confident_words_by_block():
+    d = {
+        'block_num': [1, 1, 1, 2, 2],
+        'text': ['Markets', 'close', '', 'LIVE', '~'],
+        'conf': [90, 80, -1, 95, 20],
+        'left': [80, 300, 0, 1700, 1790],
+        'top': [940, 945, 0, 60, 60],
+        'width': [200, 150, 0, 90, 5],
+        'height': [60, 50, 0, 40, 40],
+    }
+
+    assert lines_from_data(d, min_confidence=50) == [
+        {'text': 'Markets close', 'bbox': [80, 940, 370, 60], 'confidence': 0.85},
+        {'text': 'LIVE', 'bbox': [1700, 60, 90, 40], 'confidence': 0.95},
+    ]
+
+
+def test_repeated_readings_of_a_caption_make_one_span():
+    tracker = SpanTracker()
+    tracker.add(0.0, [_line("Markets close higher", 0.8), _line("LIVE", 0.9, [1700, 60, 90, 40])])
+    tracker.add(5.0, [_line("Markets c1ose higher", 0.7), _line("LIVE", 0.95, [1700, 60, 90, 40])])
+    tracker.add(10.0, [_line("Markets close higher!", 0.93, [84, 942, 900, 58])])
+    tracker.add(15.0, [_line("Rain expected tonight", 0.9)])
+
+    spans = tracker.spans()
+
+    assert [(s['text'], s['first_seen'], s['last_seen'], s['confidence']) for s in spans] == [
+        ("Markets close higher!", 0.0, 10.0, 0.93),
+        ("LIVE", 0.0, 5.0, 0.95),
+        ("Rain expected tonight", 15.0, 15.0, 0.9),
+    ]
+    assert spans[0]['bbox'] == [84, 942, 900, 58]
+
+
+def test_span_survives_one_missed_frame_but_not_two():
+    tracker = SpanTracker(patience=1)
+    for timestamp, lines in [(0, ["Breaking news"]), (1, []), (2, ["Breaking news"]),
+                             (3, []), (4, []), (5, ["Breaking news"])]:
+        tracker.add(timestamp, [_line(text) for text in lines])
+
+    assert [(s['first_seen'], s['last_seen']) for s in tracker.spans()] == [(0, 2), (5, 5)]
+    assert unique_texts(tracker.spans()) == ["Breaking news"]
+
+
+def test_same_text_elsewhere_on_screen_is_another_span():
+    tracker = SpanTracker()
+    tracker.add(0, [_line("Breaking news"), _line("Breaking news", bbox=[80, 100, 900, 60])])
+
+    assert len(tracker.spans()) == 2
@@ -0,0 +1,99 @@
+import cv2
+import numpy as np
+from app.utils.ocr_engine import OCREngine
+from app.utils.ocr_tiers import TwoTierOCR
+
+
+class FakeEngine(OCREngine):
+    """
+    Reads one word per image, unsure of it on images narrower than min_sure_width
+    and reading nothing at all on images narrower than min_read_width.
+    """
+
+    name = "fake"
+
+    def __init__(self, min_sure_width, min_read_width=0):
+        super().__init__()
+        self.min_sure_width = min_sure_width
+        self.min_read_width = min_read_width
+        self.images = []
+
+    def image_to_data(self, image, config=""):
+        self.images.append(image)
+        height, width = image.shape[:2]
+        if width < self.min_read_width:
+            return {key: [] for key in ('block_num', 'text', 'conf', 'left', 'top', 'width', 'height')}
+        return {
+            'block_num': [1], 'text': [f"w{width}"], 'conf': [90 if width >= self.min_sure_width else 40],
+            'left': [2], 'top': [3], 'width': [width - 4], 'height': [height - 6],
+        }
+
+
+def _frame():
+    frame = np.full((1080, 1920, 3), 70, dtype=np.uint8)
+    cv2.putText(frame, "Markets close higher today", (80, 980), cv2.FONT_HERSHEY_SIMPLEX, 2, (255, 255, 255), 4)
+    cv2.putText(frame, "LIVE", (1710, 100), cv2.FONT_HERSHEY_SIMPLEX, 1.5, (255, 255, 255), 3)
+    return frame
+
+
+def test_only_unsure_regions_are_read_again_at_full_resolution():
+    # Halved, the caption crop is still wide enough to be sure of; the LIVE bug isn't
+    engine = FakeEngine(min_sure_width=100)
+    reader = TwoTierOCR(engine, scale=0.5, threshold=70)
+
+    data = reader.image_to_data(_frame())
+
+    (live_fast, caption_fast, live_fine) = engine.images
+    assert set(np.unique(live_fast)) <= {0, 255} and set(np.unique(caption_fast)) <= {0, 255}
+    assert live_fine.shape[1] // 2 == live_fast.shape[1]
+    assert data['block_num'] == [1, 2]
+    assert data['text'] == [f"w{live_fine.shape[1]}", f"w{caption_fast.shape[1]}"]
+    assert data['conf'] == [90, 90]
+    assert 1690 <= data['left'][0] <= 1710 and 50 <= data['top'][0] <= 70
+    assert 70 <= data['left'][1] <= 90 and 920 <= data['top'][1] <= 950
+
+    stats = reader.stats()
+    assert stats['frames'] == 1
+    assert (stats['fast']['count'], stats['fine']['count']) == (2, 1)
+    assert (stats['fine']['unsure'], stats['fine']['empty']) == (1, 0)
+
+
+def test_confident_fast_tier_needs_no_second_pass():
+    engine = FakeEngine(min_sure_width=1)
+    reader = TwoTierOCR(engine, text_regions=False, scale=0.25)
+
+    data = reader.image_to_data(_frame())
+
+    assert len(engine.images) == 1 and engine.images[0].shape == (270, 480)
+    assert (data['left'], data['top'], data['width'], data['height']) == ([8], [12], [1904], [1056])
+    assert reader.stats()['fine'] == {'count': 0, 'seconds': 0.0, 'unsure': 0, 'empty': 0}
+
+
+def test_regions_the_fast_tier_reads_nothing_in_are_read_again():
+    # Halved, the LIVE bug is too small to read anything in
+    engine = FakeEngine(min_sure_width=1, min_read_width=80)
+    reader = TwoTierOCR(engine, scale=0.5, threshold=70)
+
+    data = reader.image_to_data(_frame())
+
+    live_fast, caption_fast, live_fine = engine.images
+    assert live_fine.shape[1] // 2 == live_fast.shape[1] < 80 <= live_fine.shape[1]
+    assert data['block_num'] == [1, 2]
+    assert data['text'] == [f"w{live_fine.shape[1]}", f"w{caption_fast.shape[1]}"]
+    stats = reader.stats()
+    assert (stats['fast']['count'], stats['fine']['count']) == (2, 1)
+    assert (stats['fine']['unsure'], stats['fine']['empty']) == (0, 1)
+
+
+def test_empty_regions_tall_enough_for_the_fast_tier_are_not_read_again():
+    # Nothing is read anywhere: only the LIVE bug was too small for the fast
+    # tier to be sure of; the empty caption region is taken for a false positive
+    engine = FakeEngine(min_sure_width=1, min_read_width=10000)
+    reader = TwoTierOCR(engine, scale=0.5, threshold=70)
+
+    data = reader.image_to_data(_frame())
+
+    live_fast, caption_fast, live_fine = engine.images
+    assert live_fine.shape[1] // 2 == live_fast.shape[1]
+    assert data['text'] == []
+    assert reader.stats()['fine'] == {**reader.stats()['fine'], 'count': 1, 'unsure': 0, 'empty': 1}
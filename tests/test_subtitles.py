@@ -0,0 +1,90 @@
+import subprocess
+from unittest.mock import MagicMock, patch
+
+from app.utils.media_probe import MediaInfo
+from app.utils.subtitles import (
+    choose_subtitle_stream, clip_cues, cue_words, extract_subtitle_cues, parse_srt, subtitles_for_clip,
+)
+
+SRT = """1
+00:00:01,000 --> 00:00:02,500
+<i>Hello there,</i>
+general Kenobi.
+
+2
+00:00:04,000 --> 00:00:06,000
+{\\an8}Markets close higher
+
+3
+00:00:07,000 --> 00:00:08,000
+<font color="#ffffff"></font>
+"""
+
+
+def _info(*subtitle_streams):
+    streams = [{"index": 0, "codec_type": "video", "codec_name": "h264"}, *subtitle_streams]
+    return MediaInfo("video.mkv", "identity", {"streams": streams})
+
+
+def test_parse_srt_strips_markup_and_empty_cues():
+    assert parse_srt(SRT) == [
+        {'start': 1.0, 'end': 2.5, 'text': 'Hello there, general Kenobi.'},
+        {'start': 4.0, 'end': 6.0, 'text': 'Markets close higher'},
+    ]
+
+
+def test_clip_cues_are_cut_to_the_clip_and_made_relative():
+    cues = parse_srt(SRT)
+
+    assert clip_cues(cues, 2.0, 5.0) == [
+        {'start': 0.0, 'end': 0.5, 'text': 'Hello there, general Kenobi.'},
+        {'start': 2.0, 'end': 3.0, 'text': 'Markets close higher'},
+    ]
+    assert clip_cues(cues, 6.0, 9.0) == []
+
+
+def test_clip_between_cues_has_no_subtitles():
+    cues = parse_srt(SRT)
+
+    # Falls in the gap between the two cues: it takes the ASR/OCR path
+    assert subtitles_for_clip(cues, 2.6, 3.9) is None
+    assert subtitles_for_clip(None, 0.0, 5.0) is None
+    assert subtitles_for_clip(cues, 3.0, 4.5) == [{'start': 1.0, 'end': 1.5, 'text': 'Markets close higher'}]
+
+
+def test_cue_words_spread_over_the_cue():
+    assert cue_words([{'start': 1.0, 'end': 2.0, 'text': 'Markets close'}]) == [
+        {'word': 'Markets', 'start': 1.0, 'end': 1.5},
+        {'word': 'close', 'start': 1.5, 'end': 2.0},
+    ]
+
+
+def test_default_text_stream_is_chosen_and_bitmap_or_forced_ones_are_not():
+    pgs = {"index": 1, "codec_type": "subtitle", "codec_name": "hdmv_pgs_subtitle", "disposition": {"default": 1}}
+    forced = {"index": 2, "codec_type": "subtitle", "codec_name": "subrip", "disposition": {"forced": 1}}
+    english = {"index": 3, "codec_type": "subtitle", "codec_name": "subrip", "disposition": {"default": 0}}
+    default = {"index": 4, "codec_type": "subtitle", "codec_name": "ass", "disposition": {"default": 1}}
+
+    assert _info(pgs, forced).text_subtitle_streams == [forced]
+    assert choose_subtitle_stream(_info(pgs, forced)) is None
+    assert choose_subtitle_stream(_info(pgs, forced, english)) == english
+    assert choose_subtitle_stream(_info(english, default)) == default
+
+
+@patch('app.utils.subtitles.subprocess.run')
+def test_extraction_converts_the_stream_to_srt(mock_run):
+    mock_run.return_value = MagicMock(stdout=SRT.encode())
+
+    cues = extract_subtitle_cues("video.mkv", {"index": 3})
+
+    command = mock_run.call_args[0][0]
+    assert command[command.index('-map') + 1] == '0:3'
+    assert command[command.index('-f') + 1] == 'srt'
+    assert len(cues) == 2
+
+
+@patch('app.utils.subtitles.subprocess.run')
+def test_failed_extraction_returns_none(mock_run):
+    mock_run.side_effect = subprocess.CalledProcessError(1, 'ffmpeg', stderr=b'boom')
+
+    assert extract_subtitle_cues("video.mkv", {"index": 3}) is None
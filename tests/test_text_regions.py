@@ -0,0 +1,53 @@
+from unittest.mock import patch
+
+import cv2
+import numpy as np
+from app.utils.ocr_engine import PytesseractEngine
+from app.utils.text_regions import merge_boxes, ocr_text_regions, propose_text_regions
+
+
+def _frame(text=True):
+    frame = np.full((1080, 1920, 3), 70, dtype=np.uint8)
+    cv2.rectangle(frame, (300, 200), (1100, 600), (40, 140, 60), -1)
+    cv2.circle(frame, (1500, 450), 150, (20, 20, 160), -1)
+    if text:
+        cv2.putText(frame, "Markets close higher today", (80, 980), cv2.FONT_HERSHEY_SIMPLEX, 2, (255, 255, 255), 4)
+        cv2.putText(frame, "LIVE", (1710, 100), cv2.FONT_HERSHEY_SIMPLEX, 1.5, (255, 255, 255), 3)
+    return frame
+
+
+def _contains(box, x, y):
+    return box[0] <= x <= box[0] + box[2] and box[1] <= y <= box[1] + box[3]
+
+
+def test_proposes_one_box_per_line_of_text():
+    boxes = propose_text_regions(_frame())
+
+    assert len(boxes) == 2
+    live, caption = boxes
+    assert _contains(live, 1720, 85)
+    assert _contains(caption, 100, 960) and _contains(caption, 900, 960)
+
+
+def test_plain_shapes_are_not_text():
+    assert propose_text_regions(_frame(text=False)) == []
+
+
+def test_merge_boxes_joins_neighbours_only():
+    boxes = merge_boxes([(0, 0, 50, 20), (60, 2, 40, 18), (0, 200, 30, 20)], gap=8)
+
+    assert sorted(boxes) == [(0, 0, 100, 20), (0, 200, 30, 20)]
+
+
+def test_ocr_results_are_in_frame_coordinates():
+    frame = _frame()
+    words = {'text': ['LIVE'], 'conf': [91], 'left': [4], 'top': [5], 'width': [60], 'height': [30]}
+
+    words['block_num'] = [1]
+    with patch("app.utils.ocr_engine.pytesseract.image_to_data", return_value=words) as image_to_data:
+        data = ocr_text_regions(frame, boxes=[(1700, 60, 90, 40)], engine=PytesseractEngine())
+
+    crop = image_to_data.call_args.args[0]
+    assert crop.shape[:2] == (52, 102)
+    assert data['text'] == ['LIVE']
+    assert (data['left'], data['top'], data['block_num']) == ([1698], [59], [1])
@@ -1,8 +1,9 @@
 import os
 import sys
+import subprocess
 import pytest
 from unittest.mock import patch, MagicMock
-from app.utils.video_processing import process_video_file, download_streaming_video, download_video, download_from_archive
+from app.utils.video_processing import process_video_file, process_chunk, download_streaming_video, download_video, download_from_archive
 
 # Add the root directory to the Python path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -13,20 +14,21 @@ def mock_video_file(tmp_path):
     video_file.write_text("mock video content")
     return str(video_file)
 
+def _reencoded(func, chunks):
+    """What Pool.map returns when every chunk is re-encoded."""
+    return [{"output_path": chunk[3], "method": "reencode", "processing_time": 1.0} for chunk in chunks]
+
 @pytest.fixture
 def mock_output_folder(tmp_path):
     output_folder = tmp_path / "output"
     output_folder.mkdir()
     return str(output_folder)
 
-@patch('app.utils.video_processing.VideoFileClip')
+@patch('app.utils.video_processing.MediaInfo')
 @patch('app.utils.video_processing.multiprocessing.Pool')
-def test_process_video_file(mock_pool, mock_video_clip, mock_video_file, mock_output_folder):
-    mock_video_clip.return_value.duration = 30
-    mock_subclip = MagicMock()
-    mock_video_clip.return_value.subclip.return_value = mock_subclip
-    
-    mock_pool.return_value.__enter__.return_value.map.return_value = None
+def test_process_video_file(mock_pool, mock_media_info, mock_video_file, mock_output_folder):
+    mock_media_info.probe.return_value.duration = 30
+    mock_pool.return_value.__enter__.return_value.map.side_effect = _reencoded
 
     clips = process_video_file(mock_video_file, mock_output_folder, clip_duration=10)
 
@@ -58,14 +60,11 @@ def test_download_functions(download_func, tmp_path):
         mock_yt_dlp.assert_called_once()
         mock_yt_dlp.return_value.__enter__.return_value.download.assert_called_once()
 
-@patch('app.utils.video_processing.VideoFileClip')
+@patch('app.utils.video_processing.MediaInfo')
 @patch('app.utils.video_processing.multiprocessing.Pool')
-def test_process_video_file_short_duration(mock_pool, mock_video_clip, mock_video_file, mock_output_folder):
-    mock_video_clip.return_value.duration = 5
-    mock_subclip = MagicMock()
-    mock_video_clip.return_value.subclip.return_value = mock_subclip
-    
-    mock_pool.return_value.__enter__.return_value.map.return_value = None
+def test_process_video_file_short_duration(mock_pool, mock_media_info, mock_video_file, mock_output_folder):
+    mock_media_info.probe.return_value.duration = 5
+    mock_pool.return_value.__enter__.return_value.map.side_effect = _reencoded
 
     clips = process_video_file(mock_video_file, mock_output_folder, clip_duration=10)
 
@@ -77,14 +76,11 @@ def test_process_video_file_short_duration(mock_pool, mock_video_clip, mock_vide
     mock_pool.assert_called_once()
     mock_pool.return_value.__enter__.return_value.map.assert_called_once()
 
-@patch('app.utils.video_processing.VideoFileClip')
+@patch('app.utils.video_processing.MediaInfo')
 @patch('app.utils.video_processing.multiprocessing.Pool')
-def test_process_video_file_exact_duration(mock_pool, mock_video_clip, mock_video_file, mock_output_folder):
-    mock_video_clip.return_value.duration = 20
-    mock_subclip = MagicMock()
-    mock_video_clip.return_value.subclip.return_value = mock_subclip
-    
-    mock_pool.return_value.__enter__.return_value.map.return_value = None
+def test_process_video_file_exact_duration(mock_pool, mock_media_info, mock_video_file, mock_output_folder):
+    mock_media_info.probe.return_value.duration = 20
+    mock_pool.return_value.__enter__.return_value.map.side_effect = _reencoded
 
     clips = process_video_file(mock_video_file, mock_output_folder, clip_duration=10)
 
@@ -98,5 +94,39 @@ def test_process_video_file_exact_duration(mock_pool, mock_video_clip, mock_vide
     mock_pool.assert_called_once()
     mock_pool.return_value.__enter__.return_value.map.assert_called_once()
 
+@patch('app.utils.video_processing.MediaInfo')
+@patch('app.utils.video_processing.multiprocessing.Pool')
+@patch('app.utils.video_processing.can_stream_copy', return_value=True)
+def test_process_video_file_reports_chunk_stats(mock_can_copy, mock_pool, mock_media_info, mock_video_file, mock_output_folder):
+    mock_media_info.probe.return_value.duration = 20
+    mock_media_info.probe.return_value.keyframes = [0.0, 8.0, 16.0]
+    mock_pool.return_value.__enter__.return_value.map.return_value = [
+        {"method": "reencode", "processing_time": 4.0},
+        {"method": "copy", "processing_time": 0.5},
+    ]
+
+    clips = process_video_file(mock_video_file, mock_output_folder, clip_duration=10, threads=2)
+
+    assert [clip['method'] for clip in clips] == ["reencode", "copy"]
+    assert [clip['processing_time'] for clip in clips] == [4.0, 0.5]
+    # The copied chunk really starts at the keyframe before 10 s
+    assert [(clip['start_time'], clip['end_time']) for clip in clips] == [(0, 10), (8.0, 20)]
+    assert [clip['duration'] for clip in clips] == [10, 12.0]
+    chunks = mock_pool.return_value.__enter__.return_value.map.call_args[0][1]
+    assert all(chunk[4] == "copy" and chunk[6] == 2 for chunk in chunks)
+
+@patch('app.utils.video_processing.subprocess.run')
+def test_process_chunk_falls_back_to_reencode(mock_run, mock_video_file, mock_output_folder):
+    output_path = os.path.join(mock_output_folder, "clip_1.mp4")
+    mock_run.side_effect = [subprocess.CalledProcessError(1, "ffmpeg", stderr="error"), MagicMock()]
+
+    stats = process_chunk((mock_video_file, 0, 10, output_path, "copy", "fast", 3))
+
+    assert stats["method"] == "reencode"
+    assert stats["processing_time"] >= 0
+    reencode_command = mock_run.call_args[0][0]
+    assert reencode_command[reencode_command.index('-preset') + 1] == "fast"
+    assert reencode_command[reencode_command.index('-threads') + 1] == "3"
+
 if __name__ == "__main__":
     pytest.main()
\ No newline at end of file
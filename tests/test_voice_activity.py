@@ -0,0 +1,44 @@
+import numpy as np
+from app.utils.voice_activity import detect_speech, frame_features, speech_samples
+
+RATE = 16000
+
+
+def _voiced(seconds):
+    """A harmonic tone: loud and tonal, like voiced speech."""
+    t = np.arange(int(seconds * RATE)) / RATE
+    wave = sum(np.sin(2 * np.pi * 150 * k * t) / k for k in range(1, 6))
+    return (wave * 6000).astype(np.int16)
+
+
+def _noise(seconds, amplitude=6000):
+    rng = np.random.default_rng(0)
+    return (rng.standard_normal(int(seconds * RATE)) * amplitude).astype(np.int16)
+
+
+def test_frame_features_separate_tone_from_noise_and_silence():
+    energy, flatness = frame_features(np.concatenate([_voiced(0.3), _noise(0.3), np.zeros(4800, np.int16)]), RATE)
+
+    assert len(energy) == 30
+    assert flatness[:10].max() < 0.2
+    assert flatness[10:20].min() > 0.4
+    assert energy[20:].max() < -90
+
+
+def test_detect_speech_finds_voiced_spans_only():
+    samples = np.concatenate([np.zeros(RATE, np.int16), _voiced(2), _noise(2), _voiced(1)])
+
+    activity = detect_speech(samples, RATE, frame_ms=20, padding=0.1)
+
+    assert activity['spans'] == [(0.9, 3.1), (4.9, 6.0)]
+    assert activity['speech_ratio'] == round(3.3 / 6, 3)
+    assert len(speech_samples(samples, RATE, activity['spans'])) == round(3.3 * RATE)
+
+
+def test_detect_speech_without_speech():
+    samples = np.concatenate([np.zeros(RATE, np.int16), _noise(1), _voiced(0.1)])
+
+    activity = detect_speech(samples, RATE)
+
+    assert activity == {'spans': [], 'speech_ratio': 0.0}
+    assert len(speech_samples(samples, RATE, activity['spans'])) == 0